@@ -1,42 +1,214 @@
-from utils import calculer_longueur_cycle
+import time
+from collections import deque
 
-def opt_ppp(cycle, D):
+import numpy as np
+
+from utils import calculer_longueur_cycle, distances_paires, voisins_proches
+from tournee import Tournee, inverser_segment, rendre_comme
+
+# En dessous de ce gain, un échange n'est pas considéré comme une amélioration
+# (évite de boucler sur des erreurs d'arrondi)
+EPSILON = 1e-12
+
+def opt_ppp(cycle, D, mode="classique", k=8, strategie="premiere", instrumentation=None):
     """
     OptPPP : amélioration possible du cout
     du cycle obtenu par la procedure PPP 
     par décroisement des arêtes qui se croisent
+    (D : matrice n x n ou utils.DistancesALaDemande)
+    cycle : liste, tableau numpy ou tournee.Tournee ; le résultat est du même
+    type (une liste ou une Tournee en entrée est modifiée sur place).
+
+    - mode="classique" : balayage complet, recommencé après chaque décroisement
+    - mode="voisins" : 2-opt sur les k plus proches voisins (voir opt_ppp_voisins)
+    - instrumentation : instrumentation.Instrumentation optionnelle (compteurs
+      passages et echanges, serie duree_passage) ; on retourne alors
+      (cycle, longueur, instrumentation). Son rappel est consulte a chaque
+      passage et peut arreter la recherche (le cycle courant est rendu).
     """
+    if mode == "voisins":
+        return opt_ppp_voisins(cycle, D, k=k, strategie=strategie, instrumentation=instrumentation)
+    if mode != "classique":
+        raise ValueError("Mode inconnu : {} (attendu 'classique' ou 'voisins')".format(mode))
+
     # n est le nombre de sommets dans le cycle
     n = len(cycle)
+    ordre = np.array(cycle, dtype=np.int64)
 
     if n <= 3:
     # Le cycle trop court pour appliquer le décroisement
-        return cycle, float(calculer_longueur_cycle(cycle, D))
+        pass
     else:
         while True:  
             changement = False
+            if instrumentation is not None:
+                debut_passage = time.perf_counter()
+                echanges_avant = instrumentation.compteurs.get("echanges", 0)
 
+            # aretes[p] = D[ordre[p], ordre[p + 1]], tenu à jour après chaque inversion
+            aretes = distances_paires(D, ordre[:-1], ordre[1:])
             for i in range(n - 2):
-                for j in range(i + 2, n - 1):
-                # On compare le coût actuel et le coût si on décroise les arêtes
-                    if D[cycle[i], cycle[i + 1]] + D[cycle[j], cycle[j + 1]] > \
-                        D[cycle[i], cycle[j]] + D[cycle[i + 1], cycle[j + 1]]:
-                    
-                        # On inverser [i+1 .. j] 
-                        PLi1 = i + 1
-                        PLj = j
-                        while PLi1 < PLj:
-                            temp = cycle[PLi1]      
-                            cycle[PLi1] = cycle[PLj]  
-                            cycle[PLj] = temp     
-                            PLi1 += 1
-                            PLj -= 1
-                            
-                        changement = True 
-                        break  
+                # On compare d'un coup, pour tous les j de i+2 à n-2, le coût actuel
+                # et le coût si on décroise les arêtes ; on garde le premier j améliorant
+                a, b = ordre[i], ordre[i + 1]
+                actuel = aretes[i] + aretes[i + 2:n - 1]
+                decroise = D[a, ordre[i + 2:n - 1]] + D[b, ordre[i + 3:n]]
+                ameliorants = np.flatnonzero(actuel > decroise)
+                if len(ameliorants) == 0:
+                    continue
+                j = i + 2 + int(ameliorants[0])
+
+                # On inverse [i+1 .. j]
+                ordre[i + 1:j + 1] = ordre[i + 1:j + 1][::-1]
+                aretes[i:j + 1] = distances_paires(D, ordre[i:j + 1], ordre[i + 1:j + 2])
+
+                changement = True 
+                if instrumentation is not None:
+                    instrumentation.compter("echanges")
+
+            if instrumentation is not None:
+                instrumentation.compter("passages")
+                instrumentation.noter("duree_passage", time.perf_counter() - debut_passage)
+                if instrumentation.progression(passages=instrumentation.compteurs["passages"],
+                                               echanges=instrumentation.compteurs.get("echanges", 0) - echanges_avant):
+                    break
 
             # Si aucune amélioration n'est possible on sort de la boucle while
             if changement == False:
                 break
-    
-    return cycle, float(calculer_longueur_cycle(cycle, D))
\ No newline at end of file
+
+    cycle = rendre_comme(cycle, ordre)
+    if instrumentation is not None:
+        return cycle, float(calculer_longueur_cycle(cycle, D)), instrumentation
+    return cycle, float(calculer_longueur_cycle(cycle, D))
+
+def _taille_inversion(i, j, n):
+    """Nombre de sommets inversés par inverser_segment(ordre, position, i, j) (côté le plus court)."""
+    longueur = (j - i) % n + 1
+    return min(longueur, n - longueur)
+
+def opt_ppp_voisins(cycle, D, k=8, strategie="premiere", voisins=None, actifs=None, instrumentation=None,
+                    segment_max=None):
+    """
+    2-opt avec listes de voisins et bits "don't look".
+    - Pour une arête (a, b) du cycle, on ne teste que les arêtes (c, d) où c est
+      parmi les k plus proches voisins de a et D[a, c] < D[a, b]
+      (sinon l'échange ne peut pas être améliorant).
+    - Une file contient les sommets à examiner : un sommet sans amélioration
+      sort de la file et n'y revient que si une de ses arêtes change.
+    - strategie="premiere" : on applique le premier échange améliorant trouvé,
+      strategie="meilleure" : le meilleur échange autour du sommet examiné.
+    - voisins : listes de candidats déjà calculées (sinon utils.voisins_proches(D, k))
+    - actifs : sommets à examiner au départ (par défaut tous)
+    - segment_max : si donné, on ignore les échanges qui demandent d'inverser plus
+      de segment_max sommets (côté le plus court) ; sur de très grands cycles,
+      chaque inversion coûte sinon jusqu'à n / 2 écritures
+    - instrumentation : comme pour opt_ppp (compteurs passages, echanges,
+      sommets_examines ; rappel consulté tous les 1024 sommets examinés)
+    L'arête de retour (cycle[n-1], cycle[0]) est traitée comme les autres.
+    Retourne (cycle, longueur), cycle du type reçu (liste, tableau ou
+    tournee.Tournee ; une liste ou une Tournee est modifiée sur place).
+    """
+    if strategie not in ("premiere", "meilleure"):
+        raise ValueError("Stratégie inconnue : {} (attendu 'premiere' ou 'meilleure')".format(strategie))
+
+    n = len(cycle)
+    if n <= 3:
+        longueur = float(calculer_longueur_cycle(cycle, D))
+        return (cycle, longueur) if instrumentation is None else (cycle, longueur, instrumentation)
+
+    if voisins is None:
+        voisins = voisins_proches(D, k).tolist()
+
+    tournee = Tournee(cycle)
+    ordre, position = tournee.ordre, tournee.position
+
+    # Sans sommets actifs imposés, on repasse sur tous les sommets tant qu'un passage
+    # complet trouve encore un échange : les bits "don't look" peuvent en laisser passer
+    passages_complets = actifs is None
+    if actifs is None:
+        actifs = ordre.tolist()
+    file = deque(actifs)
+    dans_file = np.zeros(n, dtype=bool)
+    dans_file[actifs] = True
+    meilleure = strategie == "meilleure"
+    echanges_du_passage = 0
+    if instrumentation is not None:
+        instrumentation.compter("passages")
+
+    while file or (passages_complets and echanges_du_passage > 0):
+        if not file:
+            echanges_du_passage = 0
+            file.extend(range(n))
+            dans_file[:] = True
+            if instrumentation is not None:
+                instrumentation.compter("passages")
+
+        a = file.popleft()
+        dans_file[a] = False
+
+        if instrumentation is not None:
+            instrumentation.compter("sommets_examines")
+            if instrumentation.compteurs["sommets_examines"] % 1024 == 0 and instrumentation.progression(
+                    sommets_examines=instrumentation.compteurs["sommets_examines"], taille_file=len(file)):
+                break
+
+        pa = position[a]
+        succ_a = ordre[(pa + 1) % n]
+        pred_a = ordre[pa - 1]
+        d_succ = D[a, succ_a]
+        d_pred = D[pred_a, a]
+
+        meilleur_delta = -EPSILON
+        coup = None
+
+        for c in voisins[a]:
+            d_ac = D[a, c]
+            if d_ac >= d_succ and d_ac >= d_pred:
+                break
+            pc = position[c]
+
+            # Sens 1 : on retire (a, succ a) et (c, succ c), on ajoute (a, c) et (succ a, succ c)
+            if d_ac < d_succ and c != succ_a:
+                d = ordre[(pc + 1) % n]
+                if d != a:
+                    delta = d_ac + D[succ_a, d] - d_succ - D[c, d]
+                    if delta < meilleur_delta and (segment_max is None
+                                                   or _taille_inversion(pa + 1, pc, n) <= segment_max):
+                        meilleur_delta = delta
+                        # inverser succ a .. c
+                        coup = ((pa + 1) % n, pc, (a, succ_a, c, d))
+                        if not meilleure:
+                            break
+
+            # Sens 2 : on retire (pred a, a) et (pred c, c), on ajoute (a, c) et (pred a, pred c)
+            if d_ac < d_pred and c != pred_a:
+                d = ordre[pc - 1]
+                if d != a:
+                    delta = d_ac + D[pred_a, d] - d_pred - D[d, c]
+                    if delta < meilleur_delta and (segment_max is None
+                                                   or _taille_inversion(pa, pc - 1, n) <= segment_max):
+                        meilleur_delta = delta
+                        # inverser a .. pred c
+                        coup = (pa, (pc - 1) % n, (a, pred_a, c, d))
+                        if not meilleure:
+                            break
+
+        if coup is None:
+            continue
+
+        i, j, sommets = coup
+        inverser_segment(ordre, position, i, j)
+        echanges_du_passage += 1
+        if instrumentation is not None:
+            instrumentation.compter("echanges")
+        # Les 4 extrémités des arêtes modifiées doivent être réexaminées (a compris)
+        for v in sommets:
+            if not dans_file[v]:
+                dans_file[v] = True
+                file.append(v)
+
+    resultat = rendre_comme(cycle, ordre)
+    if instrumentation is not None:
+        return resultat, float(calculer_longueur_cycle(ordre, D)), instrumentation
+    return resultat, float(calculer_longueur_cycle(ordre, D))
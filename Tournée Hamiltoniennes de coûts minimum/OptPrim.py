@@ -1,14 +1,88 @@
 import heapq
-from utils import calculer_matrice_distances, calculer_longueur_cycle, generer_points, afficher_tournee
+import time
 
-def OptPrim(points, D, depart=0):
+import numpy as np
+
+from utils import (
+    calculer_matrice_distances,
+    calculer_longueur_cycle,
+    generer_points,
+    afficher_tournee,
+    voisins_proches_points,
+    DistancesALaDemande,
+)
+
+def OptPrim(points, D, depart=0, methode="tas", k=10, instrumentation=None):
     """
     Implémentation de la stratégie par l'arbre couvrant de poids minimum (Section 2.3).
-    Prend en entrée la liste des points et la matrice de distances D.
+    Prend en entrée la liste des points et la matrice de distances D
+    (ou utils.DistancesALaDemande pour les grandes instances).
     Retourne le cycle hamiltonien et sa longueur.
+
+    methode choisit le calcul de l'arbre (voir arbre_couvrant_minimum) :
+    - "tas" : Prim avec file de priorité (version d'origine)
+    - "dense" : Prim sur tableaux en O(n^2), adapté à une matrice D pleine
+    - "geometrique" : arbre calculé depuis les points seuls (D peut valoir None)
+
+    instrumentation : instrumentation.Instrumentation optionnelle (opérations de
+    tas tas_ajouts / tas_extractions pour "tas", voir arbre_couvrant_minimum pour
+    les autres méthodes, durées "acm" et "parcours") ; on retourne alors
+    (cycle, longueur, instrumentation).
     """
     n = len(points)
+    if n == 0:
+        return ([], 0.0) if instrumentation is None else ([], 0.0, instrumentation)
+
+    if instrumentation is not None:
+        debut = time.perf_counter()
+    acm = arbre_couvrant_minimum(points, D, depart=depart, methode=methode, k=k,
+                                 instrumentation=instrumentation)
+    if instrumentation is not None:
+        instrumentation.ajouter_duree("acm", time.perf_counter() - debut)
+        debut = time.perf_counter()
+
+    # --- PARTIE 2 : Parcours préfixe (DFS) ---
+    # Le parcours préfixe de l'ACM donne le cycle hamiltonien (2-approximation)
+    cycle = parcours_prefixe(acm, depart)
+
+    # Calcul de la longueur totale avec la fonction commune de utils.py
+    if D is None:
+        D = DistancesALaDemande(points)
+    longueur = calculer_longueur_cycle(cycle, D)
 
+    if instrumentation is not None:
+        instrumentation.ajouter_duree("parcours", time.perf_counter() - debut)
+        return cycle, longueur, instrumentation
+    return cycle, longueur
+
+def arbre_couvrant_minimum(points, D, depart=0, methode="tas", k=10, instrumentation=None):
+    """
+    Renvoie l'ACM sous forme de liste d'adjacence {sommet: [voisins]}.
+    - "tas" : Prim avec file de priorité, O(n^2 log n)
+    - "dense" : Prim sur tableaux (voir prim_dense), O(n^2) et O(n) mémoire
+    - "geometrique" : Kruskal sur le graphe des k plus proches voisins calculé
+      depuis les points (voir acm_geometrique), sans jamais former D
+    instrumentation (optionnelle) compte tas_ajouts / tas_extractions ("tas"),
+    iterations_prim ("dense") ou aretes_candidates / aretes_examinees ("geometrique").
+    """
+    if methode == "tas":
+        return _acm_tas(D, len(points), depart, instrumentation)
+    if methode == "dense":
+        parent, rang = prim_dense(D, depart)
+        if instrumentation is not None:
+            instrumentation.compter("iterations_prim", max(len(points) - 1, 0))
+        acm = {i: [] for i in range(len(points))}
+        # Les arêtes sont ajoutées dans l'ordre où Prim a choisi les sommets
+        for u in np.argsort(rang, kind="stable")[1:].tolist():
+            p = int(parent[u])
+            acm[p].append(u)
+            acm[u].append(p)
+        return acm
+    if methode == "geometrique":
+        return acm_geometrique(points, k=k, instrumentation=instrumentation)
+    raise ValueError("Méthode inconnue : {} (attendu 'tas', 'dense' ou 'geometrique')".format(methode))
+
+def _acm_tas(D, n, depart, instrumentation=None):
     # --- PARTIE 1 : Algorithme de Prim (Version efficace avec file de priorité) ---
     # On construit une liste d'adjacence pour stocker l'arbre
     acm = {i: [] for i in range(n)}
@@ -18,6 +92,9 @@ def OptPrim(points, D, depart=0):
 
     while file_prio:
         poids, u, parent = heapq.heappop(file_prio)
+        if instrumentation is not None:
+            instrumentation.compter("tas_extractions")
+            instrumentation.maximum("taille_tas", len(file_prio) + 1)
 
         if visites[u]:
             continue
@@ -32,25 +109,124 @@ def OptPrim(points, D, depart=0):
         for v in range(n):
             if not visites[v]:
                 heapq.heappush(file_prio, (D[u, v], v, u))
+                if instrumentation is not None:
+                    instrumentation.compter("tas_ajouts")
 
-    # --- PARTIE 2 : Parcours préfixe (DFS) ---
-    # Le parcours préfixe de l'ACM donne le cycle hamiltonien (2-approximation)
+        if instrumentation is not None:
+            instrumentation.progression(taille_tas=len(file_prio), n=n)
+
+    return acm
+
+def prim_dense(D, depart=0):
+    """
+    Prim en O(n^2) sans file de priorité : on garde pour chaque sommet hors de
+    l'arbre sa distance à l'arbre (cle) et le sommet de l'arbre qui la réalise,
+    et on les met à jour d'un coup avec la ligne du sommet ajouté.
+    D peut être une matrice dense ou tout objet dont D[u] renvoie la ligne u.
+    Renvoie (parent, rang) : parent[v] = père de v (-1 pour depart),
+    rang[v] = ordre d'ajout de v dans l'arbre.
+    """
+    n = int(D.shape[0])
+    parent = np.full(n, depart, dtype=np.int64)
+    parent[depart] = -1
+    rang = np.zeros(n, dtype=np.int64)
+    dans_arbre = np.zeros(n, dtype=bool)
+    dans_arbre[depart] = True
+
+    cle = np.array(D[depart], dtype=np.float64)
+    cle[depart] = np.inf
+
+    for r in range(1, n):
+        u = int(np.argmin(cle))
+        dans_arbre[u] = True
+        rang[u] = r
+        cle[u] = np.inf
+
+        ligne = np.asarray(D[u], dtype=np.float64)
+        mieux = (ligne < cle) & ~dans_arbre
+        cle[mieux] = ligne[mieux]
+        parent[mieux] = u
+
+    return parent, rang
+
+def acm_geometrique(points, k=10, instrumentation=None):
+    """
+    ACM euclidien calculé depuis les points seuls : Kruskal (avec union-find)
+    sur les arêtes vers les k plus proches voisins. Si ce graphe n'est pas
+    connexe, on double k et on recommence.
+    On obtient l'ACM du graphe des voisins, qui est l'ACM euclidien dès que
+    celui-ci n'utilise que des arêtes entre k plus proches voisins
+    (toujours le cas en pratique pour k autour de 10 sur des points répartis).
+    """
+    points = np.asarray(points, dtype=np.float64)
+    n = len(points)
+    acm = {i: [] for i in range(n)}
+    if n <= 1:
+        return acm
+
+    while True:
+        voisins = voisins_proches_points(points, k)
+        kk = voisins.shape[1]
+        u = np.repeat(np.arange(n), kk)
+        v = voisins.ravel()
+        # Chaque arête n'est gardée qu'une fois
+        garder = u < v
+        garder |= ~np.isin(u + n * v, v + n * u)
+        u, v = u[garder], v[garder]
+        if instrumentation is not None:
+            instrumentation.compter("aretes_candidates", len(u))
+        poids = np.hypot(points[u, 0] - points[v, 0], points[u, 1] - points[v, 1])
+        ordre = np.argsort(poids, kind="stable")
+
+        pere = list(range(n))
+
+        def racine(x):
+            while pere[x] != x:
+                pere[x] = pere[pere[x]]
+                x = pere[x]
+            return x
+
+        aretes = []
+        for a, b in zip(u[ordre].tolist(), v[ordre].tolist()):
+            if instrumentation is not None:
+                instrumentation.compter("aretes_examinees")
+            ra, rb = racine(a), racine(b)
+            if ra != rb:
+                pere[ra] = rb
+                aretes.append((a, b))
+                if len(aretes) == n - 1:
+                    break
+
+        if len(aretes) == n - 1 or kk >= n - 1:
+            break
+        k = 2 * kk
+
+    for a, b in aretes:
+        acm[a].append(b)
+        acm[b].append(a)
+    return acm
+
+def parcours_prefixe(acm, depart):
+    """
+    Parcours préfixe itératif (pile explicite) : même ordre que le DFS récursif
+    qui visite les voisins dans l'ordre de acm[u], sans limite de récursion.
+    """
     cycle = []
-    deja_dans_cycle = [False] * n
+    deja_dans_cycle = [False] * len(acm)
+    pile = [depart]
 
-    def dfs(u):
+    while pile:
+        u = pile.pop()
+        if deja_dans_cycle[u]:
+            continue
         deja_dans_cycle[u] = True
         cycle.append(u)
-        for voisin in acm[u]:
+        # On empile à l'envers pour dépiler les voisins dans l'ordre de acm[u]
+        for voisin in reversed(acm[u]):
             if not deja_dans_cycle[voisin]:
-                dfs(voisin)
+                pile.append(voisin)
 
-    dfs(depart)
-
-    # Calcul de la longueur totale avec la fonction commune de utils.py
-    longueur = calculer_longueur_cycle(cycle, D)
-
-    return cycle, longueur
+    return cycle
 
 # --- Zone de test pour Pyzo ---
 if __name__ == "__main__":
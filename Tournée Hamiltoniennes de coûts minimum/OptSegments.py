@@ -0,0 +1,173 @@
+from collections import deque
+
+import numpy as np
+
+from utils import calculer_longueur_cycle, voisins_proches
+from OptPPP import EPSILON
+from tournee import Tournee, inverser_segment, rendre_comme
+
+def permuter_blocs(ordre, position, i, l1, l2):
+    """
+    Le cycle est vu comme trois blocs consécutifs X Y Z, avec X = ordre[i .. i+l1-1],
+    Y = les l2 suivants et Z = le reste. On le remplace par Y X Z.
+    Comme Y X Z = X Z Y = Z Y X à rotation près, on échange la paire de blocs
+    adjacents la plus courte.
+    """
+    n = len(ordre)
+    l3 = n - l1 - l2
+    if l3 < l1 and l3 < l2:
+        # Y X Z = Z Y X : on échange Z et X (Z commence après Y)
+        i, l1, l2 = (i + l1 + l2) % n, l3, l1
+    elif l1 < l2 and l3 < l2:
+        # Y X Z = X Z Y : on échange Y et Z
+        i, l1, l2 = (i + l1) % n, l2, l3
+    if l1 == 0 or l2 == 0:
+        return
+
+    indices = np.arange(i, i + l1 + l2) % n
+    sommets = ordre[indices]
+    sommets = np.concatenate((sommets[l1:], sommets[:l1]))
+    ordre[indices] = sommets
+    position[sommets] = indices
+
+def opt_segments(cycle, D, k=8, longueur_max=3, voisins=None, instrumentation=None):
+    """
+    Recherche locale par déplacement de segments, à lancer après opt_ppp :
+    - Or-opt : on déplace un segment de 1 à longueur_max villes (éventuellement
+      retourné) entre deux sommets voisins ailleurs dans le cycle ;
+    - 3-opt restreint (or-3opt) : on échange deux segments consécutifs
+      a [b..c] [d..e] f  ->  a [d..e] [b..c] f, sans inversion.
+    Chaque coup est évalué en O(1) sur D, et on ne teste que les sommets des
+    listes des k plus proches voisins, avec une file de sommets à examiner.
+    instrumentation : comme pour OptPPP.opt_ppp_voisins (compteurs
+    sommets_examines et coups, rappel consulté tous les 1024 sommets examinés,
+    qui peut arrêter la recherche) ; on retourne alors (cycle, longueur, instrumentation).
+    Retourne (cycle, longueur), cycle du type reçu (liste, tableau ou
+    tournee.Tournee ; une liste ou une Tournee est modifiée sur place).
+    """
+    n = len(cycle)
+    if n <= 4:
+        longueur = float(calculer_longueur_cycle(cycle, D))
+        return (cycle, longueur) if instrumentation is None else (cycle, longueur, instrumentation)
+
+    if voisins is None:
+        voisins = voisins_proches(D, k).tolist()
+    longueur_max = max(1, min(int(longueur_max), n - 3))
+
+    tournee = Tournee(cycle)
+    ordre, position = tournee.ordre, tournee.position
+
+    file = deque(range(n))
+    dans_file = np.ones(n, dtype=bool)
+    coups_du_passage = 0
+
+    while file or coups_du_passage > 0:
+        if not file:
+            # Comme pour opt_ppp_voisins : un passage complet sans coup garantit l'optimum local
+            coups_du_passage = 0
+            file.extend(range(n))
+            dans_file[:] = True
+
+        s1 = file.popleft()
+        dans_file[s1] = False
+
+        if instrumentation is not None:
+            instrumentation.compter("sommets_examines")
+            if instrumentation.compteurs["sommets_examines"] % 1024 == 0 and instrumentation.progression(
+                    sommets_examines=instrumentation.compteurs["sommets_examines"], taille_file=len(file)):
+                break
+
+        coup = _chercher_or_opt(ordre, position, D, voisins, s1, longueur_max)
+        if coup is None:
+            coup = _chercher_or_3opt(ordre, position, D, voisins, s1)
+        if coup is None:
+            continue
+
+        i, l1, l2, a_inverser, touches = coup
+        permuter_blocs(ordre, position, i, l1, l2)
+        if a_inverser is not None:
+            debut, fin = a_inverser
+            inverser_segment(ordre, position, position[debut], position[fin])
+        coups_du_passage += 1
+        if instrumentation is not None:
+            instrumentation.compter("coups")
+
+        for v in touches:
+            if not dans_file[v]:
+                dans_file[v] = True
+                file.append(v)
+
+    resultat = rendre_comme(cycle, ordre), float(calculer_longueur_cycle(ordre, D))
+    if instrumentation is not None:
+        return resultat + (instrumentation,)
+    return resultat
+
+def _chercher_or_opt(ordre, position, D, voisins, s1, longueur_max):
+    """Premier déplacement de segment améliorant commençant en s1, ou None."""
+    n = len(ordre)
+    i = position[s1]
+    p = ordre[i - 1]
+
+    for L in range(1, longueur_max + 1):
+        s2 = ordre[(i + L - 1) % n]
+        nx = ordre[(i + L) % n]
+        # Gain obtenu en retirant le segment et en reliant p -- nx
+        gain_retrait = D[p, s1] + D[s2, nx] - D[p, nx]
+        if gain_retrait <= EPSILON:
+            continue
+
+        for extremite in (s1, s2) if L > 1 else (s1,):
+            for c in voisins[extremite]:
+                if D[extremite, c] >= gain_retrait:
+                    break
+                pc = position[c]
+                # c ne doit pas être dans le segment
+                if (pc - i) % n < L:
+                    continue
+
+                # On essaie les arêtes (c, succ c) et (pred c, c)
+                for x, y in ((c, ordre[(pc + 1) % n]), (ordre[pc - 1], c)):
+                    if (position[y] - i) % n < L or (position[x] - i) % n < L:
+                        continue
+                    d_xy = D[x, y]
+                    ajout_direct = D[x, s1] + D[s2, y] - d_xy
+                    ajout_inverse = D[x, s2] + D[s1, y] - d_xy
+                    inverse = ajout_inverse < ajout_direct
+                    ajout = ajout_inverse if inverse else ajout_direct
+                    if ajout - gain_retrait < -EPSILON:
+                        # X = segment, Y = nx .. x, Z = y .. p  ->  Y X Z
+                        l2 = (position[x] - (i + L)) % n + 1
+                        a_inverser = (s1, s2) if inverse and L > 1 else None
+                        return i, L, l2, a_inverser, (p, s1, s2, nx, x, y)
+    return None
+
+def _chercher_or_3opt(ordre, position, D, voisins, a):
+    """Premier échange de segments a [b..c] [d..e] f améliorant, ou None."""
+    n = len(ordre)
+    pa = position[a]
+    b = ordre[(pa + 1) % n]
+    d_ab = D[a, b]
+
+    for d in voisins[a]:
+        g1 = d_ab - D[a, d]
+        if g1 <= EPSILON:
+            break
+        rang_d = (position[d] - pa) % n
+        if rang_d < 2:
+            continue
+        c = ordre[(position[d] - 1) % n]
+        d_cd = D[c, d]
+
+        for e in voisins[b]:
+            g2 = g1 + d_cd - D[b, e]
+            if g2 <= EPSILON:
+                break
+            rang_e = (position[e] - pa) % n
+            if rang_e < rang_d:
+                continue
+            f = ordre[(position[e] + 1) % n]
+            delta = D[c, f] - D[e, f] - g2
+            if delta < -EPSILON:
+                # X = b .. c, Y = d .. e, Z = f .. a  ->  Y X Z
+                return (pa + 1) % n, rang_d - 1, rang_e - rang_d + 1, None, (a, b, c, d, e, f)
+    return None
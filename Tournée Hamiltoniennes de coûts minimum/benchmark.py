@@ -0,0 +1,265 @@
+# Banc d'essai : temps, mémoire et qualité des solveurs sur une grille d'instances,
+# avec comparaison à une référence enregistrée pour détecter les régressions.
+#
+# Exemples :
+#   python benchmark.py --tailles 10 50 200 --graines 0 1 2 --sortie resultats.json
+#   python benchmark.py --reference resultats.json --seuil 0.25
+# Le code de sortie vaut 1 si une régression est détectée.
+
+import argparse
+import csv
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+# Aucune fenêtre : le banc doit tourner sur une machine sans affichage
+import matplotlib
+matplotlib.use("Agg")
+
+import numpy as np
+
+from utils import calculer_matrice_distances, charger_points_fichier
+from ppp import ppp
+from OptPPP import opt_ppp
+from OptPrim import OptPrim
+from constructions import glouton_aretes, christofides
+from hds import hds
+from held_karp import held_karp
+
+DOSSIER = os.path.dirname(os.path.abspath(__file__))
+
+FAMILLES = ("uniforme", "groupee", "fichier")
+SOLVEURS = ("matrice", "ppp", "opt_ppp", "OptPrim", "glouton_aretes", "christofides", "hds")
+COLONNES = ("instance", "famille", "n", "graine", "solveur", "temps", "memoire_max",
+            "longueur", "reference", "rapport", "statut")
+
+
+def generer_instance(famille, n, graine):
+    """
+    Points d'une instance à graine fixe :
+    - "uniforme" : n points uniformes dans [0, 1]^2
+    - "groupee" : n points répartis autour de max(2, n // 20) centres (écart-type 0.05)
+    """
+    rng = np.random.default_rng(graine)
+    if famille == "uniforme":
+        return rng.random((n, 2))
+    if famille == "groupee":
+        nb_centres = max(2, n // 20)
+        centres = rng.random((nb_centres, 2))
+        points = centres[rng.integers(0, nb_centres, n)] + rng.normal(0.0, 0.05, (n, 2))
+        return np.clip(points, 0.0, 1.0)
+    raise ValueError("Famille inconnue : {} (attendu 'uniforme' ou 'groupee')".format(famille))
+
+
+def lister_instances(familles, tailles, graines, fichiers):
+    """Renvoie la liste (nom, famille, n, graine, points) des instances du banc."""
+    instances = []
+    for famille in familles:
+        if famille == "fichier":
+            for fichier in fichiers:
+                chemin = fichier if os.path.isabs(fichier) else os.path.join(DOSSIER, fichier)
+                points = charger_points_fichier(chemin)
+                if points is not None:
+                    nom = "fichier-{}".format(os.path.basename(fichier))
+                    instances.append((nom, famille, len(points), None, points))
+            continue
+        for n in tailles:
+            for graine in graines:
+                nom = "{}-n{}-g{}".format(famille, n, graine)
+                instances.append((nom, famille, n, graine, generer_instance(famille, n, graine)))
+    return instances
+
+
+def _preparer(solveur, points, D, temps_max_hds):
+    """Fonction sans argument qui exécute le solveur (la préparation n'est pas mesurée)."""
+    if solveur == "matrice":
+        return lambda: (None, None, calculer_matrice_distances(points))[:2]
+    if solveur == "ppp":
+        return lambda: ppp(D)
+    if solveur == "opt_ppp":
+        cycle, _ = ppp(D)
+        return lambda: opt_ppp(list(cycle), D)
+    if solveur == "OptPrim":
+        return lambda: OptPrim(points, D)
+    if solveur == "glouton_aretes":
+        return lambda: glouton_aretes(points, D)
+    if solveur == "christofides":
+        return lambda: christofides(points, D)
+    if solveur == "hds":
+        infos = {}
+
+        def lancer():
+            cycle, longueur = hds(D, temps_max=temps_max_hds, infos=infos)
+            lancer.statut = infos.get("statut")
+            return cycle, longueur
+
+        lancer.statut = None
+        return lancer
+    raise ValueError("Solveur inconnu : {} (attendu un de {})".format(solveur, ", ".join(SOLVEURS)))
+
+
+def mesurer(fonction, repetitions=3):
+    """
+    Temps (meilleur de repetitions exécutions, time.perf_counter) puis pic de
+    mémoire Python/numpy (tracemalloc) sur une exécution séparée, tracemalloc
+    ralentissant le code mesuré. Renvoie (temps, memoire_max, resultat).
+    """
+    temps = float("inf")
+    resultat = None
+    for _ in range(max(1, repetitions)):
+        debut = time.perf_counter()
+        resultat = fonction()
+        temps = min(temps, time.perf_counter() - debut)
+
+    tracemalloc.start()
+    try:
+        fonction()
+        _, memoire_max = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return temps, memoire_max, resultat
+
+
+def executer_benchmark(tailles=(10, 50, 200), graines=(0, 1, 2), familles=FAMILLES,
+                       solveurs=SOLVEURS, fichiers=("10 points.txt",), repetitions=3,
+                       temps_max_hds=2.0, n_max_hds=40, n_max_exact=13, verbeux=True):
+    """
+    Lance chaque solveur sur chaque instance et renvoie la liste des mesures
+    (un dictionnaire par couple instance / solveur, clés COLONNES).
+    La longueur de référence est l'optimum (held_karp) si n <= n_max_exact,
+    sinon la meilleure longueur obtenue par les solveurs sur l'instance ;
+    rapport = longueur / référence. hds est limité à n <= n_max_hds et
+    à temps_max_hds secondes par exécution (statut "optimal", "temps"...).
+    """
+    resultats = []
+    for nom, famille, n, graine, points in lister_instances(familles, tailles, graines, fichiers):
+        D = calculer_matrice_distances(points)
+        mesures = []
+        for solveur in solveurs:
+            if solveur == "hds" and n > n_max_hds:
+                continue
+            fonction = _preparer(solveur, points, D, temps_max_hds)
+            temps, memoire_max, (cycle, longueur) = mesurer(fonction, repetitions)
+            mesures.append({
+                "instance": nom, "famille": famille, "n": n, "graine": graine,
+                "solveur": solveur, "temps": temps, "memoire_max": memoire_max,
+                "longueur": None if longueur is None else float(longueur),
+                "statut": getattr(fonction, "statut", None),
+            })
+
+        if n <= n_max_exact:
+            reference, type_reference = held_karp(D)[1], "exacte"
+        else:
+            longueurs = [m["longueur"] for m in mesures if m["longueur"] is not None]
+            reference, type_reference = (min(longueurs) if longueurs else None), "meilleure_connue"
+
+        for m in mesures:
+            m["reference"] = type_reference
+            m["rapport"] = None if m["longueur"] is None or not reference else m["longueur"] / reference
+            if verbeux:
+                print("{:28s} {:14s} {:10.4f} s {:10.1f} Ko  {}".format(
+                    m["instance"], m["solveur"], m["temps"], m["memoire_max"] / 1024,
+                    "" if m["rapport"] is None else "rapport {:.4f}".format(m["rapport"])))
+        resultats.extend(mesures)
+    return resultats
+
+
+def ecrire_resultats(resultats, chemin_json=None, chemin_csv=None):
+    """Écrit les mesures en JSON (avec l'environnement d'exécution) et/ou en CSV."""
+    if chemin_json:
+        contenu = {
+            "environnement": {
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "machine": platform.platform(),
+                "processeurs": os.cpu_count(),
+                "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "resultats": resultats,
+        }
+        with open(chemin_json, "w") as f:
+            json.dump(contenu, f, indent=2)
+    if chemin_csv:
+        with open(chemin_csv, "w", newline="") as f:
+            ecrivain = csv.DictWriter(f, fieldnames=COLONNES)
+            ecrivain.writeheader()
+            for m in resultats:
+                ecrivain.writerow({c: m.get(c) for c in COLONNES})
+
+
+def charger_resultats(chemin):
+    with open(chemin) as f:
+        return json.load(f)["resultats"]
+
+
+def comparer(resultats, reference, seuil=0.2, temps_min=1e-3):
+    """
+    Compare les mesures à celles d'une référence (même instance et même solveur).
+    Régression si :
+    - le temps dépasse celui de la référence de plus de seuil (en relatif),
+      les temps sous temps_min secondes étant trop bruités pour compter ;
+    - le pic mémoire dépasse celui de la référence de plus de seuil ;
+    - la tournée est plus longue (au-delà des erreurs d'arrondi).
+    Renvoie la liste des messages de régression.
+    """
+    anciennes = {(m["instance"], m["solveur"]): m for m in reference}
+    regressions = []
+    for m in resultats:
+        ancienne = anciennes.get((m["instance"], m["solveur"]))
+        if ancienne is None:
+            continue
+        cle = "{} / {}".format(m["instance"], m["solveur"])
+        if max(m["temps"], ancienne["temps"]) >= temps_min and m["temps"] > ancienne["temps"] * (1 + seuil):
+            regressions.append("{} : temps {:.4f} s au lieu de {:.4f} s".format(cle, m["temps"], ancienne["temps"]))
+        if m["memoire_max"] > ancienne["memoire_max"] * (1 + seuil):
+            regressions.append("{} : mémoire {:.1f} Ko au lieu de {:.1f} Ko".format(
+                cle, m["memoire_max"] / 1024, ancienne["memoire_max"] / 1024))
+        if m["longueur"] is not None and ancienne["longueur"] is not None \
+                and m["longueur"] > ancienne["longueur"] * (1 + 1e-9):
+            regressions.append("{} : longueur {:.6f} au lieu de {:.6f}".format(
+                cle, m["longueur"], ancienne["longueur"]))
+    return regressions
+
+
+def main(arguments=None):
+    parseur = argparse.ArgumentParser(description="Banc d'essai des solveurs de tournée.")
+    parseur.add_argument("--tailles", type=int, nargs="+", default=[10, 50, 200])
+    parseur.add_argument("--graines", type=int, nargs="+", default=[0, 1, 2])
+    parseur.add_argument("--familles", nargs="+", choices=FAMILLES, default=list(FAMILLES))
+    parseur.add_argument("--solveurs", nargs="+", choices=SOLVEURS, default=list(SOLVEURS))
+    parseur.add_argument("--fichiers", nargs="+", default=["10 points.txt"],
+                         help="fichiers de points de la famille 'fichier'")
+    parseur.add_argument("--repetitions", type=int, default=3)
+    parseur.add_argument("--temps-max-hds", type=float, default=2.0)
+    parseur.add_argument("--n-max-hds", type=int, default=40)
+    parseur.add_argument("--n-max-exact", type=int, default=13)
+    parseur.add_argument("--sortie", help="fichier JSON des résultats")
+    parseur.add_argument("--csv", help="fichier CSV des résultats")
+    parseur.add_argument("--reference", help="résultats JSON de référence à comparer")
+    parseur.add_argument("--seuil", type=float, default=0.2,
+                         help="écart relatif toléré sur le temps et la mémoire")
+    args = parseur.parse_args(arguments)
+
+    resultats = executer_benchmark(
+        tailles=args.tailles, graines=args.graines, familles=args.familles,
+        solveurs=args.solveurs, fichiers=args.fichiers, repetitions=args.repetitions,
+        temps_max_hds=args.temps_max_hds, n_max_hds=args.n_max_hds, n_max_exact=args.n_max_exact,
+    )
+    ecrire_resultats(resultats, args.sortie, args.csv)
+
+    if args.reference:
+        regressions = comparer(resultats, charger_resultats(args.reference), seuil=args.seuil)
+        if regressions:
+            print("\n{} régression(s) par rapport à {} :".format(len(regressions), args.reference))
+            for message in regressions:
+                print("  " + message)
+            return 1
+        print("\nAucune régression par rapport à {}.".format(args.reference))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
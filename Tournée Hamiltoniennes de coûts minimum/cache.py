@@ -0,0 +1,268 @@
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou entre processus
+    fcntl = None
+
+from utils import calculer_matrice_distances
+
+DOSSIER_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "tournees")
+
+
+def empreinte_points(points):
+    """Empreinte sha256 (hexadécimale) du contenu d'un tableau de points (n x 2)."""
+    points = np.ascontiguousarray(points, dtype=np.float64)
+    h = hashlib.sha256()
+    h.update(repr(points.shape).encode())
+    h.update(points.tobytes())
+    return h.hexdigest()
+
+
+def empreinte_parametres(solveur, parametres=None):
+    """Empreinte (courte) du nom du solveur et de ses paramètres (dictionnaire sérialisable en JSON)."""
+    texte = json.dumps([solveur, parametres or {}], sort_keys=True, default=str)
+    return hashlib.sha256(texte.encode()).hexdigest()[:16]
+
+
+class CacheDisque:
+    """
+    Cache sur disque des matrices de distances et des tournées calculées,
+    adressé par le contenu : la clé d'une instance est l'empreinte sha256 de
+    ses points, celle d'une tournée y ajoute le solveur et ses paramètres.
+    Une instance inchangée retrouve donc ses résultats d'une exécution à l'autre.
+
+    - dossier : <empreinte>.D.npy (matrice, relue en np.memmap lecture seule)
+      et <empreinte>.<solveur>.<empreinte paramètres>.json (tournée, longueur, infos)
+    - taille_max : taille totale du dossier en octets ; au-delà, les fichiers
+      les moins récemment utilisés sont supprimés
+    - taille_memoire : nombre d'entrées gardées en mémoire (LRU) devant le disque
+
+    Plusieurs processus peuvent partager le dossier : chaque fichier est écrit
+    sous un nom temporaire puis renommé (os.replace, atomique), un lecteur voit
+    donc l'ancien contenu ou le nouveau, jamais un fichier partiel ; écritures
+    et évictions sont de plus sérialisées par un verrou fcntl sur le dossier.
+    """
+
+    def __init__(self, dossier=None, taille_max=2 * 1024**3, taille_memoire=32):
+        self.dossier = DOSSIER_CACHE if dossier is None else dossier
+        self.taille_max = taille_max
+        self.taille_memoire = taille_memoire
+        self._memoire = OrderedDict()
+        self.succes = 0
+        self.echecs = 0
+        os.makedirs(self.dossier, exist_ok=True)
+
+    # --- Matrices de distances ---
+
+    def matrice_distances(self, points, empreinte=None):
+        """
+        Matrice de distances des points, relue du cache (np.memmap lecture seule)
+        ou calculée et enregistrée. Le calcul écrit directement dans le fichier.
+        Une matrice plus grosse que taille_max est calculée en mémoire et rendue
+        sans être enregistrée.
+        """
+        empreinte = empreinte or empreinte_points(points)
+        nom = "{}.D.npy".format(empreinte)
+        D = self._lire(nom, self._charger_matrice)
+        if D is not None:
+            return D
+
+        n = len(points)
+        if 8 * n * n > self.taille_max:
+            return calculer_matrice_distances(points)
+
+        chemin = os.path.join(self.dossier, nom)
+        with self._verrou():
+            if os.path.exists(chemin):
+                # Calculée par un autre processus pendant l'attente du verrou
+                D = self._charger_matrice(chemin)
+                self._retenir(nom, D)
+                return D
+            descripteur, temporaire = tempfile.mkstemp(dir=self.dossier, suffix=".tmp")
+            os.close(descripteur)
+            try:
+                sortie = np.lib.format.open_memmap(temporaire, mode="w+", dtype=np.float64, shape=(n, n))
+                calculer_matrice_distances(points, sortie=sortie)
+                sortie.flush()
+                del sortie
+                os.replace(temporaire, chemin)
+            except BaseException:
+                _supprimer(temporaire)
+                raise
+            D = self._charger_matrice(chemin)
+            self._evincer(garder=nom)
+
+        self._retenir(nom, D)
+        return D
+
+    @staticmethod
+    def _charger_matrice(chemin):
+        return np.load(chemin, mmap_mode="r")
+
+    # --- Tournées ---
+
+    def tournee(self, points, solveur, parametres=None, calcul=None, infos=None, empreinte=None,
+                accepter=None):
+        """
+        Tournée (cycle, longueur) du solveur sur les points, relue du cache,
+        ou obtenue par calcul() puis enregistrée ; None si absente et calcul=None.
+        infos : dictionnaire optionnel, rempli par calcul() au premier passage
+        (par exemple celui de hds) ; il est enregistré avec la tournée et
+        restauré lors des lectures suivantes.
+        accepter : fonction optionnelle appelée sur les infos d'une entrée relue ;
+        si elle renvoie False (résultat provisoire, par exemple hds arrêté avant
+        la preuve), l'entrée est recalculée par calcul() et remplacée.
+        """
+        empreinte = empreinte or empreinte_points(points)
+        nom = "{}.{}.{}.json".format(empreinte, solveur, empreinte_parametres(solveur, parametres))
+        entree = self._lire(nom, _charger_json)
+        if entree is not None and calcul is not None and accepter is not None \
+                and not accepter(entree["infos"]):
+            entree = None
+        if entree is None:
+            if calcul is None:
+                return None
+            cycle, longueur = calcul()[:2]
+            entree = {
+                "solveur": solveur,
+                "parametres": parametres or {},
+                "cycle": [int(v) for v in cycle],
+                "longueur": float(longueur),
+                "infos": dict(infos) if infos else {},
+            }
+            self._ecrire_json(nom, entree)
+            self._retenir(nom, entree)
+        elif infos is not None:
+            infos.update(entree["infos"])
+        return list(entree["cycle"]), entree["longueur"]
+
+    def meilleure_tournee(self, points, empreinte=None):
+        """
+        Plus courte tournée enregistrée pour ces points, tous solveurs confondus :
+        (cycle, longueur), ou None. Sert de borne supérieure initiale à hds.
+        """
+        empreinte = empreinte or empreinte_points(points)
+        meilleure = None
+        for entree in os.scandir(self.dossier):
+            if not (entree.name.startswith(empreinte + ".") and entree.name.endswith(".json")):
+                continue
+            contenu = self._lire(entree.name, _charger_json)
+            if contenu is not None and (meilleure is None or contenu["longueur"] < meilleure["longueur"]):
+                meilleure = contenu
+        return None if meilleure is None else (list(meilleure["cycle"]), meilleure["longueur"])
+
+    def vider(self):
+        """Supprime toutes les entrées (mémoire et disque)."""
+        self._memoire.clear()
+        with self._verrou():
+            for entree in os.scandir(self.dossier):
+                if entree.name != ".verrou":
+                    _supprimer(entree.path)
+
+    # --- Lecture / écriture ---
+
+    def _lire(self, nom, charger):
+        if nom in self._memoire:
+            self._memoire.move_to_end(nom)
+            self.succes += 1
+            return self._memoire[nom]
+        chemin = os.path.join(self.dossier, nom)
+        try:
+            valeur = charger(chemin)
+            # La date de modification sert d'ordre LRU pour l'éviction sur disque
+            os.utime(chemin)
+        except (FileNotFoundError, ValueError):
+            # Absent, ou supprimé par un autre processus entre-temps
+            self.echecs += 1
+            return None
+        self.succes += 1
+        self._retenir(nom, valeur)
+        return valeur
+
+    def _retenir(self, nom, valeur):
+        self._memoire[nom] = valeur
+        self._memoire.move_to_end(nom)
+        while len(self._memoire) > self.taille_memoire:
+            self._memoire.popitem(last=False)
+
+    def _ecrire_json(self, nom, contenu):
+        with self._verrou():
+            descripteur, temporaire = tempfile.mkstemp(dir=self.dossier, suffix=".tmp")
+            try:
+                with os.fdopen(descripteur, "w") as f:
+                    json.dump(contenu, f)
+                os.replace(temporaire, os.path.join(self.dossier, nom))
+            except BaseException:
+                _supprimer(temporaire)
+                raise
+            self._evincer(garder=nom)
+
+    def _evincer(self, garder=None):
+        """
+        Supprime les fichiers les moins récemment utilisés tant que le dossier
+        dépasse taille_max ; le fichier garder (celui qu'on vient d'écrire)
+        compte dans le total mais n'est jamais supprimé.
+        """
+        fichiers = []
+        total = 0
+        for entree in os.scandir(self.dossier):
+            if entree.name == ".verrou" or entree.name.endswith(".tmp"):
+                continue
+            if entree.name == garder:
+                total += entree.stat().st_size
+                continue
+            statistiques = entree.stat()
+            fichiers.append((statistiques.st_mtime, statistiques.st_size, entree.name))
+            total += statistiques.st_size
+        if total <= self.taille_max:
+            return
+        fichiers.sort()
+        for _, taille, nom in fichiers:
+            if total <= self.taille_max:
+                break
+            _supprimer(os.path.join(self.dossier, nom))
+            self._memoire.pop(nom, None)
+            total -= taille
+
+    def _verrou(self):
+        return _Verrou(os.path.join(self.dossier, ".verrou"))
+
+
+class _Verrou:
+    """Verrou exclusif entre processus (fcntl.flock) ; sans effet si fcntl est absent."""
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self._fichier = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._fichier = open(self.chemin, "a")
+            fcntl.flock(self._fichier, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exception):
+        if self._fichier is not None:
+            fcntl.flock(self._fichier, fcntl.LOCK_UN)
+            self._fichier.close()
+            self._fichier = None
+        return False
+
+
+def _charger_json(chemin):
+    with open(chemin) as f:
+        return json.load(f)
+
+
+def _supprimer(chemin):
+    try:
+        os.remove(chemin)
+    except FileNotFoundError:
+        pass
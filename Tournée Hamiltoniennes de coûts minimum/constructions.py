@@ -0,0 +1,177 @@
+# Constructions de tournées depuis les points, sur des graphes de candidats
+# (k plus proches voisins) : sans matrice n x n, en O(n k log(n k)).
+# Elles partent plus près d'un optimum local que ppp ou OptPrim, ce qui
+# réduit le travail d'opt_ppp ensuite.
+
+import numpy as np
+
+from utils import (
+    calculer_longueur_cycle,
+    voisins_proches_points,
+    DistancesALaDemande,
+)
+from OptPrim import arbre_couvrant_minimum
+
+
+def _aretes_candidates(points, sommets, k):
+    """
+    Arêtes candidates entre les sommets donnés (tableau d'indices) : vers leurs
+    k plus proches voisins parmi ces mêmes sommets, ou toutes les paires s'ils
+    sont peu nombreux. Retourne (u, v) triés par longueur croissante, chaque
+    arête une seule fois.
+    """
+    m = len(sommets)
+    if m <= k + 1:
+        i, j = np.triu_indices(m, 1)
+    else:
+        voisins = voisins_proches_points(points[sommets], k)
+        i = np.repeat(np.arange(m), voisins.shape[1])
+        j = voisins.ravel()
+        # Chaque arête n'est gardée qu'une fois
+        garder = i < j
+        garder |= ~np.isin(i + m * j, j + m * i)
+        i, j = i[garder], j[garder]
+    u, v = sommets[i], sommets[j]
+    poids = np.hypot(points[u, 0] - points[v, 0], points[u, 1] - points[v, 1])
+    ordre = np.argsort(poids, kind="stable")
+    return u[ordre].tolist(), v[ordre].tolist()
+
+
+def glouton_aretes(points, D=None, depart=0, k=10):
+    """
+    Heuristique gloutonne des arêtes : on parcourt les arêtes candidates (vers
+    les k plus proches voisins) par longueur croissante et on garde une arête si
+    ses deux extrémités ont degré < 2 et sont dans deux fragments différents
+    (union-find : pas de sous-cycle). Les fragments restants sont reliés en
+    recommençant sur leurs seules extrémités, puis la chaîne obtenue est fermée.
+    En général 15 à 20 % au-dessus de l'optimum, contre 25 % pour ppp.
+    D (matrice ou utils.DistancesALaDemande) ne sert qu'au calcul de la longueur.
+    Retourne (cycle, longueur), le cycle commençant par depart.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    n = len(points)
+    if n <= 3:
+        return _petit_cycle(points, D, depart)
+
+    pere = list(range(n))
+
+    def racine(x):
+        while pere[x] != x:
+            pere[x] = pere[pere[x]]
+            x = pere[x]
+        return x
+
+    degre = [0] * n
+    voisins = [[] for _ in range(n)]
+    nb_aretes = 0
+    sommets = np.arange(n)
+
+    # Tant qu'il reste plusieurs fragments, on recommence sur leurs extrémités
+    while nb_aretes < n - 1:
+        u, v = _aretes_candidates(points, sommets, k)
+        avant = nb_aretes
+        for a, b in zip(u, v):
+            if degre[a] < 2 and degre[b] < 2:
+                ra, rb = racine(a), racine(b)
+                if ra != rb:
+                    pere[ra] = rb
+                    degre[a] += 1
+                    degre[b] += 1
+                    voisins[a].append(b)
+                    voisins[b].append(a)
+                    nb_aretes += 1
+                    if nb_aretes == n - 1:
+                        break
+        if nb_aretes == avant:
+            # Les k plus proches extrémités sont toutes du même fragment
+            k *= 2
+        sommets = np.flatnonzero(np.array(degre) < 2)
+
+    cycle = _parcourir_chaine(voisins, n)
+    return _finir(cycle, points, D, depart)
+
+
+def christofides(points, D=None, depart=0, k=10):
+    """
+    Construction de type Christofides :
+    1) ACM (OptPrim.arbre_couvrant_minimum, méthode "geometrique", sans D) ;
+    2) couplage des sommets de degré impair : glouton sur les arêtes candidates
+       (k plus proches voisins parmi ces sommets), au lieu du couplage parfait
+       de poids minimum, trop coûteux ici ;
+    3) circuit eulérien du multigraphe ACM + couplage (Hierholzer) ;
+    4) raccourcis : on saute les sommets déjà visités.
+    Avec le couplage glouton on perd la garantie 3/2, mais on reste en pratique
+    10 à 15 % au-dessus de l'optimum (contre 2 fois au pire pour OptPrim).
+    Retourne (cycle, longueur), le cycle commençant par depart.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    n = len(points)
+    if n <= 3:
+        return _petit_cycle(points, D, depart)
+
+    acm = arbre_couvrant_minimum(points, None, depart=depart, methode="geometrique", k=k)
+    multigraphe = [list(acm[v]) for v in range(n)]
+
+    impairs = np.array([v for v in range(n) if len(acm[v]) % 2 == 1], dtype=np.int64)
+    couple = np.zeros(n, dtype=bool)
+    while len(impairs) > 0:
+        u, v = _aretes_candidates(points, impairs, k)
+        for a, b in zip(u, v):
+            if not couple[a] and not couple[b]:
+                couple[a] = couple[b] = True
+                multigraphe[a].append(b)
+                multigraphe[b].append(a)
+        reste = impairs[~couple[impairs]]
+        if len(reste) == len(impairs):
+            k *= 2
+        impairs = reste
+
+    # Hierholzer itératif : chaque arête du multigraphe est parcourue une fois
+    restantes = [list(voisins) for voisins in multigraphe]
+    pile = [depart]
+    circuit = []
+    while pile:
+        u = pile[-1]
+        if restantes[u]:
+            v = restantes[u].pop()
+            restantes[v].remove(u)
+            pile.append(v)
+        else:
+            circuit.append(pile.pop())
+
+    # Raccourcis : on ne garde que la première visite de chaque sommet
+    vu = np.zeros(n, dtype=bool)
+    cycle = []
+    for v in circuit:
+        if not vu[v]:
+            vu[v] = True
+            cycle.append(v)
+    return _finir(cycle, points, D, depart)
+
+
+def _parcourir_chaine(voisins, n):
+    """Ordre des sommets le long d'une chaîne hamiltonienne (listes d'adjacence de degré <= 2)."""
+    debut = next(v for v in range(n) if len(voisins[v]) < 2)
+    cycle = [debut]
+    precedent, courant = -1, debut
+    while len(cycle) < n:
+        suivant = voisins[courant][0] if voisins[courant][0] != precedent else voisins[courant][1]
+        cycle.append(suivant)
+        precedent, courant = courant, suivant
+    return cycle
+
+
+def _finir(cycle, points, D, depart):
+    """Fait commencer le cycle par depart et calcule sa longueur."""
+    i = cycle.index(depart)
+    cycle = cycle[i:] + cycle[:i]
+    if D is None:
+        D = DistancesALaDemande(points)
+    return cycle, float(calculer_longueur_cycle(cycle, D))
+
+
+def _petit_cycle(points, D, depart):
+    n = len(points)
+    if n == 0:
+        return [], 0.0
+    return _finir(list(range(n)), points, D, depart if 0 <= depart < n else 0)
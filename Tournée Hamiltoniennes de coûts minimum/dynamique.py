@@ -0,0 +1,196 @@
+from collections import deque
+
+import numpy as np
+
+from utils import calculer_matrice_distances
+from ppp import ppp
+from OptPPP import EPSILON, opt_ppp
+from tournee import Tournee
+
+
+class TourneeDynamique:
+    """
+    Tournée tenue à jour pendant que des points sont ajoutés ou retirés, sans
+    tout recalculer :
+    - les points et la matrice D sont stockés dans des tableaux dont la capacité
+      est multipliée par 1.5 quand il le faut (ajouter un point calcule une
+      seule ligne de D) ;
+    - chaque point reçoit un identifiant stable (indice de sa ligne dans D),
+      réutilisé après un retrait ;
+    - un point ajouté est inséré comme dans ppp : à côté du sommet le plus
+      proche, du côté qui allonge le moins la tournée ;
+    - après chaque changement, un 2-opt local (listes de k plus proches voisins)
+      part des seuls sommets touchés.
+    Une mise à jour coûte O(n) opérations vectorisées plus quelques échanges.
+
+    t = TourneeDynamique(points)      # tournée initiale : ppp + opt_ppp
+    i = t.ajouter((0.3, 0.7))         # renvoie l'identifiant du nouveau point
+    t.retirer(i)
+    t.cycle(), t.longueur()
+    """
+
+    def __init__(self, points=None, k=8, capacite=16, examens_max=1000):
+        """
+        - points : points initiaux (tableau n x 2), résolus par ppp puis opt_ppp
+        - capacite : nombre de points prévus ; au-delà, D est recopiée dans une
+          matrice plus grande (O(capacite^2), la seule opération lente)
+        - k : taille des listes de voisins du 2-opt local
+        - examens_max : nombre maximal de sommets examinés par réparation
+        """
+        points = np.zeros((0, 2)) if points is None else np.asarray(points, dtype=np.float64)
+        n = len(points)
+        capacite = max(int(capacite), n + n // 2, 1)
+        self.k = k
+        self.examens_max = examens_max
+        self.points = np.zeros((capacite, 2), dtype=np.float64)
+        self.D = np.zeros((capacite, capacite), dtype=np.float64)
+        self.actifs = np.zeros(capacite, dtype=bool)
+        self._libres = []
+        self._prochain = n
+
+        self.points[:n] = points
+        self.actifs[:n] = True
+        calculer_matrice_distances(points, sortie=self.D[:n, :n])
+        cycle = []
+        if n > 0:
+            cycle, _ = ppp(self.D[:n, :n])
+            cycle, _ = opt_ppp(cycle, self.D[:n, :n], mode="voisins", k=k)
+        self.tournee = Tournee(cycle, taille=capacite)
+
+    def __len__(self):
+        return len(self.tournee)
+
+    def cycle(self):
+        """Identifiants des points dans l'ordre de la tournée."""
+        return self.tournee.tolist()
+
+    def longueur(self):
+        return self.tournee.longueur(self.D)
+
+    def ajouter(self, point):
+        """Ajoute un point (x, y), l'insère dans la tournée puis répare autour. Renvoie son identifiant."""
+        v = self._reserver()
+        self.points[v] = point
+        self.actifs[v] = True
+
+        # Une seule ligne (et colonne) de D à calculer
+        ecarts = self.points - self.points[v]
+        ligne = np.sqrt(ecarts[:, 0] * ecarts[:, 0] + ecarts[:, 1] * ecarts[:, 1])
+        ligne[~self.actifs] = 0.0
+        self.D[v] = ligne
+        self.D[:, v] = ligne
+
+        t = self.tournee
+        m = len(t)
+        if m < 2:
+            t.inserer(v, 0)
+            return v
+
+        # Comme dans ppp : à côté de l'ancre (sommet le plus proche), du meilleur côté
+        ancre = int(t.ordre[np.argmin(self.D[v, t.ordre])])
+        i = int(t.position[ancre])
+        if m == 2:
+            t.inserer(v, i)
+        else:
+            prec, suiv = t.predecesseur(ancre), t.successeur(ancre)
+            gain_precedent = (self.D[prec, v] + self.D[v, ancre]) - self.D[prec, ancre]
+            gain_suivant = (self.D[ancre, v] + self.D[v, suiv]) - self.D[ancre, suiv]
+            t.inserer(v, i - 1 if gain_precedent <= gain_suivant else i)
+
+        self._reparer((v, t.predecesseur(v), t.successeur(v)))
+        return v
+
+    def retirer(self, identifiant):
+        """Retire un point de la tournée (son identifiant pourra être réutilisé), puis répare autour."""
+        v = int(identifiant)
+        if not (0 <= v < len(self.actifs) and self.actifs[v]):
+            raise KeyError("Point inconnu ou déjà retiré : {}".format(identifiant))
+        t = self.tournee
+        voisins = (t.predecesseur(v), t.successeur(v)) if len(t) > 1 else ()
+        t.retirer(v)
+        self.actifs[v] = False
+        self._libres.append(v)
+        if len(t) > 3:
+            self._reparer(voisins)
+
+    def _reserver(self):
+        """Identifiant libre, en agrandissant les tableaux si besoin."""
+        if self._libres:
+            return self._libres.pop()
+        v = self._prochain
+        capacite = len(self.actifs)
+        if v == capacite:
+            nouvelle = capacite + max(capacite // 2, 16)
+            D = np.zeros((nouvelle, nouvelle), dtype=np.float64)
+            D[:capacite, :capacite] = self.D
+            self.D = D
+            self.points = np.concatenate((self.points, np.zeros((nouvelle - capacite, 2))))
+            self.actifs = np.concatenate((self.actifs, np.zeros(nouvelle - capacite, dtype=bool)))
+            self.tournee.agrandir(nouvelle)
+        self._prochain += 1
+        return v
+
+    def _reparer(self, sommets):
+        """
+        2-opt local : file des sommets touchés ; pour un sommet a, on teste les
+        échanges qui créent une arête (a, c) avec c parmi ses k plus proches
+        voisins dans la tournée (mêmes coups qu'OptPPP.opt_ppp_voisins).
+        Les extrémités des arêtes modifiées rejoignent la file.
+        """
+        t = self.tournee
+        n = len(t)
+        if n <= 3:
+            return
+        D = self.D
+        k = min(self.k, n - 1)
+        file = deque(sommets)
+        dans_file = set(sommets)
+        examens = 0
+
+        while file and examens < self.examens_max:
+            a = file.popleft()
+            dans_file.discard(a)
+            if a not in t:
+                continue
+            examens += 1
+
+            ordre = t.ordre
+            distances = D[a, ordre]
+            proches = np.argpartition(distances, k)[:k + 1]
+            proches = proches[np.argsort(distances[proches], kind="stable")]
+
+            pa = int(t.position[a])
+            succ_a = int(ordre[(pa + 1) % n])
+            pred_a = int(ordre[pa - 1])
+            d_succ = D[a, succ_a]
+            d_pred = D[pred_a, a]
+            coup = None
+
+            for pc in proches.tolist():
+                c = int(ordre[pc])
+                d_ac = D[a, c]
+                if c == a:
+                    continue
+                if d_ac >= d_succ and d_ac >= d_pred:
+                    break
+                # On retire (a, succ a) et (c, succ c), on ajoute (a, c) et (succ a, succ c)
+                if d_ac < d_succ and c != succ_a:
+                    d = int(ordre[(pc + 1) % n])
+                    if d != a and d_ac + D[succ_a, d] - d_succ - D[c, d] < -EPSILON:
+                        coup = ((pa + 1) % n, pc, (a, succ_a, c, d))
+                        break
+                # On retire (pred a, a) et (pred c, c), on ajoute (a, c) et (pred a, pred c)
+                if d_ac < d_pred and c != pred_a:
+                    d = int(ordre[pc - 1])
+                    if d != a and d_ac + D[pred_a, d] - d_pred - D[d, c] < -EPSILON:
+                        coup = (pa, (pc - 1) % n, (a, pred_a, c, d))
+                        break
+
+            if coup is None:
+                continue
+            i, j, touches = coup
+            t.inverser(i, j)
+            for v in touches:
+                if v not in dans_file:
+                    dans_file.add(v)
+                    file.append(v)
@@ -1,8 +1,13 @@
 # HDS = Branch & Bound (exact) avec borne inferieure "demi-somme"
 
 import heapq
+import time
+
+import numpy as np
+
 from utils import calculer_longueur_cycle
 from ppp import ppp
+from OptPrim import prim_dense
 
 
 def pre_calcul_voisins_tries(D):
@@ -80,22 +85,69 @@ def borne_demi_somme(D, voisins_tries, chemin, cout_partiel):
     return cout_partiel + 0.5 * somme
 
 
-def hds(D, depart=0, utiliser_ppp_comme_borne_sup=True):
+def hds(D, depart=0, utiliser_ppp_comme_borne_sup=True, borne="demi_somme", infos=None,
+        processus=None, noeuds_par_tache=None, temps_max=None, noeuds_max=None,
+        taille_tas_max=None, retourner_borne=False, instrumentation=None, cycle_initial=None):
     """
     HDS exact : Branch & Bound (best-first) + borne demi-somme.
+    D peut etre une matrice (n x n) ou utils.DistancesALaDemande.
     Retourne (meilleur_cycle, meilleure_longueur).
+
+    - borne="demi_somme" : borne demi-somme (EtatDemiSomme)
+    - borne="un_arbre" : borne de Held-Karp par 1-arbre et penalites lagrangiennes
+      (EtatUnArbre), bien plus forte mais plus couteuse par noeud
+    - infos : dictionnaire optionnel rempli avec la borne a la racine, l'ecart
+      relatif entre borne sup initiale et borne racine, le nombre de noeuds developpes,
+      la borne inferieure prouvee a l'arret (borne_inf), l'ecart prouve (ecart)
+      et le statut ("optimal", "temps", "noeuds" ou "arret")
+    - processus : si > 1, l'arbre est reparti sur un pool de processus (voir _hds_parallele)
+    - noeuds_par_tache : en parallele, nombre de noeuds developpes par tache avant
+      de rendre les noeuds restants au pool (par defaut selon la borne)
+    - cycle_initial : tournee deja connue (par exemple lue dans cache.CacheDisque),
+      utilisee comme borne sup initiale si elle est meilleure que celle de PPP
+
+    Mode budgete (toutes les limites sont optionnelles) :
+    - temps_max : duree maximale de la recherche en secondes
+    - noeuds_max : nombre maximal de noeuds developpes (approximatif en parallele)
+    - taille_tas_max : taille maximale du tas ; au-dela, le noeud extrait est
+      explore en profondeur (pile de taille O(n^2)) avant de reprendre le best-first
+    - retourner_borne : si True, retourne (meilleur_cycle, meilleure_longueur, borne_inf)
+    Si une limite est atteinte, le cycle est le meilleur trouve et borne_inf
+    la plus petite borne des noeuds non explores : l'optimum est dans
+    [borne_inf, meilleure_longueur]. Sinon borne_inf = meilleure_longueur.
+
+    - instrumentation : instrumentation.Instrumentation optionnelle, ajoutee a la
+      fin du resultat ; compteurs noeuds_ajoutes / noeuds_extraits / noeuds_developpes,
+      elagues_borne (a l'extraction), fils_elagues_cout / fils_elagues_borne,
+      maximum taille_tas, serie meilleure_longueur (ameliorations au cours du temps).
+      Son rappel recoit regulierement l'etat de la recherche ; s'il demande
+      l'arret, on rend la meilleure tournee connue (statut "arret").
+
+    Chaque noeud porte un etat compact (voir EtatDemiSomme) : la borne d'un fils
+    se deduit de celle du pere (O(n) au pire par noeud developpe, partage entre
+    ses fils) au lieu de tout recalculer, et le chemin est une liste chainee
+    vers le pere (pas de copie).
     """
     n = int(D.shape[0])
 
-    if n == 0:
-        return [], 0.0
-    if n == 1:
-        return [0], 0.0
-    if n == 2:
-        cycle = [depart, 1 - depart] if depart in (0, 1) else [0, 1]
-        return cycle, float(calculer_longueur_cycle(cycle, D))
-
-    voisins_tries = pre_calcul_voisins_tries(D)
+    if n <= 2:
+        if n == 0:
+            cycle, longueur = [], 0.0
+        elif n == 1:
+            cycle, longueur = [0], 0.0
+        else:
+            cycle = [depart, 1 - depart] if depart in (0, 1) else [0, 1]
+            longueur = float(calculer_longueur_cycle(cycle, D))
+        if infos is not None:
+            infos.update(borne_inf=longueur, ecart=0.0, statut="optimal", noeuds_developpes=0)
+        resultat = (cycle, longueur, longueur) if retourner_borne else (cycle, longueur)
+        return resultat if instrumentation is None else resultat + (instrumentation,)
+
+    debut = time.perf_counter()
+    # Echeance sur l'horloge monotone (commune a tous les processus)
+    echeance = None if temps_max is None else time.monotonic() + temps_max
+
+    bornes = _creer_bornes(D, depart, borne)
 
     # Borne superieure (meilleure solution complete connue)
     meilleure_longueur = float("inf")
@@ -106,54 +158,606 @@ def hds(D, depart=0, utiliser_ppp_comme_borne_sup=True):
         cycle0, l0 = ppp(D, depart=depart)
         meilleur_cycle = cycle0
         meilleure_longueur = float(l0)
+    if cycle_initial is not None and len(cycle_initial) == n:
+        # Demarrage a chaud : la tournee connue est tournee pour commencer par depart
+        i = list(cycle_initial).index(depart)
+        cycle0 = [int(v) for v in cycle_initial[i:]] + [int(v) for v in cycle_initial[:i]]
+        l0 = float(calculer_longueur_cycle(cycle0, D))
+        if l0 < meilleure_longueur:
+            meilleur_cycle = cycle0
+            meilleure_longueur = l0
+    if instrumentation is not None and meilleur_cycle is not None:
+        instrumentation.noter("meilleure_longueur", meilleure_longueur)
+    bornes.borne_sup = meilleure_longueur
 
     # File de priorite : on explore d'abord les noeuds ayant la plus petite borne inf
-    # (borne_inf, cout_partiel, chemin, masque_visite)
-    masque_depart = 1 << depart
-    chemin_depart = [depart]
-    cout_depart = 0.0
-    borne_depart = borne_demi_somme(D, voisins_tries, chemin_depart, cout_depart)
+    # (borne_inf, cout_partiel, compteur, noeud) ; le compteur departage les egalites
+    # noeud = (dernier, masque_visite, taille_chemin, chemin_lie, etat_borne)
+    # chemin_lie = (sommet, chemin_lie_du_pere), None a la racine
+    etat_depart = bornes.etat_racine()
+    borne_depart = bornes.borne(0.0, etat_depart)
+
+    if infos is not None:
+        infos["borne_racine"] = float(borne_depart)
+        infos["longueur_initiale"] = meilleure_longueur
+        if meilleure_longueur == float("inf"):
+            infos["ecart_racine"] = float("inf")
+        else:
+            infos["ecart_racine"] = float((meilleure_longueur - borne_depart) / meilleure_longueur) \
+                if meilleure_longueur > 0 else 0.0
+
+    racine = (borne_depart, 0.0, (depart, 1 << depart, 1, (depart, None), etat_depart))
+
+    if processus is not None and processus > 1:
+        meilleur_cycle, meilleure_longueur, developpes, borne_inf, statut = _hds_parallele(
+            D, depart, borne, bornes, racine, meilleur_cycle, meilleure_longueur,
+            processus, noeuds_par_tache, echeance, noeuds_max, taille_tas_max, instrumentation,
+        )
+    else:
+        tas = [(racine[0], racine[1], 0, racine[2])]
+        cycle, longueur, developpes, statut = _explorer(
+            bornes, tas, meilleure_longueur, noeuds_max=noeuds_max,
+            echeance=echeance, taille_tas_max=taille_tas_max, instrumentation=instrumentation,
+        )
+        if cycle is not None:
+            meilleur_cycle, meilleure_longueur = cycle, longueur
+        borne_inf = tas[0][0] if tas else float("inf")
 
-    tas = []
-    heapq.heappush(tas, (borne_depart, cout_depart, chemin_depart, masque_depart))
+    if meilleur_cycle is None:
+        meilleur_cycle, meilleure_longueur = ppp(D, depart=depart)
 
-    while tas:
-        borne, cout_partiel, chemin, masque = heapq.heappop(tas)
+    # Un cycle optimal et son inverse ont la meme longueur mais pas la meme somme
+    # flottante : on fixe le sens et on recalcule, pour un resultat identique
+    # en serie et en parallele
+    if meilleur_cycle[1] > meilleur_cycle[-1]:
+        meilleur_cycle = meilleur_cycle[:1] + meilleur_cycle[:0:-1]
+    meilleure_longueur = float(calculer_longueur_cycle(meilleur_cycle, D))
+
+    # Les noeuds restants dont la borne depasse la meilleure longueur ne comptent pas
+    borne_inf = float(min(borne_inf, meilleure_longueur))
+    if borne_inf >= meilleure_longueur:
+        statut = "optimal"
+
+    if infos is not None:
+        infos["noeuds_developpes"] = developpes
+        infos["borne_inf"] = borne_inf
+        infos["ecart"] = (meilleure_longueur - borne_inf) / meilleure_longueur if meilleure_longueur > 0 else 0.0
+        infos["statut"] = statut
+
+    resultat = (meilleur_cycle, meilleure_longueur, borne_inf) if retourner_borne \
+        else (meilleur_cycle, meilleure_longueur)
+    if instrumentation is not None:
+        instrumentation.ajouter_duree("hds", time.perf_counter() - debut)
+        return resultat + (instrumentation,)
+    return resultat
+
+
+def _creer_bornes(D, depart, borne):
+    if borne == "demi_somme":
+        return EtatDemiSomme(D, depart)
+    if borne == "un_arbre":
+        return EtatUnArbre(D, depart)
+    raise ValueError("Borne inconnue : {} (attendu 'demi_somme' ou 'un_arbre')".format(borne))
+
+
+def _developper(bornes, noeud, cout_partiel, meilleure_longueur, instrumentation=None):
+    """Fils (borne, cout, noeud) d'un noeud non complet dont la borne est < meilleure_longueur."""
+    dernier, masque, m, chemin, etat = noeud
+    Dl = bornes.Dl
+    fils = []
+
+    # Brancher : on tente d'ajouter un sommet non visite
+    # On prend les candidats dans l'ordre des plus proches (souvent efficace)
+    commun = None
+    for prochain in bornes.voisins_tries[dernier]:
+        if (masque >> prochain) & 1:
+            continue
+
+        nouveau_cout = cout_partiel + Dl[dernier][prochain]
+        if nouveau_cout >= meilleure_longueur:
+            if instrumentation is not None:
+                instrumentation.compter("fils_elagues_cout")
+            continue
+
+        if commun is None:
+            commun = bornes.preparer_fils(etat, dernier, m, masque)
+        nouvel_etat = bornes.etat_fils(commun, dernier, prochain)
+        if nouvel_etat is None:
+            continue
+
+        nouvelle_borne = bornes.borne(nouveau_cout, nouvel_etat)
+        if nouvelle_borne >= meilleure_longueur:
+            if instrumentation is not None:
+                instrumentation.compter("fils_elagues_borne")
+            continue
+
+        fils.append((nouvelle_borne, nouveau_cout,
+                     (prochain, masque | (1 << prochain), m + 1, (prochain, chemin), nouvel_etat)))
+    return fils
+
+
+def _explorer(bornes, tas, meilleure_longueur, partage=None, noeuds_max=None,
+              echeance=None, taille_tas_max=None, instrumentation=None):
+    """
+    Best-first sur le tas (modifie sur place) tant qu'il reste des noeuds.
+    - noeuds_max / echeance (instant time.monotonic) : on s'arrete avant d'en
+      depasser un ; le tas contient alors tous les noeuds non explores.
+    - taille_tas_max : si les fils ne tiennent plus dans le tas, le sous-arbre du
+      noeud courant est explore en profondeur sur une pile (meilleur fils d'abord).
+    partage : valeur partagee entre processus (multiprocessing.Value) contenant la
+    meilleure longueur connue par tous ; on s'en sert pour elaguer et on la met a jour.
+    instrumentation : voir hds ; son rappel est consulte tous les 1024 noeuds developpes.
+    Retourne (cycle, longueur, noeuds_developpes, statut) ; cycle vaut None si on
+    n'a rien trouve de mieux que meilleure_longueur, statut vaut "optimal" si
+    tout a ete explore, sinon "noeuds", "temps" ou "arret".
+    """
+    n = bornes.n
+    depart = bornes.depart
+    Dl = bornes.Dl
+    meilleur_cycle = None
+    compteur = max((entree[2] for entree in tas), default=0)
+    developpes = 0
+    statut = "optimal"
+    pile = []
+
+    while tas or pile:
+        if partage is not None and partage.value < meilleure_longueur:
+            meilleure_longueur = partage.value
+            bornes.borne_sup = meilleure_longueur
+
+        if noeuds_max is not None and developpes >= noeuds_max:
+            statut = "noeuds"
+            break
+        if echeance is not None and time.monotonic() >= echeance:
+            statut = "temps"
+            break
+        if instrumentation is not None and developpes % 1024 == 0 and developpes > 0:
+            if instrumentation.progression(noeuds_developpes=developpes, meilleure_longueur=meilleure_longueur,
+                                           borne_min=tas[0][0] if tas else None, taille_tas=len(tas)):
+                statut = "arret"
+                break
+
+        if pile:
+            borne, cout_partiel, _, noeud = pile.pop()
+        else:
+            borne, cout_partiel, _, noeud = heapq.heappop(tas)
+
+        if instrumentation is not None:
+            instrumentation.compter("noeuds_extraits")
 
         # Elagage : si meme la borne inf depasse la meilleure solution, on coupe
         if borne >= meilleure_longueur:
+            if instrumentation is not None:
+                instrumentation.compter("elagues_borne")
             continue
 
-        dernier = chemin[-1]
+        dernier, masque, m, chemin, etat = noeud
 
         # Si on a visite tous les sommets, on ferme le cycle
-        if len(chemin) == n:
-            total = cout_partiel + D[dernier, depart]
+        if m == n:
+            total = cout_partiel + Dl[dernier][depart]
             if total < meilleure_longueur:
                 meilleure_longueur = float(total)
-                meilleur_cycle = list(chemin)
+                meilleur_cycle = _deplier_chemin(chemin)
+                bornes.borne_sup = meilleure_longueur
+                if instrumentation is not None:
+                    instrumentation.noter("meilleure_longueur", meilleure_longueur)
+                if partage is not None:
+                    with partage.get_lock():
+                        if total < partage.value:
+                            partage.value = total
             continue
 
-        # Brancher : on tente d'ajouter un sommet non visite
-        # On prend les candidats dans l'ordre des plus proches (souvent efficace)
-        for prochain in voisins_tries[dernier]:
-            if (masque >> prochain) & 1:
-                continue
+        developpes += 1
+        fils = _developper(bornes, noeud, cout_partiel, meilleure_longueur, instrumentation)
 
-            nouveau_cout = cout_partiel + D[dernier, prochain]
-            if nouveau_cout >= meilleure_longueur:
-                continue
+        if pile or (taille_tas_max is not None and len(tas) + len(fils) > taille_tas_max):
+            # Tas plein : on termine ce sous-arbre en profondeur, meilleur fils au sommet de la pile
+            fils.sort(key=lambda f: f[0], reverse=True)
+            for nouvelle_borne, nouveau_cout, f in fils:
+                compteur += 1
+                pile.append((nouvelle_borne, nouveau_cout, compteur, f))
+        else:
+            for nouvelle_borne, nouveau_cout, f in fils:
+                compteur += 1
+                heapq.heappush(tas, (nouvelle_borne, nouveau_cout, compteur, f))
+
+        if instrumentation is not None:
+            instrumentation.compter("noeuds_ajoutes", len(fils))
+            instrumentation.maximum("taille_tas", len(tas) + len(pile))
 
-            nouveau_chemin = chemin + [prochain]
-            nouveau_masque = masque | (1 << prochain)
+    # Les noeuds de la pile restent a explorer : on les rend au tas
+    for entree in pile:
+        heapq.heappush(tas, entree)
 
-            nouvelle_borne = borne_demi_somme(D, voisins_tries, nouveau_chemin, nouveau_cout)
-            if nouvelle_borne >= meilleure_longueur:
+    if instrumentation is not None:
+        instrumentation.compter("noeuds_developpes", developpes)
+
+    return meilleur_cycle, meilleure_longueur, developpes, statut
+
+
+# Etat des processus du pool parallele (rempli par _initialiser_processus)
+_BORNES_PROCESSUS = None
+_PARTAGE_PROCESSUS = None
+
+
+def _initialiser_processus(D, depart, borne, partage):
+    global _BORNES_PROCESSUS, _PARTAGE_PROCESSUS
+    _BORNES_PROCESSUS = _creer_bornes(D, depart, borne)
+    _PARTAGE_PROCESSUS = partage
+
+
+def _tache_parallele(noeuds, noeuds_max, echeance=None, taille_tas_max=None):
+    """Explore un groupe de noeuds ; renvoie (cycle, longueur, developpes, noeuds non explores)."""
+    bornes = _BORNES_PROCESSUS
+    partage = _PARTAGE_PROCESSUS
+    meilleure_longueur = partage.value
+    bornes.borne_sup = meilleure_longueur
+    tas = [(b, c, i, noeud) for i, (b, c, noeud) in enumerate(noeuds)]
+    heapq.heapify(tas)
+    cycle, longueur, developpes, _ = _explorer(bornes, tas, meilleure_longueur, partage, noeuds_max,
+                                               echeance, taille_tas_max)
+    restants = [(b, c, noeud) for b, c, _, noeud in tas if b < partage.value]
+    return cycle, longueur, developpes, restants
+
+
+def _repartir(noeuds, nb_groupes):
+    """Repartit les noeuds (tries par borne) en groupes equilibres, a tour de role."""
+    noeuds = sorted(noeuds, key=lambda entree: entree[0])
+    groupes = [noeuds[i::nb_groupes] for i in range(nb_groupes)]
+    return [g for g in groupes if g]
+
+
+def _hds_parallele(D, depart, borne, bornes, racine, meilleur_cycle, meilleure_longueur,
+                   processus, noeuds_par_tache, echeance=None, noeuds_max=None, taille_tas_max=None,
+                   instrumentation=None):
+    """
+    Branch & Bound reparti sur un pool de processus :
+    - on developpe l'arbre en largeur depuis depart (on fixe les premieres aretes)
+      jusqu'a avoir plusieurs sous-problemes par processus ;
+    - chaque tache explore un groupe de sous-problemes en best-first, en elaguant
+      avec la meilleure longueur partagee (multiprocessing.Value) que tous mettent a jour ;
+    - une tache s'arrete apres noeuds_par_tache noeuds et rend ses noeuds restants,
+      redecoupes en nouvelles taches : un sous-arbre tres gros est ainsi reparti
+      entre les processus libres au lieu de bloquer un seul processus.
+    Une fois l'echeance ou noeuds_max atteints (ou l'arret demande par le rappel
+    de l'instrumentation, consulte a chaque fin de tache), les noeuds rendus ne
+    sont plus resoumis et servent a calculer la borne inferieure.
+    L'instrumentation ne compte que ce que voit le processus principal
+    (noeuds developpes, taches, ameliorations).
+    Retourne (cycle, longueur, developpes, borne_inf, statut).
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+    if noeuds_par_tache is None:
+        noeuds_par_tache = 20000 if borne == "demi_somme" else 200
+
+    # 1) Sous-problemes : developpement en largeur depuis la racine
+    n = bornes.n
+    frontiere = [racine]
+    developpes = 0
+    while 0 < len(frontiere) < 4 * processus and any(noeud[2] < n for _, _, noeud in frontiere):
+        suivante = []
+        for b, c, noeud in frontiere:
+            if b >= meilleure_longueur:
                 continue
+            if noeud[2] == n:
+                suivante.append((b, c, noeud))
+                continue
+            developpes += 1
+            suivante.extend(_developper(bornes, noeud, c, meilleure_longueur))
+        frontiere = suivante
+
+    Dm = np.array(bornes.Dl, dtype=np.float64)
+    partage = multiprocessing.Value("d", meilleure_longueur)
+    en_attente = _repartir(frontiere, 4 * processus)
+    # tache -> nombre de noeuds qui lui est accorde (pour ne pas depasser noeuds_max)
+    en_cours = {}
+
+    def lancer(pool, developpes):
+        """Soumet les groupes en attente tant que le budget le permet."""
+        while en_attente:
+            if echeance is not None and time.monotonic() >= echeance:
+                return
+            if instrumentation is not None and instrumentation.arret_demande:
+                return
+            taille = noeuds_par_tache
+            if noeuds_max is not None:
+                taille = min(taille, noeuds_max - developpes - sum(en_cours.values()))
+                if taille <= 0:
+                    return
+            # Best-first aussi entre les groupes : celui qui contient la plus petite borne
+            i = min(range(len(en_attente)), key=lambda i: en_attente[i][0][0])
+            tache = pool.submit(_tache_parallele, en_attente.pop(i), taille, echeance, taille_tas_max)
+            en_cours[tache] = taille
+            if instrumentation is not None:
+                instrumentation.compter("taches")
+
+    # 2) Exploration parallele avec redistribution des noeuds restants
+    with ProcessPoolExecutor(max_workers=processus, initializer=_initialiser_processus,
+                             initargs=(Dm, depart, borne, partage)) as pool:
+        lancer(pool, developpes)
+        while en_cours:
+            finies, _ = wait(list(en_cours), return_when=FIRST_COMPLETED)
+            for tache in finies:
+                del en_cours[tache]
+                cycle, longueur, nb, restants = tache.result()
+                developpes += nb
+                if cycle is not None and longueur < meilleure_longueur:
+                    meilleur_cycle, meilleure_longueur = cycle, longueur
+                    if instrumentation is not None:
+                        instrumentation.noter("meilleure_longueur", meilleure_longueur)
+                if restants:
+                    libres = max(1, processus - len(en_cours))
+                    en_attente.extend(_repartir(restants, 2 * libres))
+            if instrumentation is not None:
+                instrumentation.progression(noeuds_developpes=developpes, meilleure_longueur=meilleure_longueur,
+                                            taches_en_cours=len(en_cours))
+            lancer(pool, developpes)
+
+    # Les groupes jamais soumis sont les noeuds non explores a l'arret
+    abandonnes = [entree for groupe in en_attente for entree in groupe if entree[0] < meilleure_longueur]
+    borne_inf = min((b for b, _, _ in abandonnes), default=float("inf"))
+    if instrumentation is not None:
+        instrumentation.compter("noeuds_developpes", developpes)
+    if not abandonnes:
+        statut = "optimal"
+    elif instrumentation is not None and instrumentation.arret_demande:
+        statut = "arret"
+    elif echeance is not None and time.monotonic() >= echeance:
+        statut = "temps"
+    else:
+        statut = "noeuds"
+    return meilleur_cycle, meilleure_longueur, developpes, borne_inf, statut
+
+
+def _deplier_chemin(chemin):
+    """Transforme la liste chainee (sommet, pere) en liste, du depart au dernier sommet."""
+    sommets = []
+    while chemin is not None:
+        sommets.append(chemin[0])
+        chemin = chemin[1]
+    return sommets[::-1]
+
+
+class EtatDemiSomme:
+    """
+    Borne demi-somme incrementale (meme valeur que borne_demi_somme).
+    Pour un chemin partiel depart -> ... -> dernier, les sommets internes ont
+    deja leur degre 2 et sont exclus ; chaque sommet non visite prend ses deux
+    plus petites aretes vers des sommets non internes, chaque extremite sa plus
+    petite arete autorisee.
+    L'etat d'un noeud est (p1, p2, somme_libres, second, total) :
+    - p1[v], p2[v] : positions dans voisins_tries[v] des deux plus proches sommets
+      autorises pour v non visite ;
+    - somme_libres : somme de ces deux aretes sur les sommets non visites ;
+    - second : sommet qui suit depart dans le chemin (-1 a la racine) ;
+    - total : somme des aretes de la borne (libres + extremites).
+    Les fils d'un noeud ont tous les memes sommets internes (dernier le devient) :
+    preparer_fils fait une seule fois la mise a jour de p1 / p2, en n'avancant que
+    les sommets dont p1 ou p2 pointait sur dernier, et les fils partagent ces listes.
+    """
+
+    def __init__(self, D, depart):
+        n = int(D.shape[0])
+        self.n = n
+        self.depart = depart
+        self.borne_sup = float("inf")
+        self.Dl = [[float(D[v, u]) for u in range(n)] for v in range(n)]
+        self.voisins_tries = pre_calcul_voisins_tries(D)
+        # par_rang[u] = couples (position de u dans voisins_tries[v], v), tries par position
+        self.par_rang = [[] for _ in range(n)]
+        for v in range(n):
+            for r, u in enumerate(self.voisins_tries[v]):
+                self.par_rang[u].append((r, v))
+        for liste in self.par_rang:
+            liste.sort()
+
+    def etat_racine(self):
+        n = self.n
+        Dl = self.Dl
+        vt = self.voisins_tries
+        somme = 0.0
+        for v in range(n):
+            if v != self.depart:
+                somme += Dl[v][vt[v][0]] + Dl[v][vt[v][1]]
+        d = self.depart
+        # A la racine, depart n'a encore aucune arete : ses deux plus petites
+        total = somme + Dl[d][vt[d][0]] + Dl[d][vt[d][1]]
+        return ([0] * n, [1] * n, somme, -1, total)
+
+    def borne(self, cout_partiel, etat):
+        """Borne demi-somme du noeud a partir de son etat."""
+        return cout_partiel + 0.5 * etat[4]
+
+    def preparer_fils(self, etat, dernier, m, masque):
+        """
+        Partie commune aux fils d'un noeud (chemin de m sommets finissant en dernier) :
+        (p1, p2, somme_libres, second, internes, terme_depart, bloques), ou bloques
+        liste les sommets libres qui n'ont plus deux aretes possibles.
+        """
+        p1, p2, somme, second = etat[:4]
+        depart = self.depart
+
+        if m < 2:
+            # Depart n'est pas interne : rien ne change, le terme de depart depend du fils
+            return (p1, p2, somme, second, 0, None, ())
+
+        Dl = self.Dl
+        vt = self.voisins_tries
+        internes = masque & ~(1 << depart)
+        bloques = []
+        copie = False
+        fin_liste = self.n - 1
+
+        # p2[v] <= 1 + nombre de sommets internes <= m - 1 : inutile de regarder plus loin
+        for rang_dernier, v in self.par_rang[dernier]:
+            if rang_dernier > m - 1:
+                break
+            if (masque >> v) & 1 or rang_dernier > p2[v]:
+                continue
+            if not copie:
+                p1, p2 = list(p1), list(p2)
+                copie = True
+            liste = vt[v]
+            somme -= Dl[v][liste[p1[v]]] + Dl[v][liste[p2[v]]]
+            if rang_dernier == p1[v]:
+                p1[v] = p2[v]
+            q = p2[v] + 1
+            while q < fin_liste and (internes >> liste[q]) & 1:
+                q += 1
+            if q == fin_liste:
+                # v ne peut plus atteindre le degre 2, sauf s'il devient l'extremite du chemin
+                bloques.append(v)
+                continue
+            p2[v] = q
+            somme += Dl[v][liste[p1[v]]] + Dl[v][liste[q]]
+
+        terme_depart = self._plus_petite(depart, internes | (1 << second))
+        return (p1, p2, somme, second, internes, terme_depart, bloques)
+
+    def etat_fils(self, commun, dernier, prochain):
+        """
+        Etat du fils obtenu en ajoutant l'arete dernier -> prochain,
+        ou None si un sommet ne peut plus atteindre le degre 2.
+        """
+        p1, p2, somme, second, internes, terme_depart, bloques = commun
+
+        if bloques:
+            if len(bloques) > 1 or bloques[0] != prochain:
+                return None
+        else:
+            # prochain n'est plus libre
+            liste = self.voisins_tries[prochain]
+            Dl_p = self.Dl[prochain]
+            somme -= Dl_p[liste[p1[prochain]]] + Dl_p[liste[p2[prochain]]]
+
+        if second == -1:
+            second = prochain
+            terme_depart = self._plus_petite(self.depart, 1 << prochain)
+
+        # Extremites : plus petite arete autorisee (sans l'arete deja fixee)
+        terme_fin = self._plus_petite(prochain, internes | (1 << dernier))
+        if terme_depart is None or terme_fin is None:
+            return None
+
+        return (p1, p2, somme, second, somme + terme_depart + terme_fin)
+
+    def _plus_petite(self, v, interdits):
+        Dl_v = self.Dl[v]
+        for u in self.voisins_tries[v]:
+            if not (interdits >> u) & 1:
+                return Dl_v[u]
+        return None
+
+
+class EtatUnArbre:
+    """
+    Borne de Held-Karp (1-arbre lagrangien) pour le chemin depart -> ... -> dernier.
+    Il reste a relier dernier a depart par un chemin passant par tous les sommets
+    libres U : c'est un arbre couvrant de U plus une arete de dernier vers U et
+    une de depart vers U, ou chaque sommet de U a degre 2. On relache la contrainte
+    de degre avec des penalites pi (poids D[u, v] + pi[u] + pi[v]) :
+        L(pi) = ACM_pi(U) + min_u (D[depart, u] + pi[u]) + min_u (D[dernier, u] + pi[u]) - 2 somme pi
+    est une borne inferieure pour tout pi, qu'on augmente par sous-gradient
+    (pi[u] += pas * (degre(u) - 2)). A la racine c'est le 1-arbre classique.
+    L'etat d'un noeud est (pi, L) ; un fils repart des pi de son pere.
+    L'ACM est calcule par prim_dense (OptPrim).
+    """
 
-            heapq.heappush(tas, (nouvelle_borne, nouveau_cout, nouveau_chemin, nouveau_masque))
+    # Nombre d'iterations de sous-gradient a la racine et pour chaque fils
+    ITERATIONS_RACINE = 100
+    ITERATIONS_FILS = 10
+
+    def __init__(self, D, depart):
+        n = int(D.shape[0])
+        self.n = n
+        self.depart = depart
+        self.borne_sup = float("inf")
+        self.Dl = [[float(D[v, u]) for u in range(n)] for v in range(n)]
+        self.Dm = np.array(self.Dl, dtype=np.float64)
+        self.voisins_tries = pre_calcul_voisins_tries(D)
+
+    def etat_racine(self):
+        return self._optimiser(np.zeros(self.n), 1 << self.depart, self.depart, self.ITERATIONS_RACINE)
+
+    def borne(self, cout_partiel, etat):
+        return cout_partiel + etat[1]
+
+    def preparer_fils(self, etat, dernier, m, masque):
+        return (etat[0], masque)
+
+    def etat_fils(self, commun, dernier, prochain):
+        pi, masque = commun
+        return self._optimiser(pi.copy(), masque | (1 << prochain), prochain, self.ITERATIONS_FILS)
+
+    def _optimiser(self, pi, masque, dernier, iterations):
+        """Sous-gradient sur pi (modifie sur place) ; renvoie (pi, meilleure borne L)."""
+        n = self.n
+        Dm = self.Dm
+        depart = self.depart
+        libres = np.array([v for v in range(n) if not (masque >> v) & 1], dtype=np.int64)
+        k = len(libres)
+
+        if k == 0:
+            return pi, Dm[dernier, depart]
+        if k == 1:
+            u = libres[0]
+            return pi, Dm[dernier, u] + Dm[u, depart]
+
+        sous_matrice = Dm[np.ix_(libres, libres)]
+        d_depart = Dm[depart, libres]
+        d_dernier = Dm[dernier, libres]
+        racine = dernier == depart
+
+        meilleure = -np.inf
+        meilleur_pi = pi.copy()
+        pas = 2.0
+        sans_progres = 0
+
+        for _ in range(iterations):
+            p = pi[libres]
+            W = sous_matrice + p[:, None] + p[None, :]
+            parent, _ = prim_dense(W, 0)
+            enfants = np.arange(1, k)
+            poids_arbre = W[parent[1:], enfants].sum()
+            degres = np.bincount(parent[1:], minlength=k) + 1
+            degres[0] -= 1
+
+            if racine:
+                # Deux aretes distinctes depuis depart (1-arbre)
+                e = d_depart + p
+                a, b = np.argpartition(e, 1)[:2]
+                extremites = e[a] + e[b]
+            else:
+                e_a = d_depart + p
+                e_b = d_dernier + p
+                a = int(np.argmin(e_a))
+                b = int(np.argmin(e_b))
+                extremites = e_a[a] + e_b[b]
+            degres[a] += 1
+            degres[b] += 1
+
+            L = poids_arbre + extremites - 2.0 * p.sum()
+            if L > meilleure:
+                meilleure = L
+                meilleur_pi[:] = pi
+                sans_progres = 0
+            else:
+                sans_progres += 1
+                if sans_progres >= 3:
+                    pas *= 0.5
+                    sans_progres = 0
+
+            sous_gradient = degres - 2
+            norme = float(sous_gradient @ sous_gradient)
+            # Degres tous egaux a 2 : le 1-arbre est un chemin, la borne est exacte
+            if norme == 0 or L >= self.borne_sup:
+                break
 
-    if meilleur_cycle is None:
-        meilleur_cycle, meilleure_longueur = ppp(D, depart=depart)
+            cible = self.borne_sup if self.borne_sup < np.inf else 1.05 * L
+            pi[libres] += pas * (cible - L) / norme * sous_gradient
 
-    return meilleur_cycle, float(meilleure_longueur)
+        # Petite marge pour que les arrondis ne coupent jamais une solution optimale
+        return meilleur_pi, meilleure - 1e-9 * max(1.0, abs(meilleure))
@@ -0,0 +1,131 @@
+# Held-Karp = programmation dynamique exacte sur les sous-ensembles (bitmask)
+
+import numpy as np
+
+from utils import calculer_longueur_cycle
+
+# Au-dela de cette taille (en octets), les couts sont stockes en float32
+MEMOIRE_FLOAT64_MAX = 512 * 1024 * 1024
+
+# Memoire maximale acceptee par defaut pour les tables (cout + parent)
+MEMOIRE_MAX_HELD_KARP = 4 * 1024 * 1024 * 1024
+
+
+def types_held_karp(n):
+    """
+    Types choisis pour les tables de n sommets : (type des couts, type des parents).
+    Les couts sont en float64 tant que la table tient sous MEMOIRE_FLOAT64_MAX, sinon en float32
+    (les choix se font alors a l'arrondi float32 pres ; la longueur renvoyee est recalculee sur D).
+    Les parents sont des indices de sommet : le plus petit entier qui suffit.
+    """
+    m = max(n - 1, 1)
+    cases = (1 << m) * m
+    type_cout = np.float64 if cases * 8 <= MEMOIRE_FLOAT64_MAX else np.float32
+    type_parent = np.int8 if m <= 127 else np.int16
+    return type_cout, type_parent
+
+
+def estimer_memoire_held_karp(n):
+    """Memoire (en octets) des tables cout + parent pour n sommets."""
+    m = max(n - 1, 1)
+    type_cout, type_parent = types_held_karp(n)
+    cases = (1 << m) * m
+    return cases * (np.dtype(type_cout).itemsize + np.dtype(type_parent).itemsize)
+
+
+def held_karp(D, depart=0, memoire_max=MEMOIRE_MAX_HELD_KARP, instrumentation=None):
+    """
+    Held-Karp exact : C[S, j] = plus court chemin partant de depart, visitant
+    exactement l'ensemble S (sommets autres que depart) et finissant en j.
+    Les ensembles sont traites par taille croissante ; pour une taille donnee
+    et un sommet final j, tous les ensembles sont calcules d'un coup avec numpy.
+    Temps O(2^n n^2), memoire O(2^n n) : utilisable jusqu'a n = 20-22.
+    Leve MemoryError (avec l'estimation) si les tables depassent memoire_max.
+    instrumentation : instrumentation.Instrumentation optionnelle, son rappel est
+    consulte apres chaque taille d'ensemble ; s'il demande l'arret, on rend le
+    meilleur chemin deja calcule complete par le plus proche voisin (tournee
+    non optimale) et l'on retourne (cycle, longueur, instrumentation).
+    Retourne (meilleur_cycle, meilleure_longueur).
+    """
+    n = int(D.shape[0])
+
+    if n == 0:
+        return [], 0.0
+    if n == 1:
+        return [0], 0.0
+    if n == 2:
+        cycle = [depart, 1 - depart] if depart in (0, 1) else [0, 1]
+        return cycle, float(calculer_longueur_cycle(cycle, D))
+
+    memoire = estimer_memoire_held_karp(n)
+    if memoire > memoire_max:
+        raise MemoryError(
+            "Held-Karp sur n={} demande environ {:.1f} Mo pour ses tables (limite {:.1f} Mo).".format(
+                n, memoire / 2**20, memoire_max / 2**20
+            )
+        )
+
+    type_cout, type_parent = types_held_karp(n)
+
+    # Les m sommets autres que depart sont renumerotes 0..m-1 (bit j <-> autres[j])
+    autres = [v for v in range(n) if v != depart]
+    m = n - 1
+    Dm = np.array([[D[u, v] for v in autres] for u in autres], dtype=type_cout)
+    depuis_depart = np.array([D[depart, v] for v in autres], dtype=type_cout)
+    vers_depart = np.array([D[v, depart] for v in autres], dtype=type_cout)
+
+    nb_ensembles = 1 << m
+    cout = np.full((nb_ensembles, m), np.inf, dtype=type_cout)
+    parent = np.full((nb_ensembles, m), -1, dtype=type_parent)
+
+    singletons = 1 << np.arange(m)
+    cout[singletons, np.arange(m)] = depuis_depart
+
+    ensembles = np.arange(nb_ensembles, dtype=np.int64)
+    taille = np.zeros(nb_ensembles, dtype=np.int64)
+    for j in range(m):
+        taille += (ensembles >> j) & 1
+
+    de_taille_t = singletons
+    for t in range(2, m + 1):
+        if instrumentation is not None and instrumentation.progression(taille=t - 1, m=m):
+            break
+        de_taille_t = ensembles[taille == t]
+        for j in range(m):
+            S = de_taille_t[(de_taille_t >> j) & 1 == 1]
+            precedent = S ^ (1 << j)
+            # cout[precedent, k] vaut inf si k n'est pas dans precedent
+            candidats = cout[precedent] + Dm[:, j]
+            k = np.argmin(candidats, axis=1)
+            cout[S, j] = candidats[np.arange(len(S)), k]
+            parent[S, j] = k
+
+    if instrumentation is not None and instrumentation.arret_demande:
+        # Arret : meilleur chemin parmi les ensembles de la derniere taille calculee
+        couts = cout[de_taille_t]
+        ligne, dernier = np.unravel_index(int(np.argmin(couts)), couts.shape)
+        plein = int(de_taille_t[ligne])
+    else:
+        plein = nb_ensembles - 1
+        dernier = int(np.argmin(cout[plein] + vers_depart))
+
+    # On remonte les parents depuis le dernier sommet
+    chemin = []
+    S = plein
+    j = int(dernier)
+    while j != -1:
+        chemin.append(autres[j])
+        j, S = int(parent[S, j]), S ^ (1 << j)
+
+    cycle = [depart] + chemin[::-1]
+    if len(cycle) < n:
+        # Sommets restants ajoutes un a un, le plus proche du dernier d'abord
+        restants = set(range(n)) - set(cycle)
+        while restants:
+            v = min(restants, key=lambda u: D[cycle[-1], u])
+            cycle.append(v)
+            restants.remove(v)
+    longueur = float(calculer_longueur_cycle(cycle, D))
+    if instrumentation is not None:
+        return cycle, longueur, instrumentation
+    return cycle, longueur
@@ -0,0 +1,78 @@
+import time
+from contextlib import contextmanager
+
+
+class Instrumentation:
+    """
+    Mesures optionnelles remplies par les solveurs (ppp, opt_ppp, OptPrim, hds)
+    quand on leur passe instrumentation=Instrumentation(...) ; ils renvoient
+    alors (cycle, longueur, instrumentation). Sans instrumentation, les solveurs
+    ne font qu'un test "is not None" aux points de mesure.
+
+    - compteurs : nom -> entier (noeuds développés, échanges, opérations de tas...)
+    - maximums : nom -> plus grande valeur observée (taille du tas...)
+    - durees : nom -> durée cumulée en secondes
+    - series : nom -> liste de (instant, valeur), instant en secondes depuis la
+      création (par exemple les améliorations de la meilleure longueur)
+    - rappel : fonction appelée par les solveurs avec un dictionnaire d'état
+      (au plus une fois par intervalle secondes) ; si elle renvoie True,
+      le solveur s'arrête au plus tôt et rend la meilleure tournée connue.
+    """
+
+    def __init__(self, rappel=None, intervalle=0.5):
+        self.compteurs = {}
+        self.maximums = {}
+        self.durees = {}
+        self.series = {}
+        self.rappel = rappel
+        self.intervalle = intervalle
+        self.arret_demande = False
+        self._debut = time.perf_counter()
+        self._dernier_rappel = self._debut
+
+    def compter(self, nom, nombre=1):
+        self.compteurs[nom] = self.compteurs.get(nom, 0) + nombre
+
+    def maximum(self, nom, valeur):
+        if valeur > self.maximums.get(nom, valeur - 1):
+            self.maximums[nom] = valeur
+
+    def ajouter_duree(self, nom, duree):
+        self.durees[nom] = self.durees.get(nom, 0.0) + duree
+
+    def noter(self, nom, valeur):
+        self.series.setdefault(nom, []).append((time.perf_counter() - self._debut, valeur))
+
+    @contextmanager
+    def chronometre(self, nom):
+        """with instrumentation.chronometre("etape"): ... ajoute la durée du bloc à durees[nom]."""
+        debut = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.ajouter_duree(nom, time.perf_counter() - debut)
+
+    def progression(self, forcer=False, **etat):
+        """
+        Appelle le rappel avec etat (plus "temps" depuis la création) si
+        l'intervalle est écoulé ou si forcer est vrai.
+        Renvoie True si un arrêt a été demandé.
+        """
+        if self.rappel is not None and not self.arret_demande:
+            maintenant = time.perf_counter()
+            if forcer or maintenant - self._dernier_rappel >= self.intervalle:
+                self._dernier_rappel = maintenant
+                etat["temps"] = maintenant - self._debut
+                if self.rappel(etat):
+                    self.arret_demande = True
+        return self.arret_demande
+
+    def resume(self):
+        """Toutes les mesures sous forme de dictionnaire (sérialisable en JSON)."""
+        return {
+            "compteurs": dict(self.compteurs),
+            "maximums": dict(self.maximums),
+            "durees": dict(self.durees),
+            "series": {nom: list(valeurs) for nom, valeurs in self.series.items()},
+            "arret_demande": self.arret_demande,
+        }
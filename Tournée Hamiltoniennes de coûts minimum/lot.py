@@ -0,0 +1,416 @@
+# Résolution d'un lot d'instances de même taille, en parallèle sur les tableaux :
+# les B instances avancent au même pas (construction PPP puis 2-opt), chaque
+# étape étant une opération numpy sur tout le lot au lieu de B appels Python.
+
+import numpy as np
+
+from utils import MEMOIRE_BLOC_DISTANCES
+from ppp import ppp, _rangs
+from OptPPP import EPSILON
+
+
+def matrices_distances_lot(points, dtype=np.float64):
+    """
+    points : tableau (B, n, 2) de B instances de n points.
+    Renvoie le tenseur (B, n, n) des distances, calculé d'un coup
+    (même calcul que utils.calculer_matrice_distances, instance par instance).
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if points.ndim != 3 or points.shape[2] != 2:
+        raise ValueError("Les points doivent former un tableau (B, n, 2) (reçu {}).".format(points.shape))
+
+    x = points[:, :, 0]
+    y = points[:, :, 1]
+    dx = x[:, :, None] - x[:, None, :]
+    dy = y[:, :, None] - y[:, None, :]
+    np.multiply(dx, dx, out=dx)
+    np.multiply(dy, dy, out=dy)
+    np.add(dx, dy, out=dx)
+    return np.sqrt(dx, out=dx).astype(dtype, copy=False)
+
+
+def _distances(D, lot, u, v):
+    """D[lot, u, v] pour un tenseur (B, n, n), ou D[u, v] pour une matrice partagée par le lot."""
+    return D[u, v] if D.ndim == 2 else D[lot, u, v]
+
+
+def longueurs_lot(D, cycles):
+    """
+    Longueurs des cycles (B, n) du lot, sommées dans le même ordre que
+    utils.calculer_longueur_cycle (résultats identiques au bit près).
+    """
+    B, n = cycles.shape
+    lot = np.arange(B)
+    longueurs = np.zeros(B, dtype=np.float64)
+    for i in range(n - 1):
+        longueurs += _distances(D, lot, cycles[:, i], cycles[:, i + 1])
+    if n > 0:
+        longueurs += _distances(D, lot, cycles[:, -1], cycles[:, 0])
+    return longueurs
+
+
+def ppp_lot(D, departs=0):
+    """
+    PPP (insertion du point le plus proche) sur un lot d'instances, au même pas.
+    - D : tenseur (B, n, n), ou matrice (n, n) commune à tout le lot
+      (B est alors le nombre de départs, voir departs)
+    - departs : sommet de départ, commun ou un par instance (tableau de taille B)
+    Chaque instance donne exactement le cycle de ppp.ppp : les égalités de
+    distance (rares) sont traitées instance par instance avec la même règle.
+    Retourne (cycles, longueurs) : tableaux (B, n) et (B,).
+    """
+    D = np.asarray(D)
+    n = int(D.shape[-1])
+    if D.ndim == 3:
+        B = D.shape[0]
+        departs = np.broadcast_to(np.asarray(departs, dtype=np.int64), (B,)).copy()
+    else:
+        departs = np.atleast_1d(np.asarray(departs, dtype=np.int64)).copy()
+        B = len(departs)
+
+    if n <= 2:
+        # Cas particuliers de ppp.ppp, sans intérêt à vectoriser
+        resultats = [ppp(D if D.ndim == 2 else D[b], depart=int(departs[b])) for b in range(B)]
+        cycles = np.array([c for c, _ in resultats], dtype=np.int64).reshape(B, n)
+        return cycles, np.array([l for _, l in resultats], dtype=np.float64)
+
+    lot = np.arange(B)
+
+    # Listes chaînées circulaires (une par ligne), tete = premier sommet du cycle renvoyé
+    suivant = np.full((B, n), -1, dtype=np.int64)
+    precedent = np.full((B, n), -1, dtype=np.int64)
+    tete = departs.copy()
+
+    distance_cycle = np.array(D[departs] if D.ndim == 2 else D[lot, departs], dtype=np.float64)
+    ancres = np.repeat(departs[:, None], n, axis=1)
+    non_visites = np.ones((B, n), dtype=bool)
+    non_visites[lot, departs] = False
+    distance_cycle[lot, departs] = np.inf
+
+    # Premier point : le cycle devient depart <-> q
+    q = np.argmin(distance_cycle, axis=1)
+    suivant[lot, departs] = precedent[lot, departs] = q
+    suivant[lot, q] = precedent[lot, q] = departs
+    _mettre_a_jour(D, lot, q, distance_cycle, ancres, non_visites, suivant, tete, n)
+
+    for _ in range(n - 2):
+        q = np.argmin(distance_cycle, axis=1)
+        ancre = ancres[lot, q]
+        prec = precedent[lot, ancre]
+        suiv = suivant[lot, ancre]
+
+        gain_precedent = (_distances(D, lot, prec, q) + _distances(D, lot, q, ancre)) \
+            - _distances(D, lot, prec, ancre)
+        gain_suivant = (_distances(D, lot, ancre, q) + _distances(D, lot, q, suiv)) \
+            - _distances(D, lot, ancre, suiv)
+
+        # Avant l'ancre : entre prec et ancre ; après : entre ancre et suiv
+        avant = gain_precedent <= gain_suivant
+        gauche = np.where(avant, prec, ancre)
+        droite = np.where(avant, ancre, suiv)
+        suivant[lot, gauche] = q
+        precedent[lot, q] = gauche
+        suivant[lot, q] = droite
+        precedent[lot, droite] = q
+        tete = np.where(avant & (ancre == tete), q, tete)
+
+        _mettre_a_jour(D, lot, q, distance_cycle, ancres, non_visites, suivant, tete, n)
+
+    cycles = np.empty((B, n), dtype=np.int64)
+    v = tete
+    for i in range(n):
+        cycles[:, i] = v
+        v = suivant[lot, v]
+
+    return cycles, longueurs_lot(D, cycles)
+
+
+def _mettre_a_jour(D, lot, q, distance_cycle, ancres, non_visites, suivant, tete, n):
+    """Distance au cycle et ancres après l'insertion de q (un sommet par instance)."""
+    non_visites[lot, q] = False
+    distance_cycle[lot, q] = np.inf
+
+    lignes = np.asarray(D[q] if D.ndim == 2 else D[lot, q], dtype=np.float64)
+    plus_proche = (lignes < distance_cycle) & non_visites
+    egalite = (lignes == distance_cycle) & non_visites
+
+    # Égalités : même règle que ppp.ppp (le sommet le plus tôt dans la liste), instance par instance
+    for b in np.flatnonzero(egalite.any(axis=1)):
+        rang = _rangs(suivant[b].tolist(), int(tete[b]), n)
+        for v in np.flatnonzero(egalite[b]):
+            if rang[q[b]] < rang[ancres[b, v]]:
+                ancres[b, v] = q[b]
+
+    np.copyto(distance_cycle, lignes, where=plus_proche)
+    ancres[plus_proche] = np.broadcast_to(q[:, None], ancres.shape)[plus_proche]
+
+
+def opt_ppp_lot(D, cycles, k=8, taille_bloc=None):
+    """
+    2-opt "meilleur échange" sur un lot de cycles (B, n), toutes instances au même pas :
+    à chaque itération on applique pour chaque instance le meilleur échange (i, j)
+    (inverser les positions i+1 .. j, arête de retour comprise), jusqu'à ce
+    qu'aucune instance ne s'améliore. Le sommet en tête de chaque cycle ne bouge pas.
+    - D : tenseur (B, n, n) ou matrice (n, n) commune
+    - k : on cherche d'abord parmi les échanges qui créent une arête vers un des
+      k plus proches voisins (O(n k) par itération), puis parmi tous les échanges
+      (O(n^2) par itération, peu d'itérations restent) : le résultat est un
+      optimum local du 2-opt complet. Pour n <= 8 k (ou k=None), on cherche
+      directement parmi tous les échanges, ce qui est alors plus rapide.
+    - taille_bloc : nombre d'instances traitées ensemble (par défaut selon
+      utils.MEMOIRE_BLOC_DISTANCES, les tableaux de travail faisant B x n x n ;
+      au-delà, la recherche complète découpe aussi chaque instance par lignes)
+    Retourne (cycles, longueurs).
+    """
+    D = np.asarray(D)
+    cycles = np.array(cycles, dtype=np.int64)
+    B, n = cycles.shape
+    if n <= 3:
+        return cycles, longueurs_lot(D, cycles)
+
+    if taille_bloc is None:
+        # Environ 4 tableaux float64 de n x n par instance
+        taille_bloc = max(1, MEMOIRE_BLOC_DISTANCES // (4 * 8 * n * n))
+
+    for debut in range(0, B, taille_bloc):
+        fin = min(B, debut + taille_bloc)
+        actives = np.arange(debut, fin)
+        if k is not None and n > 8 * k:
+            _deux_opt_voisins(D, cycles, actives, k)
+        _deux_opt_complet(D, cycles, actives)
+
+    return cycles, longueurs_lot(D, cycles)
+
+
+def _inverser_lot(cycles, actives, i, j):
+    """Inverse les positions i+1 .. j des cycles actives (i < j, un couple par instance)."""
+    positions = np.arange(cycles.shape[1])
+    i = i[:, None]
+    j = j[:, None]
+    # La position p de [i+1 .. j] reçoit le sommet de la position i+1+j-p
+    dans_segment = (positions > i) & (positions <= j)
+    source = np.where(dans_segment, i + 1 + j - positions, positions)
+    cycles[actives] = np.take_along_axis(cycles[actives], source, axis=1)
+
+
+def _deux_opt_voisins(D, cycles, actives, k):
+    """
+    Meilleur échange parmi ceux qui ajoutent une arête (a, c), c parmi les
+    k plus proches voisins de a : avec a en position i et c en position p,
+    on relie soit les successeurs (échange (i, p)), soit les prédécesseurs
+    (échange (i-1, p-1)).
+    """
+    n = cycles.shape[1]
+    debut = actives[0]
+    # k+1 plus proches, a lui-même compris (ces candidats sont écartés plus bas)
+    if D.ndim == 2:
+        proches = np.argpartition(D, k, axis=1)[:, :k + 1]
+    else:
+        proches = np.argpartition(D[actives], k, axis=2)[:, :, :k + 1]
+
+    while len(actives):
+        nb = len(actives)
+        lot = np.arange(nb)[:, None, None]
+        c = cycles[actives]
+        c_suiv = np.roll(c, -1, axis=1)
+        c_prec = np.roll(c, 1, axis=1)
+        position = np.empty_like(c)
+        position[np.arange(nb)[:, None], c] = np.arange(n)
+
+        if D.ndim == 2:
+            voisins = proches[c]
+
+            def dist(u, v):
+                return D[u, v]
+        else:
+            voisins = proches[(actives - debut)[:, None], c]
+            lot_D = actives[:, None, None]
+
+            def dist(u, v):
+                return D[lot_D, u, v]
+
+        # voisins[b, i, :] = candidats du sommet a en position i, p = leurs positions
+        a, a_suiv, a_prec = c[:, :, None], c_suiv[:, :, None], c_prec[:, :, None]
+        p = position[lot, voisins]
+        v_suiv = c_suiv[lot, p]
+        v_prec = c_prec[lot, p]
+        d_av = dist(a, voisins)
+
+        # Successeurs : on retire (a, a+) et (c, c+), on ajoute (a, c) et (a+, c+)
+        delta_s = d_av + dist(a_suiv, v_suiv) - dist(a, a_suiv) - dist(voisins, v_suiv)
+        # Prédécesseurs : on retire (a-, a) et (c-, c), on ajoute (a, c) et (a-, c-)
+        delta_p = d_av + dist(a_prec, v_prec) - dist(a_prec, a) - dist(v_prec, voisins)
+        soi = voisins == a
+        delta_s[soi] = np.inf
+        delta_p[soi] = np.inf
+        delta = np.concatenate((delta_s, delta_p), axis=2).reshape(nb, -1)
+
+        meilleur = np.argmin(delta, axis=1)
+        ameliore = delta[np.arange(nb), meilleur] < -EPSILON
+        if not ameliore.any():
+            return
+
+        kk = voisins.shape[2]
+        i, colonne = np.divmod(meilleur, 2 * kk)
+        par_prec = colonne >= kk
+        pv = p[np.arange(nb), i, colonne % kk]
+        x = np.where(par_prec, (i - 1) % n, i)
+        y = np.where(par_prec, (pv - 1) % n, pv)
+
+        actives = actives[ameliore]
+        _inverser_lot(cycles, actives, np.minimum(x, y)[ameliore], np.maximum(x, y)[ameliore])
+
+
+def _deux_opt_complet(D, cycles, actives):
+    """
+    Meilleur échange parmi tous les (i, j), tant qu'une instance s'améliore.
+    Les gains sont évalués par blocs de lignes i (nb x lignes x n) pour rester
+    sous utils.MEMOIRE_BLOC_DISTANCES, même pour une seule grande instance.
+    """
+    n = cycles.shape[1]
+    positions = np.arange(n)
+
+    while len(actives):
+        nb = len(actives)
+        lot = np.arange(nb)
+        c = cycles[actives]
+        c_suiv = np.roll(c, -1, axis=1)
+        if D.ndim == 2:
+            def dist(u, v):
+                return D[u, v]
+        else:
+            lot_D = actives[:, None, None]
+
+            def dist(u, v):
+                return D[lot_D, u, v]
+        aretes = D[c, c_suiv] if D.ndim == 2 else D[actives[:, None], c, c_suiv]
+
+        # Environ 4 tableaux float64 de nb x lignes x n
+        lignes = max(1, MEMOIRE_BLOC_DISTANCES // (4 * 8 * nb * n))
+        meilleur_delta = np.full(nb, np.inf)
+        meilleur = np.zeros(nb, dtype=np.int64)
+        for r in range(0, n, lignes):
+            i = positions[r:r + lignes, None]
+            # delta[b, i, j] = D[c_i, c_j] + D[c_i+1, c_j+1] - D[c_i, c_i+1] - D[c_j, c_j+1]
+            delta = dist(c[:, r:r + lignes, None], c[:, None, :])
+            delta += dist(c_suiv[:, r:r + lignes, None], c_suiv[:, None, :])
+            delta -= aretes[:, r:r + lignes, None]
+            delta -= aretes[:, None, :]
+            # Échanges permis : j >= i + 2, sauf (0, n-1) dont les arêtes se touchent par le retour
+            interdit = (positions[None, :] < i + 2) | ((i == 0) & (positions[None, :] == n - 1))
+            delta[:, interdit] = np.inf
+            delta = delta.reshape(nb, -1)
+            m = np.argmin(delta, axis=1)
+            valeur = delta[lot, m]
+            # Inégalité stricte : à égalité, le premier échange (i, j) l'emporte
+            mieux = valeur < meilleur_delta
+            meilleur_delta[mieux] = valeur[mieux]
+            meilleur[mieux] = r * n + m[mieux]
+
+        ameliore = meilleur_delta < -EPSILON
+        if not ameliore.any():
+            return
+
+        i, j = np.divmod(meilleur[ameliore], n)
+        actives = actives[ameliore]
+        _inverser_lot(cycles, actives, i, j)
+
+
+def resoudre_lot(points, departs=0, optimiser=True):
+    """
+    Chaîne complète sur un lot (B, n, 2) de points :
+    tenseur des distances, PPP au même pas puis (si optimiser) 2-opt au même pas.
+    Retourne (cycles, longueurs) : tableaux (B, n) et (B,).
+    """
+    D = matrices_distances_lot(points)
+    cycles, longueurs = ppp_lot(D, departs=departs)
+    if optimiser:
+        cycles, longueurs = opt_ppp_lot(D, cycles)
+    return cycles, longueurs
+
+
+def departs_repartis(D, nombre, premier=0):
+    """
+    nombre sommets de départ étalés sur l'instance, par parcours du plus
+    éloigné : chaque nouveau départ est le sommet le plus loin des départs
+    déjà choisis. O(n * nombre), une ligne de D par départ.
+    Les départs sont distincts, même si des points sont confondus.
+    """
+    n = int(D.shape[0])
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    choisis = [premier]
+    distance_min = np.array(D[premier], dtype=np.float64)
+    # Un sommet choisi est marqué à -1 : l'argmax ne peut plus le reprendre,
+    # même quand tous les restants sont à distance nulle des départs
+    distance_min[premier] = -1.0
+    for _ in range(min(nombre, n) - 1):
+        v = int(np.argmax(distance_min))
+        choisis.append(v)
+        np.minimum(distance_min, D[v], out=distance_min)
+        distance_min[choisis] = -1.0
+    return np.array(choisis, dtype=np.int64)
+
+
+def ppp_multi_departs(D, departs=None, nb_departs=16, k_meilleurs=1, distinctes=True, taille_bloc=None):
+    """
+    PPP lancé depuis plusieurs sommets de départ sur la même matrice D (n, n) :
+    les départs avancent au même pas (ppp_lot), chaque étape d'insertion étant
+    une seule opération numpy pour tous. Chaque départ garde son propre état
+    (distances au cycle, O(n^2) par départ) : le lot ne gagne qu'un facteur
+    constant sur des appels séparés à ppp (environ 3 pour n = 1000), le coût
+    total reste proportionnel au nombre de départs.
+    Par défaut on ne lance donc que nb_departs départs étalés (departs_repartis) :
+    sur des points uniformes, la meilleure tournée obtenue est à moins de 0.3 %
+    de celle des n départs, pour environ nb_departs / n de leur coût.
+    - departs : sommets de départ ; "tous" pour range(n), None pour departs_repartis(D, nb_departs)
+    - k_meilleurs : nombre de tournées renvoyées, les plus courtes d'abord
+      (par exemple pour lancer opt_ppp_lot sur chacune)
+    - distinctes : ignore les tournées identiques (à rotation et sens près) ;
+      beaucoup de départs donnent le même cycle
+    - taille_bloc : départs traités ensemble (par défaut selon
+      utils.MEMOIRE_BLOC_DISTANCES, l'état d'un départ faisant quelques tableaux de n)
+    Chaque tournée est exactement celle de ppp.ppp(D, depart).
+    Retourne (cycles, longueurs) : listes de k_meilleurs cycles (au plus) et de leurs longueurs.
+    """
+    D = np.asarray(D)
+    n = int(D.shape[0])
+    if departs is None:
+        departs = departs_repartis(D, nb_departs)
+    elif isinstance(departs, str) and departs == "tous":
+        departs = np.arange(n)
+    else:
+        departs = np.atleast_1d(np.asarray(departs, dtype=np.int64))
+    if taille_bloc is None:
+        # distance_cycle, ancres, suivant, precedent, non_visites et la ligne de D
+        taille_bloc = max(1, MEMOIRE_BLOC_DISTANCES // (6 * 8 * max(n, 1)))
+
+    cycles, longueurs = [], []
+    for debut in range(0, len(departs), taille_bloc):
+        c, l = ppp_lot(D, departs[debut:debut + taille_bloc])
+        cycles.append(c)
+        longueurs.append(l)
+    cycles = np.concatenate(cycles)
+    longueurs = np.concatenate(longueurs)
+
+    meilleurs_cycles, meilleures_longueurs = [], []
+    deja_vues = set()
+    for b in np.argsort(longueurs, kind="stable").tolist():
+        if distinctes:
+            cle = _forme_canonique(cycles[b])
+            if cle in deja_vues:
+                continue
+            deja_vues.add(cle)
+        meilleurs_cycles.append(cycles[b].tolist())
+        meilleures_longueurs.append(float(longueurs[b]))
+        if len(meilleurs_cycles) == k_meilleurs:
+            break
+    return meilleurs_cycles, meilleures_longueurs
+
+
+def _forme_canonique(cycle):
+    """Clé d'un cycle indépendante du sommet de départ et du sens de parcours."""
+    cycle = np.roll(cycle, -int(np.argmin(cycle)))
+    if len(cycle) > 2 and cycle[1] > cycle[-1]:
+        cycle = np.concatenate((cycle[:1], cycle[:0:-1]))
+    return cycle.tobytes()
@@ -1,3 +1,6 @@
+import multiprocessing
+import sys
+
 import numpy as np
 import matplotlib.pyplot as plt
 
@@ -11,26 +14,74 @@ from utils import (
 
 from ppp import ppp    
 from hds import hds            
+from held_karp import held_karp
 from OptPPP import opt_ppp          
 from OptPrim import OptPrim         
+from OptSegments import opt_segments
+from statistiques import StatistiquesFlux
+from cache import CacheDisque, empreinte_points
+
+
+def resoudre_exact(D, depart=0, solveur_exact="hds", temps_max=None, infos=None, cycle_initial=None):
+    """
+    Solveur exact choisi par son nom :
+    - "hds" : Branch & Bound (hds.hds), borne sup initiale donnée par PPP ;
+      avec temps_max (secondes), hds s'arrête à l'échéance sur la meilleure
+      tournée trouvée et remplit infos (statut, borne_inf, ecart prouvé) ;
+      cycle_initial (tournée déjà connue) peut remplacer PPP comme borne sup
+    - "held_karp" : programmation dynamique (held_karp.held_karp), jusqu'à n = 20-22
+    """
+    if solveur_exact == "hds":
+        return hds(D, depart=depart, utiliser_ppp_comme_borne_sup=True, temps_max=temps_max, infos=infos,
+                   cycle_initial=cycle_initial)
+    if solveur_exact == "held_karp":
+        return held_karp(D, depart=depart)
+    raise ValueError("Solveur exact inconnu : {} (attendu 'hds' ou 'held_karp')".format(solveur_exact))
 
 
-def executer_sur_points(points, titre_prefix=""):
+def executer_sur_points(points, titre_prefix="", segments=False, solveur_exact="hds", temps_max_exact=None,
+                        cache=None):
     """
     Lance PPP, OptPPP, OptPrim (et HDS si possible) sur un tableau de points.
+    Si segments=True, on enchaîne opt_segments (Or-opt / 3-opt) après OptPPP.
+    solveur_exact : "hds" (si n <= 11) ou "held_karp" (si n <= 20), voir resoudre_exact.
+    Avec temps_max_exact (secondes), hds est lancé quel que soit n : il rend la
+    meilleure tournée trouvée dans le temps imparti et l'écart prouvé à l'optimum.
+    cache : cache.CacheDisque optionnel ; D et les tournées y sont relues si les
+    points ont déjà été traités, et la meilleure tournée connue sert de borne
+    sup initiale à hds. Un résultat de hds non prouvé optimal n'est pas resservi :
+    chaque exécution reprend la recherche depuis la meilleure tournée connue.
     Retourne un dictionnaire des longueurs.
     """
     n = len(points)
-    D = calculer_matrice_distances(points)
+
+    if cache is None:
+        D = calculer_matrice_distances(points)
+
+        def resoudre(solveur, parametres, calcul, infos=None, accepter=None):
+            return calcul()
+    else:
+        empreinte = empreinte_points(points)
+        D = cache.matrice_distances(points, empreinte=empreinte)
+
+        def resoudre(solveur, parametres, calcul, infos=None, accepter=None):
+            return cache.tournee(points, solveur, parametres, calcul, infos=infos, empreinte=empreinte,
+                                 accepter=accepter)
 
     # 1) PPP
-    cycle_ppp, longueur_ppp = ppp(D, depart=0)
+    cycle_ppp, longueur_ppp = resoudre("ppp", {"depart": 0}, lambda: ppp(D, depart=0))
 
     # 2) OptPPP
-    cycle_opt, longueur_opt = opt_ppp(cycle_ppp.copy(), D)
+    cycle_opt, longueur_opt = resoudre("opt_ppp", {"depart": 0}, lambda: opt_ppp(cycle_ppp.copy(), D))
+
+    # 2 bis) Déplacements de segments après OptPPP
+    cycle_seg, longueur_seg = None, None
+    if segments:
+        cycle_seg, longueur_seg = resoudre("opt_segments", {"depart": 0},
+                                           lambda: opt_segments(cycle_opt.copy(), D))
 
     # 3) OptPrim
-    cycle_prim, longueur_prim = OptPrim(points, D, depart=0)
+    cycle_prim, longueur_prim = resoudre("OptPrim", {"depart": 0}, lambda: OptPrim(points, D, depart=0))
 
     resultats = {
         "n": n,
@@ -40,17 +91,34 @@ def executer_sur_points(points, titre_prefix=""):
         "longueur_ppp": float(longueur_ppp),
         "cycle_opt": cycle_opt,
         "longueur_opt": float(longueur_opt),
+        "cycle_seg": cycle_seg,
+        "longueur_seg": None if longueur_seg is None else float(longueur_seg),
         "cycle_prim": cycle_prim,
         "longueur_prim": float(longueur_prim),
         "cycle_hds": None,
         "longueur_hds": None,
+        "ecart_hds": None,
     }
 
-    # 4) HDS (exact)
-    if n <= 11:
-        cycle_hds, longueur_hds = hds(D, depart=0, utiliser_ppp_comme_borne_sup=True)
+    # 4) HDS (exact, ou borné en temps)
+    n_max_exact = 20 if solveur_exact == "held_karp" else 11
+    budget = solveur_exact == "hds" and temps_max_exact is not None
+    if n <= n_max_exact or budget:
+        infos_hds = {}
+        connue = None if cache is None else cache.meilleure_tournee(points, empreinte=empreinte)
+        cycle_initial = None if connue is None else connue[0]
+        cycle_hds, longueur_hds = resoudre(
+            solveur_exact, {"depart": 0, "temps_max": temps_max_exact},
+            lambda: resoudre_exact(D, depart=0, solveur_exact=solveur_exact, temps_max=temps_max_exact,
+                                   infos=infos_hds, cycle_initial=cycle_initial),
+            infos=infos_hds,
+            # hds arrêté avant la preuve : on relance depuis la tournée en cache
+            # (meilleure_tournee) au lieu de la resservir telle quelle
+            accepter=lambda infos: infos.get("statut", "optimal") == "optimal",
+        )
         resultats["cycle_hds"] = cycle_hds
         resultats["longueur_hds"] = float(longueur_hds)
+        resultats["ecart_hds"] = infos_hds.get("ecart", 0.0)
 
     # Vérifications 
     check_ppp = calculer_longueur_cycle(cycle_ppp, D)
@@ -67,13 +135,22 @@ def executer_sur_points(points, titre_prefix=""):
     print("Gain OptPPP vs PPP     : {:.2f} %".format(gain_opt))
     print("Gain OptPrim vs OptPPP : {:.2f} %".format(gain_prim))
 
+    if resultats["longueur_seg"] is not None:
+        check_seg = calculer_longueur_cycle(cycle_seg, D)
+        print("Longueur Segments      : {:.4f}  (check {:.4f})".format(resultats["longueur_seg"], check_seg))
+
     if resultats["longueur_hds"] is not None:
         check_hds = calculer_longueur_cycle(resultats["cycle_hds"], D)
         print("Longueur HDS (exact)   : {:.4f}  (check {:.4f})".format(resultats["longueur_hds"], check_hds))
+        if resultats["ecart_hds"] > 0:
+            print("  HDS arrêté avant la preuve : écart à l'optimum au plus {:.2f} %".format(
+                100.0 * resultats["ecart_hds"]))
 
     # Affichages
     afficher_tournee(points, cycle_ppp, "{}Cycle PPP".format(titre_prefix))
     afficher_tournee(points, cycle_opt, "{}Cycle OptPPP".format(titre_prefix))
+    if cycle_seg is not None:
+        afficher_tournee(points, cycle_seg, "{}Cycle OptPPP + Segments".format(titre_prefix))
     afficher_tournee(points, cycle_prim, "{}Cycle OptPrim".format(titre_prefix))
     if resultats["cycle_hds"] is not None:
         afficher_tournee(points, resultats["cycle_hds"], "{}Cycle HDS (exact)".format(titre_prefix))
@@ -83,45 +160,94 @@ def executer_sur_points(points, titre_prefix=""):
     return resultats
 
 
-def etude_statistique(nb_essais=100, n=30, comparer_hds=False):
+def _essai_statistique(parametres):
     """
-    Étude statistique sur des points générés aléatoirement :
-    - À chaque essai : on génère de nouveaux points, on calcule D, puis on lance PPP / OptPPP / OptPrim.
-    - On calcule lp, lop, lpr + gains.
-    - Optionnel : comparaison avec HDS si n petit.
+    Un essai de l'étude statistique (exécuté tel quel dans les processus du pool).
+    Les points et le sommet de départ sont tirés avec un générateur propre à
+    l'essai, issu de (graine, numéro d'essai) : le résultat ne dépend ni de
+    l'ordre d'exécution ni du nombre de processus.
+    Retourne (l_ppp, l_opt, l_prim, l_hds ou None).
     """
-    longueurs_ppp = np.zeros(nb_essais, dtype=float)
-    longueurs_opt = np.zeros(nb_essais, dtype=float)
-    longueurs_prim = np.zeros(nb_essais, dtype=float)
-    longueurs_hds = np.zeros(nb_essais, dtype=float) if comparer_hds else None
+    graine, i, n, comparer_hds, solveur_exact = parametres
+    # Même suite que np.random.SeedSequence(graine).spawn(...)[i], sans créer toute la liste
+    rng = np.random.default_rng(np.random.SeedSequence(graine, spawn_key=(i,)))
 
-    for i in range(nb_essais):
-        points = generer_points(n)
-        D = calculer_matrice_distances(points)
+    points = generer_points(n, rng)
+    D = calculer_matrice_distances(points)
+
+    depart_hasard = int(rng.integers(0, n))
 
-        depart_hasard = np.random.randint(0, n)
+    c_p, l_p = ppp(D, depart=depart_hasard)
+    c_o, l_o = opt_ppp(c_p.copy(), D)
+    c_pr, l_pr = OptPrim(points, D, depart=depart_hasard)
 
-        c_p, l_p = ppp(D, depart=depart_hasard)
-        c_o, l_o = opt_ppp(c_p.copy(), D)
-        c_pr, l_pr = OptPrim(points, D, depart=depart_hasard)
+    l_h = None
+    if comparer_hds:
+        c_h, l_h = resoudre_exact(D, depart=depart_hasard, solveur_exact=solveur_exact)
+        l_h = float(l_h)
 
-        longueurs_ppp[i] = float(l_p)
-        longueurs_opt[i] = float(l_o)
-        longueurs_prim[i] = float(l_pr)
+    return float(l_p), float(l_o), float(l_pr), l_h
 
-        if comparer_hds:
-            
-            c_h, l_h = hds(D, depart=depart_hasard, utiliser_ppp_comme_borne_sup=True)
-            longueurs_hds[i] = float(l_h)
 
-    lp = float(np.mean(longueurs_ppp))
-    lop = float(np.mean(longueurs_opt))
-    lpr = float(np.mean(longueurs_prim))
+def etude_statistique(nb_essais=100, n=30, comparer_hds=False, solveur_exact="hds",
+                      processus=None, graine=None, afficher=True, taille_paquet=None):
+    """
+    Étude statistique sur des points générés aléatoirement :
+    - À chaque essai : on génère de nouveaux points, on calcule D, puis on lance PPP / OptPPP / OptPrim.
+    - On calcule lp, lop, lpr + gains.
+    - Optionnel : comparaison avec HDS si n petit (solveur_exact="held_karp" pour la programmation dynamique).
+
+    - graine : graine maîtresse ; l'essai i utilise la graine dérivée (graine, i),
+      donc les résultats sont reproductibles et identiques quel que soit processus.
+      Si None, elle est tirée avec l'état global de np.random.
+    - processus : si > 1, les essais sont répartis sur un pool de processus
+      (taille_paquet essais envoyés à la fois à chaque processus)
+    - afficher : trace le diagramme des moyennes (toujours dans le processus principal)
+    Les longueurs sont agrégées au fil de l'eau (moyenne, écart-type, quantiles,
+    voir statistiques.StatistiquesFlux) : la mémoire ne dépend pas de nb_essais.
+    """
+    if nb_essais < 1:
+        raise ValueError("Il faut au moins un essai (reçu nb_essais={}).".format(nb_essais))
+    if graine is None:
+        graine = int(np.random.randint(0, 2**31 - 1))
+
+    stats_ppp = StatistiquesFlux(graine=graine)
+    stats_opt = StatistiquesFlux(graine=graine + 1)
+    stats_prim = StatistiquesFlux(graine=graine + 2)
+    stats_hds = StatistiquesFlux(graine=graine + 3) if comparer_hds else None
+
+    def parametres(debut, fin):
+        return ((graine, i, n, comparer_hds, solveur_exact) for i in range(debut, fin))
+
+    def agreger(resultats):
+        for l_p, l_o, l_pr, l_h in resultats:
+            stats_ppp.ajouter(l_p)
+            stats_opt.ajouter(l_o)
+            stats_prim.ajouter(l_pr)
+            if comparer_hds:
+                stats_hds.ajouter(l_h)
+
+    if processus is None or processus <= 1:
+        agreger(map(_essai_statistique, parametres(0, nb_essais)))
+    else:
+        if taille_paquet is None:
+            taille_paquet = max(1, min(64, nb_essais // (4 * processus)))
+        # Les essais sont soumis par blocs pour que la file de tâches reste bornée ;
+        # imap rend les résultats dans l'ordre des essais (agrégation reproductible)
+        taille_bloc = 16 * processus * taille_paquet
+        with multiprocessing.Pool(processus) as pool:
+            for debut in range(0, nb_essais, taille_bloc):
+                fin = min(nb_essais, debut + taille_bloc)
+                agreger(pool.imap(_essai_statistique, parametres(debut, fin), chunksize=taille_paquet))
+
+    lp = stats_ppp.moyenne
+    lop = stats_opt.moyenne
+    lpr = stats_prim.moyenne
 
     gain_opt_ppp = ((lp - lop) / lp) * 100.0
     gain_prim_opt = ((lop - lpr) / lop) * 100.0
 
-    print("\n--- Étude statistique finale ({} essais, n={}) ---".format(nb_essais, n))
+    print("\n--- Étude statistique finale ({} essais, n={}, graine={}) ---".format(nb_essais, n, graine))
     print("lp  (moyenne PPP)     : {:.4f}".format(lp))
     print("lop (moyenne OptPPP)  : {:.4f}".format(lop))
     print("lpr (moyenne OptPrim) : {:.4f}".format(lpr))
@@ -129,28 +255,40 @@ def etude_statistique(nb_essais=100, n=30, comparer_hds=False):
     print("Gain moyen OptPrim vs OptPPP : {:.2f} %".format(gain_prim_opt))
 
     if comparer_hds:
-        lhds = float(np.mean(longueurs_hds))
+        lhds = stats_hds.moyenne
         print("lhds (moyenne HDS exact)      : {:.4f}".format(lhds))
 
-    # Représentation visuelle 
-    etiquettes = ["PPP", "OptPPP", "OptPrim"]
-    valeurs = [lp, lop, lpr]
+    print("\nDispersion : écart-type / quantiles 5 %, 50 %, 95 %")
+    series = [("PPP", stats_ppp), ("OptPPP", stats_opt), ("OptPrim", stats_prim)]
     if comparer_hds:
-        etiquettes.append("HDS")
-        valeurs.append(float(np.mean(longueurs_hds)))
+        series.append(("HDS", stats_hds))
+    for nom, stats in series:
+        q05, q50, q95 = stats.quantile([0.05, 0.5, 0.95])
+        print("{:8s}: {:.4f} / {:.4f}, {:.4f}, {:.4f}".format(nom, stats.ecart_type, q05, q50, q95))
+
+    # Représentation visuelle 
+    if afficher:
+        etiquettes = ["PPP", "OptPPP", "OptPrim"]
+        valeurs = [lp, lop, lpr]
+        if comparer_hds:
+            etiquettes.append("HDS")
+            valeurs.append(stats_hds.moyenne)
 
-    plt.figure()
-    plt.bar(etiquettes, valeurs)
-    plt.title("Longueurs moyennes sur {} essais (n={})".format(nb_essais, n))
-    plt.ylabel("Longueur moyenne")
-    plt.grid(True, axis="y", linestyle="--", alpha=0.6)
-    plt.show()
+        plt.figure()
+        plt.bar(etiquettes, valeurs)
+        plt.title("Longueurs moyennes sur {} essais (n={})".format(nb_essais, n))
+        plt.ylabel("Longueur moyenne")
+        plt.grid(True, axis="y", linestyle="--", alpha=0.6)
+        plt.show()
 
     return lp, lop, lpr
 
 
-def main():
-       
+def main(utiliser_cache=False):
+    """
+    utiliser_cache : en mode fichier, garde D et les tournées dans
+    cache.CacheDisque (~/.cache/tournees) ; option --cache en ligne de commande.
+    """
     # Fichier de points (mode fichier)
     fichier_points = "10 points.txt" 
 
@@ -158,10 +296,12 @@ def main():
     n_stats = 10
     nb_essais = 100
 
-    # 1) MODE FICHIER (si le fichier existe)
+    # 1) MODE FICHIER (si le fichier existe) : avec le cache, D et les tournées
+    # sont gardées sur disque, une nouvelle exécution sur le même fichier les relit
     points_fichier = charger_points_fichier(fichier_points)
     if points_fichier is not None:
-        executer_sur_points(points_fichier, titre_prefix="[FICHIER] ")
+        cache = CacheDisque() if utiliser_cache else None
+        executer_sur_points(points_fichier, titre_prefix="[FICHIER] ", cache=cache)
 
     # 2) MODE RANDOM 
     points_rand = generer_points(n_stats)
@@ -173,4 +313,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    main(utiliser_cache="--cache" in sys.argv[1:])
@@ -0,0 +1,246 @@
+# Très grandes instances (10^5 - 10^6 points) : aucune matrice n x n n'est calculée.
+# - tournee_hilbert : points rangés dans l'ordre d'une courbe de Hilbert, O(n log n)
+# - resoudre_par_partition : le plan est découpé en cellules, chaque cellule est
+#   résolue (PPP + OptPPP) éventuellement en parallèle, les sous-tournées sont
+#   raccordées dans l'ordre de Hilbert des cellules, puis un 2-opt sur les
+#   sommets proches des frontières répare les raccords.
+
+import multiprocessing
+import time
+
+import numpy as np
+
+from utils import (
+    calculer_matrice_distances,
+    DistancesALaDemande,
+    voisins_proches_points,
+    longueur_cycle_points,
+)
+from ppp import ppp
+from OptPPP import opt_ppp, opt_ppp_voisins
+
+
+def indices_hilbert(points, ordre=16):
+    """
+    Position de chaque point le long d'une courbe de Hilbert d'ordre `ordre`
+    couvrant la boîte englobante (grille de 2^ordre x 2^ordre cases).
+    Calcul vectorisé bit par bit : O(n * ordre).
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) == 0:
+        return np.empty(0, dtype=np.int64)
+    cote = 1 << ordre
+    mini = points.min(axis=0)
+    etendue = float(np.max(points.max(axis=0) - mini))
+    echelle = (cote - 1) / etendue if etendue > 0 else 0.0
+    x = ((points[:, 0] - mini[0]) * echelle).astype(np.int64)
+    y = ((points[:, 1] - mini[1]) * echelle).astype(np.int64)
+
+    d = np.zeros(len(points), dtype=np.int64)
+    s = cote >> 1
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        d += s * s * ((3 * rx) ^ ry)
+        # Rotation du quadrant pour que la sous-courbe soit dans le bon sens
+        retourner = ~ry & rx
+        x = np.where(retourner, cote - 1 - x, x)
+        y = np.where(retourner, cote - 1 - y, y)
+        echanger = ~ry
+        x, y = np.where(echanger, y, x), np.where(echanger, x, y)
+        s >>= 1
+    return d
+
+
+def tournee_hilbert(points, ordre=16):
+    """
+    Heuristique de construction par courbe de Hilbert : les points sont visités
+    dans l'ordre où la courbe les rencontre. O(n log n) (tri), depuis les points seuls.
+    En moyenne environ 25 % au-dessus de l'optimum sur des points uniformes.
+    Retourne (cycle, longueur).
+    """
+    cycle = np.argsort(indices_hilbert(points, ordre), kind="stable")
+    return cycle.tolist(), longueur_cycle_points(points, cycle)
+
+
+def decouper(points, taille_cellule=200, methode="kd"):
+    """
+    Découpe les points en cellules d'au plus environ taille_cellule points :
+    - methode="kd" : coupes successives à la médiane selon le côté le plus long
+      (cellules équilibrées même si les points sont groupés)
+    - methode="grille" : grille régulière d'environ taille_cellule points par case
+      (en moyenne), les cases vides sont ignorées
+    Les cellules sont rangées dans l'ordre de Hilbert de leurs centres.
+    Retourne une liste de tableaux d'indices de points.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    n = len(points)
+    taille_cellule = max(2, int(taille_cellule))
+
+    if methode == "kd":
+        cellules = []
+        a_couper = [np.arange(n)]
+        while a_couper:
+            indices = a_couper.pop()
+            if len(indices) <= taille_cellule:
+                cellules.append(indices)
+                continue
+            coords = points[indices]
+            axe = int(np.argmax(coords.max(axis=0) - coords.min(axis=0)))
+            milieu = len(indices) // 2
+            rangs = np.argpartition(coords[:, axe], milieu)
+            a_couper.append(indices[rangs[:milieu]])
+            a_couper.append(indices[rangs[milieu:]])
+    elif methode == "grille":
+        mini = points.min(axis=0)
+        etendue = np.maximum(points.max(axis=0) - mini, 1e-12)
+        cote = max(float(np.sqrt(etendue[0] * etendue[1] * taille_cellule / n)),
+                   float(etendue.max()) * taille_cellule / n)
+        nx = int(etendue[0] // cote) + 1
+        cx = np.minimum(((points[:, 0] - mini[0]) // cote).astype(np.int64), nx - 1)
+        cy = ((points[:, 1] - mini[1]) // cote).astype(np.int64)
+        case = cy * nx + cx
+        tries = np.argsort(case, kind="stable")
+        coupures = np.flatnonzero(np.diff(case[tries])) + 1
+        cellules = np.split(tries, coupures)
+    else:
+        raise ValueError("Méthode de découpage inconnue : {} (attendu 'kd' ou 'grille')".format(methode))
+
+    centres = np.array([points[c].mean(axis=0) for c in cellules])
+    ordre = np.argsort(indices_hilbert(centres), kind="stable")
+    return [cellules[i] for i in ordre]
+
+
+def _resoudre_cellule(points_cellule):
+    """Tournée d'une cellule (PPP puis OptPPP), en indices locaux à la cellule."""
+    m = len(points_cellule)
+    if m <= 3:
+        return np.arange(m)
+    D = calculer_matrice_distances(points_cellule)
+    cycle, _ = ppp(D)
+    cycle, _ = opt_ppp(list(cycle), D, mode="voisins")
+    return np.asarray(cycle, dtype=np.int64)
+
+
+def _raccorder(points, cellules, tournees):
+    """
+    Enchaîne les sous-tournées (cycles fermés) dans l'ordre des cellules.
+    Chaque cycle est ouvert sur l'arête (a, b) qui minimise
+    d(sortie précédente, entrée) + d(sortie, centre de la cellule suivante) - d(a, b),
+    en essayant les deux sens de parcours.
+    """
+    centres = np.array([points[c].mean(axis=0) for c in cellules])
+    nb = len(cellules)
+    morceaux = []
+    sortie = centres[-1]
+    for i in range(nb):
+        cycle = cellules[i][tournees[i]]
+        suivant = centres[(i + 1) % nb]
+        if len(cycle) == 1:
+            morceaux.append(cycle)
+            sortie = points[cycle[0]]
+            continue
+        a = points[cycle]
+        b = np.roll(a, -1, axis=0)
+        arete = np.hypot(*(a - b).T)
+        # Sens direct : entrée b = cycle[j+1], ..., sortie a = cycle[j]
+        direct = np.hypot(*(b - sortie).T) + np.hypot(*(a - suivant).T) - arete
+        # Sens inverse : entrée a = cycle[j], ..., sortie b = cycle[j+1]
+        inverse = np.hypot(*(a - sortie).T) + np.hypot(*(b - suivant).T) - arete
+        j_direct = int(np.argmin(direct))
+        j_inverse = int(np.argmin(inverse))
+        if direct[j_direct] <= inverse[j_inverse]:
+            chemin = np.roll(cycle, -(j_direct + 1))
+        else:
+            # [c_j, c_j-1, ..., c_j+1]
+            chemin = np.roll(np.roll(cycle, -j_inverse)[::-1], 1)
+        morceaux.append(chemin)
+        sortie = points[chemin[-1]]
+    return np.concatenate(morceaux)
+
+
+def resoudre_par_partition(points, taille_cellule=200, methode="kd", processus=None,
+                           k=8, reparer=True, segment_max=None, infos=None, instrumentation=None):
+    """
+    Partitionne-et-raccorde pour les très grandes instances :
+    1) decouper : cellules d'environ taille_cellule points, ordre de Hilbert ;
+    2) chaque cellule est résolue par PPP + OptPPP (matrice taille_cellule^2 seulement),
+       sur un pool de processus si processus > 1 ;
+    3) les sous-tournées sont raccordées (_raccorder) ;
+    4) si reparer, 2-opt par listes de voisins (opt_ppp_voisins, distances
+       calculées à la demande) en partant des seuls sommets dont un des k
+       plus proches voisins est dans une autre cellule ; les inversions sont
+       limitées à segment_max sommets (par défaut 50 * taille_cellule) pour que
+       la réparation reste linéaire en n.
+    La qualité ne dépend que de taille_cellule : quelques % au-dessus d'OptPPP
+    sur l'instance entière, pour un temps quasi linéaire en n.
+    infos : dictionnaire optionnel rempli avec le nombre de cellules, le nombre de
+    sommets de frontière et les durées (decoupage, cellules, raccord, reparation).
+    instrumentation : rappel consulté après chaque cellule et pendant la
+    réparation (compteur cellules) ; s'il demande l'arrêt, les cellules restantes
+    sont parcourues dans l'ordre de Hilbert, sans réparation, et l'on retourne
+    (cycle, longueur, instrumentation).
+    Retourne (cycle, longueur).
+    """
+    points = np.asarray(points, dtype=np.float64)
+    n = len(points)
+    if n <= taille_cellule:
+        cycle = _resoudre_cellule(points)
+        resultat = cycle.tolist(), longueur_cycle_points(points, cycle)
+        return resultat if instrumentation is None else resultat + (instrumentation,)
+
+    durees = {}
+    debut = time.perf_counter()
+    cellules = decouper(points, taille_cellule, methode)
+    durees["decoupage"] = time.perf_counter() - debut
+
+    debut = time.perf_counter()
+    sous_points = (points[c] for c in cellules)
+    tournees = []
+    if processus is None or processus <= 1:
+        _recevoir_cellules(map(_resoudre_cellule, sous_points), tournees, instrumentation)
+    else:
+        taille_paquet = max(1, min(64, len(cellules) // (4 * processus)))
+        # En quittant le bloc, le pool est arrêté (les cellules en cours sont abandonnées)
+        with multiprocessing.Pool(processus) as pool:
+            _recevoir_cellules(pool.imap(_resoudre_cellule, sous_points, chunksize=taille_paquet),
+                               tournees, instrumentation)
+    for c in cellules[len(tournees):]:
+        tournees.append(np.argsort(indices_hilbert(points[c]), kind="stable"))
+    durees["cellules"] = time.perf_counter() - debut
+
+    debut = time.perf_counter()
+    cycle = _raccorder(points, cellules, tournees)
+    durees["raccord"] = time.perf_counter() - debut
+
+    frontiere = 0
+    if reparer and not (instrumentation is not None and instrumentation.arret_demande):
+        debut = time.perf_counter()
+        numero = np.empty(n, dtype=np.int64)
+        for i, c in enumerate(cellules):
+            numero[c] = i
+        voisins = voisins_proches_points(points, k)
+        actifs = np.flatnonzero((numero[voisins] != numero[:, None]).any(axis=1))
+        frontiere = len(actifs)
+        if segment_max is None:
+            segment_max = 50 * taille_cellule
+        cycle = opt_ppp_voisins(cycle, DistancesALaDemande(points), k=k, voisins=voisins.tolist(),
+                                actifs=actifs.tolist(), segment_max=segment_max,
+                                instrumentation=instrumentation)[0]
+        durees["reparation"] = time.perf_counter() - debut
+
+    if infos is not None:
+        infos.update(cellules=len(cellules), sommets_frontiere=frontiere, durees=durees)
+    cycle = np.asarray(cycle).tolist()
+    resultat = cycle, longueur_cycle_points(points, cycle)
+    return resultat if instrumentation is None else resultat + (instrumentation,)
+
+
+def _recevoir_cellules(resultats, tournees, instrumentation):
+    """Ajoute les tournées des cellules à mesure qu'elles arrivent, jusqu'à un éventuel arrêt."""
+    for tournee in resultats:
+        tournees.append(tournee)
+        if instrumentation is not None:
+            instrumentation.compter("cellules")
+            if instrumentation.progression(cellules=len(tournees)):
+                return
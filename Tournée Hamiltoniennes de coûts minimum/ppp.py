@@ -1,74 +1,138 @@
 # PPP = Point le Plus Proche
+import time
+
+import numpy as np
+
 from utils import calculer_longueur_cycle
 
 
-def ppp(D, depart=0):
+def ppp(D, depart=0, instrumentation=None):
     """
     Retourne (cycle, longueur).
-    - D : matrice des distances (n x n)
+    - D : matrice des distances (n x n), ou utils.DistancesALaDemande
     - depart : sommet de depart (0..n-1)
+    - instrumentation : instrumentation.Instrumentation optionnelle (compteurs
+      insertions et egalites, duree "ppp") ; on retourne alors (cycle, longueur, instrumentation).
+      Son rappel recoit l'avancement mais la construction va toujours a son terme.
+
+    Version en O(n^2) : pour chaque point hors cycle on garde sa distance au cycle
+    et son sommet le plus proche (ancre), mis a jour seulement avec le dernier
+    sommet insere. Le cycle est une liste chainee (suivant / precedent), donc
+    trouver les voisins de l'ancre et inserer se font en O(1).
     """
 
     n = int(D.shape[0])
 
-    if n == 0:
-        return [], 0.0
-    if n == 1:
-        return [0], 0.0
-    if n == 2:
-        cycle = [depart, 1 - depart] if depart in (0, 1) else [0, 1]
-        return cycle, float(calculer_longueur_cycle(cycle, D))
-
-    cycle = [depart]
-    non_visites = set(range(n))
-    non_visites.remove(depart)
-
-    while non_visites:
+    if n <= 2:
+        if n == 0:
+            cycle, longueur = [], 0.0
+        elif n == 1:
+            cycle, longueur = [0], 0.0
+        else:
+            cycle = [depart, 1 - depart] if depart in (0, 1) else [0, 1]
+            longueur = float(calculer_longueur_cycle(cycle, D))
+        return (cycle, longueur) if instrumentation is None else (cycle, longueur, instrumentation)
+
+    if instrumentation is not None:
+        debut = time.perf_counter()
+
+    # Liste chainee circulaire ; tete = premier element de la liste renvoyee
+    suivant = [-1] * n
+    precedent = [-1] * n
+    suivant[depart] = depart
+    precedent[depart] = depart
+    tete = depart
+    m = 1
+
+    # distance_cycle[q] = distance de q au cycle, ancres[q] = sommet du cycle le plus proche
+    distance_cycle = np.array(D[depart], dtype=np.float64)
+    ancres = np.full(n, depart, dtype=np.int64)
+    non_visites = np.ones(n, dtype=bool)
+    non_visites[depart] = False
+    distance_cycle[depart] = np.inf
+
+    for _ in range(n - 1):
         # 1) Choisir le point "q" hors cycle le plus proche du cycle
-        meilleur_q = None
-        meilleure_distance = float("inf")
-        ancre = None  # sommet du cycle le plus proche de q
-
-        for q in non_visites:
-            distance_q_cycle = float("inf")
-            sommet_proche = None
-            for v in cycle:
-                d = D[q, v]
-                if d < distance_q_cycle:
-                    distance_q_cycle = d
-                    sommet_proche = v
-
-            if distance_q_cycle < meilleure_distance:
-                meilleure_distance = distance_q_cycle
-                meilleur_q = q
-                ancre = sommet_proche
-
-        q = meilleur_q
+        # (argmin renvoie le plus petit indice en cas d'egalite, comme le parcours de l'ensemble)
+        q = int(np.argmin(distance_cycle))
+        ancre = int(ancres[q])
 
         # 2) Inserer q au meilleur endroit autour de l'ancre
-        m = len(cycle)
-        indice_ancre = cycle.index(ancre)
-
         if m == 1:
-            cycle.append(q)
+            suivant[ancre] = precedent[ancre] = q
+            suivant[q] = precedent[q] = ancre
         else:
-            precedent = cycle[(indice_ancre - 1) % m]
-            suivant = cycle[(indice_ancre + 1) % m]
+            prec = precedent[ancre]
+            suiv = suivant[ancre]
 
             # Gain si on insere entre precedent -- ancre
-            gain_precedent = (D[precedent, q] + D[q, ancre]) - D[precedent, ancre]
+            gain_precedent = (D[prec, q] + D[q, ancre]) - D[prec, ancre]
 
             # Gain si on insere entre ancre -- suivant
-            gain_suivant = (D[ancre, q] + D[q, suivant]) - D[ancre, suivant]
+            gain_suivant = (D[ancre, q] + D[q, suiv]) - D[ancre, suiv]
 
             if gain_precedent <= gain_suivant:
                 # on met q avant l'ancre
-                cycle.insert(indice_ancre, q)
+                suivant[prec] = q
+                precedent[q] = prec
+                suivant[q] = ancre
+                precedent[ancre] = q
+                if ancre == tete:
+                    tete = q
             else:
                 # on met q apres l'ancre
-                cycle.insert(indice_ancre + 1, q)
-
-        non_visites.remove(q)
+                suivant[ancre] = q
+                precedent[q] = ancre
+                suivant[q] = suiv
+                precedent[suiv] = q
+        m += 1
+
+        non_visites[q] = False
+        distance_cycle[q] = np.inf
+
+        # 3) Mettre a jour la distance au cycle avec le seul nouveau sommet q
+        ligne = np.asarray(D[q], dtype=np.float64)
+        plus_proche = (ligne < distance_cycle) & non_visites
+        egalite = (ligne == distance_cycle) & non_visites
+
+        if instrumentation is not None:
+            instrumentation.compter("insertions")
+            if m % 1024 == 0:
+                instrumentation.progression(insertions=m - 1, n=n)
+
+        if egalite.any():
+            if instrumentation is not None:
+                instrumentation.compter("egalites")
+            # A distance egale, l'ancre est le sommet qui apparait en premier dans la liste :
+            # l'ordre relatif des sommets deja inseres ne change plus, il suffit de le comparer une fois
+            rang = _rangs(suivant, tete, n)
+            for v in np.flatnonzero(egalite):
+                if rang[q] < rang[ancres[v]]:
+                    ancres[v] = q
+
+        distance_cycle[plus_proche] = ligne[plus_proche]
+        ancres[plus_proche] = q
+
+    cycle = []
+    v = tete
+    for _ in range(n):
+        cycle.append(v)
+        v = suivant[v]
 
     longueur = float(calculer_longueur_cycle(cycle, D))
+    if instrumentation is not None:
+        instrumentation.ajouter_duree("ppp", time.perf_counter() - debut)
+        return cycle, longueur, instrumentation
     return cycle, longueur
+
+
+def _rangs(suivant, tete, n):
+    """Position de chaque sommet du cycle dans la liste (parcours depuis la tete)."""
+    rang = [n] * n
+    v = tete
+    r = 0
+    while rang[v] == n:
+        rang[v] = r
+        r += 1
+        v = suivant[v]
+    return rang
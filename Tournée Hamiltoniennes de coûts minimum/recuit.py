@@ -0,0 +1,175 @@
+# Recuit simulé : amélioration "à tout moment" d'une tournée, dans un budget de temps.
+# Quand opt_ppp est bloqué dans un optimum local, le recuit accepte parfois
+# des coups qui allongent la tournée pour en sortir, de moins en moins souvent.
+
+import math
+import time
+
+import numpy as np
+
+from utils import calculer_longueur_cycle, distances_paires, voisins_proches
+from OptPPP import EPSILON
+from OptSegments import permuter_blocs
+from tournee import Tournee, inverser_segment, rendre_comme
+
+# Nombre de coups tirés d'un coup (et entre deux lectures de l'horloge)
+TAILLE_TIRAGE = 256
+
+
+def recuit_simule(cycle, D, temps_max=1.0, graine=None, k=8, voisins=None, iterations_max=None,
+                  acceptation_initiale=0.3, refroidissement=1e-3, instrumentation=None):
+    """
+    Recuit simulé sur deux coups évalués en O(1) sur D, restreints aux listes
+    de voisins (a tiré au hasard, c parmi ses k plus proches voisins) :
+    - 2-opt : on ajoute l'arête (a, c) (avec les successeurs ou les prédécesseurs)
+    - déplacement : a est retiré et réinséré juste après c (ou juste avant)
+    Un coup qui allonge la tournée de delta est accepté avec probabilité
+    exp(-delta / T). T part de T0, choisi pour accepter environ
+    acceptation_initiale des coups défavorables, et décroît géométriquement
+    avec le temps écoulé jusqu'à T0 * refroidissement à l'échéance.
+
+    - temps_max : échéance en secondes (horloge monotone, vérifiée tous les
+      TAILLE_TIRAGE coups) ; None pour ne s'arrêter qu'après iterations_max
+    - iterations_max : nombre maximal de coups tirés ; avec temps_max=None, le
+      résultat ne dépend que de la graine (reproductible à l'identique)
+    - graine : graine du générateur (np.random.default_rng)
+    - instrumentation : compteurs iterations, acceptations, ameliorations, serie
+      meilleure_longueur ; son rappel peut arrêter la recherche
+    Retourne (meilleur cycle rencontré, sa longueur), le cycle du type reçu
+    (liste, tableau ou tournee.Tournee, modifiés sur place pour une liste ou une Tournee).
+    """
+    if temps_max is None and iterations_max is None:
+        raise ValueError("Il faut un budget : temps_max ou iterations_max.")
+
+    debut = time.monotonic()
+    n = len(cycle)
+    if n <= 4:
+        longueur = float(calculer_longueur_cycle(cycle, D))
+        return (cycle, longueur) if instrumentation is None else (cycle, longueur, instrumentation)
+
+    rng = np.random.default_rng(graine)
+    if voisins is None:
+        voisins = voisins_proches(D, k)
+    voisins = np.asarray(voisins)
+    k = voisins.shape[1]
+
+    tournee = Tournee(cycle)
+    ordre, position = tournee.ordre, tournee.position
+    longueur = float(calculer_longueur_cycle(ordre, D))
+    meilleure_longueur = longueur
+    meilleur_ordre = ordre.copy()
+    # Le meilleur cycle n'est recopié qu'au moment de le quitter par un coup défavorable
+    meilleur_a_copier = False
+
+    t0 = _temperature_initiale(ordre, position, D, voisins, rng, acceptation_initiale)
+    temperature = t0
+    iterations = 0
+
+    while True:
+        # Avancement du budget (0 -> 1) : temps et/ou nombre de coups
+        avancement = 0.0
+        if temps_max is not None:
+            avancement = (time.monotonic() - debut) / temps_max if temps_max > 0 else 1.0
+        if iterations_max is not None:
+            avancement = max(avancement, iterations / iterations_max)
+        if avancement >= 1.0:
+            break
+        if instrumentation is not None and instrumentation.progression(
+                iterations=iterations, longueur=longueur, meilleure_longueur=meilleure_longueur,
+                temperature=temperature):
+            break
+        temperature = t0 * refroidissement ** avancement
+
+        taille = TAILLE_TIRAGE if iterations_max is None else min(TAILLE_TIRAGE, iterations_max - iterations)
+        sommets = rng.integers(0, n, taille).tolist()
+        rangs = rng.integers(0, k, taille).tolist()
+        types = rng.integers(0, 4, taille).tolist()
+        hasards = rng.random(taille).tolist()
+        acceptations = 0
+
+        for a, r, t, u in zip(sommets, rangs, types, hasards):
+            c = int(voisins[a, r])
+            pa = int(position[a])
+            pc = int(position[c])
+
+            if t == 0:
+                # 2-opt, successeurs : (a, a+) et (c, c+) -> (a, c) et (a+, c+)
+                b = int(ordre[(pa + 1) % n])
+                d = int(ordre[(pc + 1) % n])
+                if c == b or d == a:
+                    continue
+                delta = D[a, c] + D[b, d] - D[a, b] - D[c, d]
+            elif t == 1:
+                # 2-opt, prédécesseurs : (a-, a) et (c-, c) -> (a, c) et (a-, c-)
+                b = int(ordre[pa - 1])
+                d = int(ordre[pc - 1])
+                if c == b or d == a:
+                    continue
+                delta = D[a, c] + D[b, d] - D[b, a] - D[d, c]
+            else:
+                # Déplacement de a entre x et y = x+ (x = c, ou x = c- pour "avant c")
+                x = c if t == 2 else int(ordre[pc - 1])
+                p = int(ordre[pa - 1])
+                s = int(ordre[(pa + 1) % n])
+                if x == a or x == p:
+                    continue
+                y = int(ordre[(int(position[x]) + 1) % n])
+                delta = D[p, s] - D[p, a] - D[a, s] + D[x, a] + D[a, y] - D[x, y]
+
+            if delta >= -EPSILON and u >= math.exp(-max(delta, 0.0) / temperature):
+                continue
+
+            if delta > 0 and meilleur_a_copier:
+                meilleur_ordre[:] = ordre
+                meilleur_a_copier = False
+
+            if t == 0:
+                inverser_segment(ordre, position, (pa + 1) % n, pc)
+            elif t == 1:
+                inverser_segment(ordre, position, pa, (pc - 1) % n)
+            else:
+                # X = [a], Y = a+ .. x, Z = le reste : Y X Z place a juste après x
+                permuter_blocs(ordre, position, pa, 1, (int(position[x]) - pa) % n)
+            longueur += delta
+            acceptations += 1
+
+            if longueur < meilleure_longueur - EPSILON:
+                meilleure_longueur = longueur
+                meilleur_a_copier = True
+                if instrumentation is not None:
+                    instrumentation.compter("ameliorations")
+                    instrumentation.noter("meilleure_longueur", meilleure_longueur)
+
+        iterations += taille
+        if instrumentation is not None:
+            instrumentation.compter("iterations", taille)
+            instrumentation.compter("acceptations", acceptations)
+
+    if meilleur_a_copier:
+        meilleur_ordre[:] = ordre
+
+    resultat = rendre_comme(cycle, meilleur_ordre)
+    meilleure_longueur = float(calculer_longueur_cycle(meilleur_ordre, D))
+    if instrumentation is not None:
+        instrumentation.ajouter_duree("recuit", time.monotonic() - debut)
+        return resultat, meilleure_longueur, instrumentation
+    return resultat, meilleure_longueur
+
+
+def _temperature_initiale(ordre, position, D, voisins, rng, acceptation, echantillon=1000):
+    """
+    Température telle qu'un coup 2-opt défavorable moyen (tiré comme dans
+    le recuit) soit accepté avec probabilité `acceptation`.
+    """
+    n = len(ordre)
+    a = rng.integers(0, n, echantillon)
+    c = voisins[a, rng.integers(0, voisins.shape[1], echantillon)]
+    b = ordre[(position[a] + 1) % n]
+    d = ordre[(position[c] + 1) % n]
+    valides = (c != b) & (d != a)
+    a, b, c, d = a[valides], b[valides], c[valides], d[valides]
+    deltas = distances_paires(D, a, c) + distances_paires(D, b, d) \
+        - distances_paires(D, a, b) - distances_paires(D, c, d)
+    positifs = deltas[deltas > EPSILON]
+    moyenne = float(positifs.mean()) if len(positifs) else 1e-9
+    return -moyenne / math.log(acceptation)
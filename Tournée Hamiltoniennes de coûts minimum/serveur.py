@@ -0,0 +1,479 @@
+# Serveur local de résolution : une requête JSON par ligne, réponses JSON par ligne.
+#
+#   python serveur.py                      # sur l'entrée / la sortie standard
+#   python serveur.py --port 8765          # en TCP, sur 127.0.0.1 seulement
+#
+# Requête :
+#   {"id": "r1", "points": [[x, y], ...], "pipeline": "ppp->opt_ppp",
+#    "delai": 2.0, "progression": true}
+# ("fichier": chemin peut remplacer "points" ; une étape peut porter des options,
+#  par exemple "pipeline": ["ppp", {"nom": "recuit", "temps_max": 1.0}])
+# Réponses, toutes avec "id" : "accepte", puis des "progression" si demandé,
+# puis "resultat" (cycle, longueur, détail des étapes) ou "erreur".
+#
+# Le calcul se fait dans deux pools de processus : une voie rapide et une voie
+# lente (hds, held_karp, recuit, partition, ou grandes instances), chacune avec
+# sa file bornée : une petite requête ne passe jamais derrière un long hds.
+# Quand une file est pleine, la requête est refusée tout de suite ("occupe").
+
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Aucune fenêtre : utils importe matplotlib.pyplot
+import matplotlib
+matplotlib.use("Agg")
+
+import numpy as np
+
+from utils import (
+    calculer_matrice_distances,
+    charger_points_fichier,
+    DistancesALaDemande,
+    longueur_cycle_points,
+)
+from ppp import ppp
+from OptPPP import opt_ppp
+from OptPrim import OptPrim
+from OptSegments import opt_segments
+from hds import hds
+from held_karp import held_karp
+from constructions import glouton_aretes, christofides
+from partition import tournee_hilbert, resoudre_par_partition
+from recuit import recuit_simule
+from instrumentation import Instrumentation
+
+# Étapes qui construisent une tournée depuis rien / qui en améliorent une
+# (hds peut faire les deux : après une autre étape, il part de sa tournée)
+CONSTRUCTIONS = ("ppp", "OptPrim", "glouton_aretes", "christofides", "hilbert", "partition", "hds", "held_karp")
+AMELIORATIONS = ("opt_ppp", "opt_ppp_voisins", "opt_segments", "recuit", "hds")
+# Étapes envoyées dans la voie lente quelle que soit la taille de l'instance
+ETAPES_LENTES = ("hds", "held_karp", "recuit", "partition")
+
+# Au-delà, les distances sont calculées à la demande (pas de matrice n x n)
+N_MAX_MATRICE = 5000
+# hds sans budget de temps est refusé au-delà de cette taille
+N_MAX_HDS_SANS_BUDGET = 13
+# held_karp : O(2^n n^2), au-delà la réponse n'arriverait pas
+N_MAX_HELD_KARP = 20
+# Lecture de l'horloge (échéance) par les solveurs, en secondes
+INTERVALLE_ECHEANCE = 0.05
+
+
+def lire_pipeline(spec):
+    """
+    Liste [(nom, options)] depuis "ppp->opt_ppp", ["ppp", "opt_ppp"] ou
+    [{"nom": "recuit", "temps_max": 1.0}, ...]. Lève ValueError si la
+    suite d'étapes n'a pas de sens (elle doit commencer par une construction).
+    """
+    if isinstance(spec, str):
+        spec = [e.strip() for e in spec.replace("→", "->").split("->")]
+    if not isinstance(spec, list) or not spec:
+        raise ValueError("pipeline doit être une liste d'étapes ou une chaîne 'a->b'")
+
+    etapes = []
+    for element in spec:
+        if isinstance(element, dict):
+            options = dict(element)
+            nom = options.pop("nom", None)
+        else:
+            nom, options = element, {}
+        if nom not in CONSTRUCTIONS and nom not in AMELIORATIONS:
+            raise ValueError("Étape inconnue : {} (attendu un de {})".format(
+                nom, ", ".join(sorted(set(CONSTRUCTIONS + AMELIORATIONS)))))
+        etapes.append((nom, options))
+
+    if etapes[0][0] not in CONSTRUCTIONS:
+        raise ValueError("La première étape doit construire une tournée ({})".format(", ".join(CONSTRUCTIONS)))
+    for nom, _ in etapes[1:]:
+        if nom not in AMELIORATIONS:
+            raise ValueError("Seule la première étape peut être une construction (reçu {} ensuite)".format(nom))
+    return etapes
+
+
+def verifier_pipeline(etapes, n, delai=None):
+    """Refuse d'avance les étapes exactes qui ne finiraient pas sur n points."""
+    for nom, options in etapes:
+        if nom == "hds" and n > N_MAX_HDS_SANS_BUDGET and options.get("temps_max") is None and delai is None:
+            raise ValueError("hds sur {} points demande un budget (temps_max ou delai)".format(n))
+        if nom == "held_karp" and n > N_MAX_HELD_KARP:
+            raise ValueError("held_karp limité à {} points (reçu {})".format(N_MAX_HELD_KARP, n))
+
+
+# --- Côté processus de calcul ---
+
+# File des messages de progression vers le serveur (remplie par _initialiser_processus)
+_FILE_PROGRESSION = None
+
+
+def _initialiser_processus(file_progression):
+    global _FILE_PROGRESSION
+    _FILE_PROGRESSION = file_progression
+
+
+def executer_pipeline(cle, points, etapes, echeance=None, progression=False, intervalle=0.5):
+    """
+    Exécute les étapes sur les points (dans un processus du pool).
+    echeance : instant time.monotonic() (commun aux processus) au-delà duquel on
+    rend la meilleure tournée obtenue ; les solveurs budgetés (hds, recuit)
+    reçoivent le temps restant, les autres s'arrêtent au prochain point de mesure.
+    progression : envoie l'état des solveurs toutes les `intervalle` secondes
+    dans _FILE_PROGRESSION, étiqueté par cle.
+    Retourne un dictionnaire (cycle, longueur, etapes, statut, infos).
+    """
+    points = np.asarray(points, dtype=np.float64)
+    n = len(points)
+    D = calculer_matrice_distances(points) if n <= N_MAX_MATRICE else DistancesALaDemande(points)
+
+    def restant():
+        return None if echeance is None else max(0.0, echeance - time.monotonic())
+
+    cycle = None
+    details = []
+    infos = {}
+    statut = "termine"
+    for nom, options in etapes:
+        # La construction est toujours faite : il faut une tournée à rendre
+        if cycle is not None and echeance is not None and time.monotonic() >= echeance:
+            statut = "echeance"
+            break
+
+        dernier_envoi = [0.0]
+
+        def rappel(etat, nom=nom):
+            # Appelé souvent pour tenir l'échéance ; la progression n'est envoyée qu'à chaque intervalle
+            maintenant = time.monotonic()
+            if progression and _FILE_PROGRESSION is not None and maintenant - dernier_envoi[0] >= intervalle:
+                dernier_envoi[0] = maintenant
+                _FILE_PROGRESSION.put((cle, nom, etat))
+            return echeance is not None and maintenant >= echeance
+
+        instrumentation = Instrumentation(rappel=rappel, intervalle=min(intervalle, INTERVALLE_ECHEANCE))
+        debut = time.perf_counter()
+        cycle, longueur = _executer_etape(nom, options, cycle, points, D, restant(), instrumentation, infos)[:2]
+        details.append({"nom": nom, "longueur": float(longueur), "duree": time.perf_counter() - debut})
+        if instrumentation.arret_demande or (echeance is not None and time.monotonic() >= echeance):
+            statut = "echeance"
+
+    cycle = [int(v) for v in cycle]
+    return {
+        "cycle": cycle,
+        "longueur": longueur_cycle_points(points, cycle) if cycle else 0.0,
+        "etapes": details,
+        "statut": statut,
+        "infos": infos,
+    }
+
+
+def _executer_etape(nom, options, cycle, points, D, restant, instrumentation, infos):
+    """
+    Une étape du pipeline ; renvoie (cycle, longueur, ...). Chaque solveur
+    reçoit l'instrumentation (dont le rappel tient l'échéance) ou le temps
+    restant, sauf glouton_aretes, christofides et hilbert, en O(n k log n).
+    """
+    n = len(points)
+    if nom == "ppp":
+        return ppp(D, depart=options.get("depart", 0), instrumentation=instrumentation)
+    if nom == "OptPrim":
+        methode = options.get("methode", "dense" if n <= N_MAX_MATRICE else "geometrique")
+        return OptPrim(points, D, depart=options.get("depart", 0), methode=methode, instrumentation=instrumentation)
+    if nom == "glouton_aretes":
+        return glouton_aretes(points, D, k=options.get("k", 10))
+    if nom == "christofides":
+        return christofides(points, D, k=options.get("k", 10))
+    if nom == "hilbert":
+        return tournee_hilbert(points)
+    if nom == "partition":
+        return resoudre_par_partition(points, taille_cellule=options.get("taille_cellule", 200),
+                                      methode=options.get("methode", "kd"), instrumentation=instrumentation)
+    if nom == "hds":
+        infos_hds = {}
+        resultat = hds(D, temps_max=_budget(options.get("temps_max"), restant), infos=infos_hds,
+                       borne=options.get("borne", "demi_somme"), cycle_initial=cycle,
+                       instrumentation=instrumentation)
+        infos["hds"] = {c: infos_hds.get(c) for c in ("statut", "borne_inf", "ecart", "noeuds_developpes")}
+        return resultat
+    if nom == "held_karp":
+        return held_karp(D, instrumentation=instrumentation)
+
+    if nom in ("opt_ppp", "opt_ppp_voisins"):
+        mode = "voisins" if nom == "opt_ppp_voisins" or n > 1000 else options.get("mode", "classique")
+        return opt_ppp(cycle, D, mode=mode, instrumentation=instrumentation)
+    if nom == "opt_segments":
+        return opt_segments(cycle, D, instrumentation=instrumentation)
+    if nom == "recuit":
+        temps_max = _budget(options.get("temps_max", 1.0), restant)
+        return recuit_simule(cycle, D, temps_max=temps_max, graine=options.get("graine"),
+                             instrumentation=instrumentation)
+    raise ValueError("Étape inconnue : {}".format(nom))
+
+
+def _budget(demande, restant):
+    """Le plus petit des deux budgets donnés (None = pas de limite)."""
+    budgets = [b for b in (demande, restant) if b is not None]
+    return min(budgets) if budgets else None
+
+
+# --- Côté serveur (boucle asyncio) ---
+
+class Serveur:
+    """
+    Répartit les requêtes sur deux voies (rapide / lente), chacune formée d'une
+    file asyncio bornée et d'un pool de processus ; chaque voie a autant de
+    tâches asyncio que de processus, qui prennent les requêtes dans l'ordre.
+    - seuil_lent : au-delà de ce nombre de points, une requête va dans la voie lente
+    - taille_file : requêtes en attente par voie ; au-delà, refus immédiat ("occupe")
+    - delai_defaut : délai (secondes) des requêtes qui n'en précisent pas
+    """
+
+    def __init__(self, processus_rapides=1, processus_lents=1, taille_file=16, seuil_lent=2000,
+                 delai_defaut=None, marge=2.0):
+        self.processus = {"rapide": processus_rapides, "lente": processus_lents}
+        self.taille_file = taille_file
+        self.seuil_lent = seuil_lent
+        self.delai_defaut = delai_defaut
+        # Temps laissé à un processus pour rendre son résultat après l'échéance
+        self.marge = marge
+        self._cles = itertools.count()
+        self._envois = {}
+        self._taches = []
+
+    async def demarrer(self):
+        # "spawn" : avec fork, les processus (créés à la première requête) hériteraient
+        # des sockets des clients, qui ne seraient plus fermées par close()
+        contexte = multiprocessing.get_context("spawn")
+        self._file_progression = contexte.Queue()
+        self._files = {}
+        self._pools = {}
+        for voie, nb in self.processus.items():
+            self._files[voie] = asyncio.Queue(maxsize=self.taille_file)
+            self._pools[voie] = ProcessPoolExecutor(max_workers=nb, mp_context=contexte,
+                                                    initializer=_initialiser_processus,
+                                                    initargs=(self._file_progression,))
+            for _ in range(nb):
+                self._taches.append(asyncio.create_task(self._travailleur(voie)))
+        self._taches.append(asyncio.create_task(self._relayer_progression()))
+
+    async def fermer(self):
+        for tache in self._taches:
+            tache.cancel()
+        await asyncio.gather(*self._taches, return_exceptions=True)
+        self._file_progression.put(None)
+        for pool in self._pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def traiter_ligne(self, ligne, envoyer):
+        """Valide une requête et la place dans la file de sa voie (ou répond par une erreur)."""
+        identifiant = None
+        try:
+            requete = json.loads(ligne)
+            if not isinstance(requete, dict):
+                raise ValueError("une requête est un objet JSON")
+            identifiant = requete.get("id")
+            if "points" in requete:
+                points = np.asarray(requete["points"], dtype=np.float64)
+            elif "fichier" in requete:
+                if not isinstance(requete["fichier"], str):
+                    raise ValueError("fichier doit être un chemin (chaîne)")
+                # Vérifié ici : charger_points_fichier l'écrirait sur la sortie standard
+                if not os.path.isfile(requete["fichier"]):
+                    raise ValueError("fichier introuvable : {}".format(requete["fichier"]))
+                points = charger_points_fichier(requete["fichier"])
+            else:
+                raise ValueError("il faut 'points' ou 'fichier'")
+            if points.ndim != 2 or points.shape[1] != 2 or len(points) == 0:
+                raise ValueError("les points doivent former une liste non vide de couples [x, y]")
+            etapes = lire_pipeline(requete.get("pipeline", "ppp->opt_ppp"))
+            delai = requete.get("delai", self.delai_defaut)
+            # bool est un sous-type de int : true ne doit pas valoir 1 seconde
+            if delai is not None and (isinstance(delai, bool) or not isinstance(delai, (int, float))
+                                      or not delai > 0):
+                raise ValueError("delai doit être un nombre de secondes > 0")
+            verifier_pipeline(etapes, len(points), delai)
+        except (ValueError, TypeError) as erreur:
+            await envoyer({"id": identifiant, "type": "erreur", "message": str(erreur)})
+            return
+
+        lente = len(points) > self.seuil_lent or any(nom in ETAPES_LENTES for nom, _ in etapes)
+        voie = "lente" if lente else "rapide"
+        travail = {
+            "cle": next(self._cles), "id": identifiant, "points": points, "etapes": etapes,
+            "echeance": None if delai is None else time.monotonic() + delai,
+            "progression": bool(requete.get("progression", False)), "envoyer": envoyer,
+        }
+        try:
+            self._files[voie].put_nowait(travail)
+        except asyncio.QueueFull:
+            await envoyer({"id": identifiant, "type": "erreur", "message": "occupe",
+                           "voie": voie, "file": self.taille_file})
+            return
+        await envoyer({"id": identifiant, "type": "accepte", "voie": voie,
+                       "position": self._files[voie].qsize()})
+
+    async def _travailleur(self, voie):
+        boucle = asyncio.get_running_loop()
+        file = self._files[voie]
+        while True:
+            travail = await file.get()
+            identifiant, envoyer, echeance = travail["id"], travail["envoyer"], travail["echeance"]
+            futur = None
+            try:
+                if echeance is not None and time.monotonic() >= echeance:
+                    raise asyncio.TimeoutError
+                self._envois[travail["cle"]] = (identifiant, envoyer)
+                futur = boucle.run_in_executor(
+                    self._pools[voie], executer_pipeline, travail["cle"], travail["points"],
+                    travail["etapes"], echeance, travail["progression"])
+                attente = None if echeance is None else echeance - time.monotonic() + self.marge
+                resultat = await asyncio.wait_for(asyncio.shield(futur), attente)
+                resultat.update(id=identifiant, type="resultat")
+                await _envoyer_si_connecte(envoyer, resultat)
+            except asyncio.TimeoutError:
+                self._envois.pop(travail["cle"], None)
+                await _envoyer_si_connecte(envoyer, {"id": identifiant, "type": "erreur", "message": "delai depasse"})
+                if futur is not None:
+                    # Le processus continue ce travail : la voie reste occupée jusqu'à
+                    # sa fin, sinon la requête suivante attendrait dans le pool, hors de
+                    # la file bornée, et le refus "occupe" ne protégerait plus rien
+                    await asyncio.gather(futur, return_exceptions=True)
+            except asyncio.CancelledError:
+                raise
+            except Exception as erreur:
+                await _envoyer_si_connecte(envoyer, {"id": identifiant, "type": "erreur",
+                                                     "message": "{}: {}".format(type(erreur).__name__, erreur)})
+            finally:
+                self._envois.pop(travail["cle"], None)
+                file.task_done()
+
+    async def _relayer_progression(self):
+        """Transmet au bon client les messages de progression envoyés par les processus."""
+        boucle = asyncio.get_running_loop()
+        while True:
+            message = await boucle.run_in_executor(None, self._file_progression.get)
+            if message is None:
+                return
+            cle, etape, etat = message
+            destinataire = self._envois.get(cle)
+            if destinataire is not None:
+                identifiant, envoyer = destinataire
+                await _envoyer_si_connecte(envoyer, {"id": identifiant, "type": "progression",
+                                                     "etape": etape, "etat": etat})
+
+
+async def _envoyer_si_connecte(envoyer, message):
+    """
+    Envoie un message ; si le client s'est déconnecté, le message est perdu
+    mais l'erreur ne remonte pas : la tâche de la voie (ou le relais) continue.
+    """
+    try:
+        await envoyer(message)
+    except (ConnectionError, OSError):
+        pass
+
+
+def _en_json(valeur):
+    """Scalaires et tableaux numpy présents dans les états des solveurs."""
+    if isinstance(valeur, (np.generic, np.ndarray)):
+        return valeur.tolist()
+    raise TypeError("Non sérialisable en JSON : {!r}".format(valeur))
+
+
+def _ecrivain(ecrire, vider):
+    """Fonction d'envoi d'un message JSON par ligne, sérialisée par un verrou."""
+    verrou = asyncio.Lock()
+
+    async def envoyer(message):
+        ligne = (json.dumps(message, default=_en_json) + "\n").encode()
+        async with verrou:
+            ecrire(ligne)
+            await vider()
+
+    return envoyer
+
+
+async def _servir_flux(serveur, lecteur, envoyer):
+    """Lit les requêtes ligne par ligne jusqu'à la fin du flux, puis attend les réponses en cours."""
+    en_cours = set()
+    while True:
+        ligne = await lecteur.readline()
+        if not ligne:
+            break
+        if ligne.strip():
+            tache = asyncio.create_task(serveur.traiter_ligne(ligne, envoyer))
+            en_cours.add(tache)
+            tache.add_done_callback(en_cours.discard)
+    await asyncio.gather(*en_cours)
+    for file in serveur._files.values():
+        await file.join()
+
+
+async def servir_stdio(serveur):
+    boucle = asyncio.get_running_loop()
+    lecteur = asyncio.StreamReader(limit=2**26)
+    await boucle.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(lecteur), sys.stdin)
+
+    async def vider():
+        sys.stdout.flush()
+
+    await _servir_flux(serveur, lecteur, _ecrivain(sys.stdout.buffer.write, vider))
+
+
+async def servir_tcp(serveur, port, hote="127.0.0.1"):
+    async def client(lecteur, redacteur):
+        try:
+            await _servir_flux(serveur, lecteur, _ecrivain(redacteur.write, redacteur.drain))
+        except ConnectionError:
+            pass
+        finally:
+            redacteur.close()
+
+    tcp = await asyncio.start_server(client, hote, port, limit=2**26)
+    print("Serveur à l'écoute sur {}:{}".format(hote, port), file=sys.stderr)
+    async with tcp:
+        await tcp.serve_forever()
+
+
+async def _principal(args):
+    serveur = Serveur(processus_rapides=args.processus_rapides, processus_lents=args.processus_lents,
+                      taille_file=args.taille_file, seuil_lent=args.seuil_lent, delai_defaut=args.delai)
+    await serveur.demarrer()
+    # SIGTERM ferme proprement les pools (pas d'ajout de gestionnaire sous Windows)
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:
+        pass
+    try:
+        if args.port is None:
+            await servir_stdio(serveur)
+        else:
+            await servir_tcp(serveur, args.port)
+    finally:
+        await serveur.fermer()
+
+
+def main(arguments=None):
+    parseur = argparse.ArgumentParser(description="Serveur local de résolution (JSON par ligne).")
+    parseur.add_argument("--port", type=int, help="port TCP sur 127.0.0.1 (par défaut : entrée/sortie standard)")
+    parseur.add_argument("--processus-rapides", type=int, default=1)
+    parseur.add_argument("--processus-lents", type=int, default=1)
+    parseur.add_argument("--taille-file", type=int, default=16)
+    parseur.add_argument("--seuil-lent", type=int, default=2000,
+                         help="nombre de points au-delà duquel une requête passe dans la voie lente")
+    parseur.add_argument("--delai", type=float, help="délai par défaut des requêtes (secondes)")
+    args = parseur.parse_args(arguments)
+    try:
+        asyncio.run(_principal(args))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+import math
+
+import numpy as np
+
+
+class StatistiquesFlux:
+    """
+    Statistiques d'une suite de valeurs reçues une par une, en mémoire constante :
+    - moyenne et variance exactes par l'algorithme de Welford (stable numériquement) ;
+    - quantiles estimés sur un échantillon de taille_reservoir valeurs tirées
+      uniformément parmi toutes celles reçues (échantillonnage par réservoir).
+    Tant que moins de taille_reservoir valeurs ont été reçues, les quantiles sont exacts.
+    graine fixe le tirage du réservoir (résultats reproductibles pour une même suite).
+    """
+
+    def __init__(self, taille_reservoir=10000, graine=0):
+        self.nombre = 0
+        self.moyenne = 0.0
+        self._m2 = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self._reservoir = np.empty(taille_reservoir, dtype=np.float64)
+        self._rng = np.random.default_rng(graine)
+
+    def ajouter(self, valeur):
+        valeur = float(valeur)
+        self.nombre += 1
+        delta = valeur - self.moyenne
+        self.moyenne += delta / self.nombre
+        self._m2 += delta * (valeur - self.moyenne)
+        self.minimum = min(self.minimum, valeur)
+        self.maximum = max(self.maximum, valeur)
+
+        taille = len(self._reservoir)
+        if self.nombre <= taille:
+            self._reservoir[self.nombre - 1] = valeur
+        else:
+            # La valeur remplace une case du réservoir avec probabilité taille / nombre
+            j = int(self._rng.integers(self.nombre))
+            if j < taille:
+                self._reservoir[j] = valeur
+
+    @property
+    def variance(self):
+        """Variance empirique (non biaisée), nan avec moins de 2 valeurs."""
+        return self._m2 / (self.nombre - 1) if self.nombre > 1 else math.nan
+
+    @property
+    def ecart_type(self):
+        return math.sqrt(self.variance)
+
+    def quantile(self, q):
+        """Quantile d'ordre q (0 <= q <= 1), ou plusieurs si q est une liste."""
+        if self.nombre == 0:
+            return math.nan
+        echantillon = self._reservoir[:min(self.nombre, len(self._reservoir))]
+        return np.quantile(echantillon, q)
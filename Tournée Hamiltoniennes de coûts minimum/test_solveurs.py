@@ -0,0 +1,584 @@
+# Tests de non-régression : python -m pytest -q (depuis ce dossier)
+
+import asyncio
+import itertools
+import json
+import os
+import time
+
+import matplotlib
+matplotlib.use("Agg")
+
+import numpy as np
+import pytest
+
+from utils import calculer_matrice_distances, calculer_longueur_cycle, DistancesALaDemande, longueur_cycle_points
+from utils import charger_points_fichier, sauver_points_binaire, voisins_proches
+from ppp import ppp
+from hds import hds
+from held_karp import held_karp
+import main
+from main import etude_statistique
+from cache import CacheDisque, empreinte_points
+import lot
+from lot import departs_repartis, ppp_multi_departs, ppp_lot, opt_ppp_lot, matrices_distances_lot
+from OptPPP import EPSILON, opt_ppp_voisins
+from OptSegments import opt_segments
+from tournee import Tournee
+from dynamique import TourneeDynamique
+from serveur import Serveur, executer_pipeline, lire_pipeline, verifier_pipeline
+
+
+@pytest.fixture
+def points():
+    return np.random.default_rng(0).random((40, 2))
+
+
+def test_distances_a_la_demande_comme_matrice(points):
+    D = calculer_matrice_distances(points)
+    Dd = DistancesALaDemande(points)
+    u = np.array([3, 7, 7, 0, 39])
+    v = np.array([5, 2, 7, 39, 1])
+    cles = [
+        (4, 9),                   # scalaire
+        4,                        # ligne
+        slice(5, 12),             # bloc de lignes
+        (4, u),                   # ligne, colonnes choisies
+        (slice(2, 8), u),         # bloc, colonnes choisies
+        (u, 6),                   # colonne, lignes choisies
+        (u, slice(1, 4)),         # lignes choisies, bloc de colonnes
+        (u, v),                   # paires terme à terme
+        (list(u), list(v)),
+        (u[:, None], v[None, :]), # paires diffusées (sous-matrice)
+    ]
+    for cle in cles:
+        attendu = D[cle]
+        obtenu = Dd[cle]
+        assert np.shape(obtenu) == np.shape(attendu), cle
+        assert np.allclose(obtenu, attendu), cle
+
+
+def test_distances_a_la_demande_avec_cache(points):
+    D = calculer_matrice_distances(points)
+    Dd = DistancesALaDemande(points, taille_cache=4)
+    for i in (1, 2, 1, 3, 4, 5, 1):
+        assert np.allclose(Dd[i], D[i])
+        assert Dd[i, 7] == pytest.approx(D[i, 7])
+    assert len(Dd._cache) <= 4
+
+
+def test_tournee_array_copie():
+    t = Tournee([2, 0, 1])
+    assert np.asarray(t) is t.ordre
+    copie = np.array(t)
+    copie[0] = 1
+    assert t.ordre[0] == 2
+    assert np.array(t, dtype=np.int64).dtype == np.int64
+    assert np.asarray(t, dtype=np.int32, copy=False) is t.ordre
+    with pytest.raises(ValueError):
+        np.asarray(t, dtype=np.int64, copy=False)
+
+
+def _verifier_positions(t):
+    assert np.array_equal(t.position[t.ordre], np.arange(len(t)))
+    assert (t.position >= 0).sum() == len(t)
+
+
+def test_tournee_deltas_et_positions(points):
+    D = calculer_matrice_distances(points)
+    rng = np.random.default_rng(1)
+    n = len(points)
+    t = Tournee(rng.permutation(n))
+    _verifier_positions(t)
+    for _ in range(200):
+        i, j = sorted(rng.choice(len(t), 2, replace=False).tolist())
+        avant = t.longueur(D)
+        delta = t.delta_2opt(D, i, j)
+        t.deux_opt(i, j)
+        _verifier_positions(t)
+        assert t.longueur(D) - avant == pytest.approx(delta, abs=1e-9)
+
+        v = int(rng.choice(t.ordre))
+        avant = t.longueur(D)
+        delta = t.delta_retrait(D, v)
+        t.retirer(v)
+        _verifier_positions(t)
+        assert v not in t
+        assert t.longueur(D) - avant == pytest.approx(delta, abs=1e-9)
+
+        i = int(rng.integers(len(t)))
+        avant = t.longueur(D)
+        delta = t.delta_insertion(D, v, i)
+        t.inserer(v, i)
+        _verifier_positions(t)
+        assert t.successeur(t.ordre[i]) == v
+        assert t.longueur(D) - avant == pytest.approx(delta, abs=1e-9)
+
+        # Segment circulaire quelconque, éventuellement à cheval sur la fin
+        i, j = rng.integers(n, size=2).tolist()
+        t.inverser(i, j)
+        _verifier_positions(t)
+    assert sorted(t) == list(range(n))
+
+
+def test_calculer_longueur_cycle(points):
+    D = calculer_matrice_distances(points)
+    cycle = np.random.default_rng(2).permutation(len(points)).tolist()
+    attendu = sum(float(D[cycle[i], cycle[(i + 1) % len(cycle)]]) for i in range(len(cycle)))
+    for forme in (cycle, np.array(cycle), Tournee(cycle), tuple(cycle)):
+        assert calculer_longueur_cycle(forme, D) == pytest.approx(attendu)
+    assert calculer_longueur_cycle(cycle, DistancesALaDemande(points)) == pytest.approx(attendu)
+    assert calculer_longueur_cycle(cycle, D.tolist()) == pytest.approx(attendu)
+    assert calculer_longueur_cycle([], D) == 0.0
+    assert calculer_longueur_cycle([5], D) == 0.0
+    assert calculer_longueur_cycle([3, 8], D) == pytest.approx(2 * D[3, 8])
+
+
+def test_tournee_dynamique_ajouts_retraits():
+    rng = np.random.default_rng(11)
+    t = TourneeDynamique(rng.random((5, 2)), k=4, capacite=4)
+    presents = {i: t.points[i].copy() for i in range(5)}
+    for _ in range(300):
+        if presents and (rng.random() < 0.45 or len(presents) > 40):
+            v = int(rng.choice(list(presents)))
+            t.retirer(v)
+            del presents[v]
+        else:
+            point = rng.random(2)
+            v = t.ajouter(point)
+            assert v not in presents
+            presents[v] = point
+        cycle = t.cycle()
+        assert sorted(cycle) == sorted(presents)
+        _verifier_positions(t.tournee)
+        points = np.array([presents[v] for v in cycle]).reshape(-1, 2)
+        assert t.longueur() == pytest.approx(longueur_cycle_points(points, np.arange(len(cycle))), abs=1e-9)
+    with pytest.raises(KeyError):
+        t.retirer(len(t.actifs) + 1)
+
+
+@pytest.mark.parametrize("contenu, message", [
+    ("(0.5, 1)\n(2, 3)\n(4; 5)\n", "ligne 3"),
+    ("(0.5, 1)\n\n(x, 3)\n", "ligne 3"),
+    ("1, 2\n3, 4, 5\n", "ligne 2"),
+])
+def test_charger_texte_ligne_fautive(tmp_path, contenu, message):
+    chemin = tmp_path / "points.txt"
+    chemin.write_text(contenu)
+    with pytest.raises(ValueError, match="points.txt, {} :".format(message)):
+        charger_points_fichier(str(chemin))
+
+
+def test_charger_texte(tmp_path):
+    chemin = tmp_path / "points.txt"
+    chemin.write_text("(0.5, 1)\n   \n(2, -3)\n")
+    assert np.array_equal(charger_points_fichier(str(chemin)), [[0.5, 1.0], [2.0, -3.0]])
+
+
+def test_charger_tsplib_desordre(tmp_path):
+    chemin = tmp_path / "petit.tsp"
+    chemin.write_text(
+        "NAME : petit\nTYPE : TSP\nDIMENSION : 3\nEDGE_WEIGHT_TYPE : EUC_2D\n"
+        "NODE_COORD_SECTION\n3 5.0 6.0\n1 1.0 2.0\n2 3.0 4.0\nEOF\n")
+    assert np.array_equal(charger_points_fichier(str(chemin)), [[1, 2], [3, 4], [5, 6]])
+
+
+@pytest.mark.parametrize("nom", ["points.npy", "points.raw"])
+def test_binaire_aller_retour(tmp_path, points, nom):
+    chemin = str(tmp_path / nom)
+    sauver_points_binaire(points, chemin)
+    relus = charger_points_fichier(chemin)
+    assert relus.shape == points.shape
+    assert np.array_equal(relus, points)
+    assert not relus.flags.writeable
+
+
+def _ppp_reference(D, depart=0):
+    """ppp d'origine (version en O(n^3) avant la liste chaînée), gardé comme référence."""
+    n = int(D.shape[0])
+    cycle = [depart]
+    non_visites = set(range(n))
+    non_visites.remove(depart)
+    while non_visites:
+        meilleur_q, meilleure_distance, ancre = None, float("inf"), None
+        for q in sorted(non_visites):
+            distance_q_cycle, sommet_proche = float("inf"), None
+            for v in cycle:
+                if D[q, v] < distance_q_cycle:
+                    distance_q_cycle, sommet_proche = D[q, v], v
+            if distance_q_cycle < meilleure_distance:
+                meilleure_distance, meilleur_q, ancre = distance_q_cycle, q, sommet_proche
+        q = meilleur_q
+        m = len(cycle)
+        i = cycle.index(ancre)
+        if m == 1:
+            cycle.append(q)
+        else:
+            precedent, suivant = cycle[(i - 1) % m], cycle[(i + 1) % m]
+            gain_precedent = (D[precedent, q] + D[q, ancre]) - D[precedent, ancre]
+            gain_suivant = (D[ancre, q] + D[q, suivant]) - D[ancre, suivant]
+            cycle.insert(i if gain_precedent <= gain_suivant else i + 1, q)
+        non_visites.remove(q)
+    return cycle
+
+
+@pytest.mark.parametrize("graine", range(15))
+def test_ppp_comme_reference(graine):
+    rng = np.random.default_rng(graine)
+    n = int(rng.integers(3, 40))
+    # Points entiers sur une petite grille : beaucoup d'égalités de distances
+    points = rng.integers(0, 6, (n, 2)).astype(np.float64) if graine % 2 else rng.random((n, 2))
+    D = calculer_matrice_distances(points)
+    depart = int(rng.integers(0, n))
+    cycle, longueur = ppp(D, depart)
+    assert list(cycle) == _ppp_reference(D, depart)
+    assert longueur == pytest.approx(calculer_longueur_cycle(cycle, D))
+
+
+def _force_brute(D):
+    """Longueur optimale par énumération de toutes les tournées partant de 0."""
+    n = len(D)
+    return min(calculer_longueur_cycle((0,) + p, D) for p in itertools.permutations(range(1, n)))
+
+
+@pytest.mark.parametrize("n", range(4, 9))
+def test_solveurs_exacts_optimaux(n):
+    for graine in range(3):
+        rng = np.random.default_rng(100 * n + graine)
+        points = rng.integers(0, 5, (n, 2)).astype(np.float64) if graine == 2 else rng.random((n, 2))
+        D = calculer_matrice_distances(points)
+        optimum = _force_brute(D)
+        for borne in ("demi_somme", "un_arbre"):
+            cycle, longueur = hds(D, borne=borne)
+            assert sorted(cycle) == list(range(n))
+            assert longueur == pytest.approx(optimum), borne
+            assert calculer_longueur_cycle(cycle, D) == pytest.approx(optimum), borne
+        cycle, longueur = held_karp(D)
+        assert sorted(cycle) == list(range(n))
+        assert longueur == pytest.approx(optimum)
+
+
+@pytest.mark.parametrize("borne", ["demi_somme", "un_arbre"])
+def test_hds_budget_noeuds(borne):
+    for graine in range(4):
+        D = calculer_matrice_distances(np.random.default_rng(200 + graine).random((8, 2)))
+        optimum = _force_brute(D)
+        statuts = set()
+        for noeuds_max in (1, 3, 10, 50):
+            infos = {}
+            cycle, longueur, borne_inf = hds(D, borne=borne, noeuds_max=noeuds_max, retourner_borne=True,
+                                             infos=infos)
+            assert sorted(cycle) == list(range(8))
+            assert longueur == pytest.approx(calculer_longueur_cycle(cycle, D))
+            assert borne_inf <= optimum + 1e-9 <= longueur + 2e-9
+            assert infos["borne_inf"] == borne_inf
+            assert infos["noeuds_developpes"] <= noeuds_max
+            assert infos["ecart"] == pytest.approx((longueur - borne_inf) / longueur)
+            if borne_inf < longueur:
+                assert infos["statut"] == "noeuds" and infos["ecart"] > 0
+            else:
+                assert infos["statut"] == "optimal" and longueur == pytest.approx(optimum)
+            statuts.add(infos["statut"])
+        # Les plus petits budgets s'arrêtent avant la preuve
+        assert "noeuds" in statuts
+
+
+def test_hds_parallele_optimal():
+    D = calculer_matrice_distances(np.random.default_rng(7).random((9, 2)))
+    _, longueur = hds(D, processus=2, noeuds_par_tache=16)
+    assert longueur == pytest.approx(_force_brute(D))
+
+
+@pytest.mark.parametrize("borne", ["demi_somme", "un_arbre"])
+def test_hds_points_confondus(borne):
+    # Tous les points au même endroit : longueur nulle, pas de division par zéro
+    D = calculer_matrice_distances(np.zeros((6, 2)))
+    for borne_sup in (True, False):
+        infos = {}
+        cycle, longueur = hds(D, borne=borne, utiliser_ppp_comme_borne_sup=borne_sup, infos=infos)
+        assert sorted(cycle) == list(range(6))
+        assert longueur == 0.0
+        assert infos["ecart"] == 0.0 and infos["statut"] == "optimal"
+        assert infos["ecart_racine"] == (0.0 if borne_sup else float("inf"))
+
+
+def test_etude_statistique_sans_essai():
+    with pytest.raises(ValueError):
+        etude_statistique(nb_essais=0, afficher=False)
+    etude_statistique(nb_essais=2, n=8, graine=1, afficher=False)
+
+
+def test_cache_aller_retour(tmp_path, points):
+    cache = CacheDisque(str(tmp_path))
+    D = cache.matrice_distances(points)
+    assert np.array_equal(D, calculer_matrice_distances(points))
+
+    appels = []
+
+    def calcul():
+        appels.append(1)
+        infos["statut"] = "optimal"
+        return ppp(D)
+
+    infos = {}
+    cycle, longueur = cache.tournee(points, "ppp", {"depart": 0}, calcul, infos=infos)
+    # Nouvelle instance : tout est relu du disque, sans recalcul
+    relu = CacheDisque(str(tmp_path))
+    infos_relues = {}
+    assert relu.tournee(points, "ppp", {"depart": 0}, calcul, infos=infos_relues) == (cycle, longueur)
+    assert infos_relues == {"statut": "optimal"}
+    assert len(appels) == 1
+    assert relu.tournee(points, "ppp", {"depart": 1}) is None
+    assert relu.meilleure_tournee(points) == (cycle, longueur)
+    assert np.array_equal(relu.matrice_distances(points), D)
+
+
+def test_cache_hds_non_optimal_relance(tmp_path, monkeypatch):
+    points = np.random.default_rng(3).random((9, 2))
+    cache = CacheDisque(str(tmp_path))
+    appels = []
+    statut = {"valeur": "temps"}
+
+    def faux_hds(D, cycle_initial=None, infos=None, **options):
+        appels.append(cycle_initial)
+        infos.update(statut=statut["valeur"], ecart=0.0)
+        return ppp(D)
+
+    monkeypatch.setattr(main, "hds", faux_hds)
+    for _ in range(2):
+        main.executer_sur_points(points, cache=cache, temps_max_exact=0.01)
+    # Arrêté avant la preuve : relancé, depuis la tournée déjà connue
+    assert len(appels) == 2 and appels[1] is not None
+    statut["valeur"] = "optimal"
+    for _ in range(2):
+        main.executer_sur_points(points, cache=cache, temps_max_exact=0.01)
+    # Prouvé optimal : enregistré puis resservi
+    assert len(appels) == 3
+
+
+def test_cache_eviction(tmp_path):
+    rng = np.random.default_rng(1)
+    taille_matrice = 8 * 50 * 50
+    cache = CacheDisque(str(tmp_path), taille_max=2 * taille_matrice + 500)
+    instances = [rng.random((50, 2)) for _ in range(4)]
+    for i, p in enumerate(instances):
+        # La matrice qu'on vient d'écrire n'est jamais évincée
+        assert np.array_equal(cache.matrice_distances(p), calculer_matrice_distances(p))
+        assert os.path.exists(tmp_path / "{}.D.npy".format(empreinte_points(p)))
+        time.sleep(0.01)
+    fichiers = [f for f in os.listdir(tmp_path) if f.endswith(".npy")]
+    assert len(fichiers) == 2
+    assert not os.path.exists(tmp_path / "{}.D.npy".format(empreinte_points(instances[0])))
+
+    # Plus grosse que taille_max : calculée en mémoire, pas enregistrée
+    petit = CacheDisque(str(tmp_path / "petit"), taille_max=1000)
+    p = instances[0]
+    assert np.array_equal(petit.matrice_distances(p), calculer_matrice_distances(p))
+    assert not any(f.endswith(".npy") for f in os.listdir(tmp_path / "petit"))
+
+
+def _meilleur_delta_2opt(cycle, D, voisins=None):
+    """
+    Plus petite variation de longueur d'un 2-opt sur le cycle (négative s'il
+    reste un échange améliorant). Avec voisins (n, k), seuls comptent les
+    échanges visibles depuis une de leurs extrémités x : l'arête ajoutée (x, y)
+    a y parmi voisins[x] et est plus courte que l'arête retirée en x.
+    """
+    c = np.asarray(cycle)
+    n = len(c)
+    suiv = np.roll(c, -1)
+    retiree = D[c, suiv]
+    delta = D[c[:, None], c[None, :]] + D[suiv[:, None], suiv[None, :]]
+    delta -= retiree[:, None] + retiree[None, :]
+    i, j = np.indices((n, n))
+    permis = (j >= i + 2) & ~((i == 0) & (j == n - 1))
+    if voisins is not None:
+        proche = np.zeros((n, n), dtype=bool)
+        proche[np.repeat(np.arange(n), voisins.shape[1]), voisins.reshape(-1)] = True
+        # (i, j) retire (c_i, c_i+1) et (c_j, c_j+1), ajoute (c_i, c_j) et (c_i+1, c_j+1)
+        visible = np.zeros((n, n), dtype=bool)
+        for x, y, r in ((c[:, None], c[None, :], retiree[:, None]),
+                        (c[None, :], c[:, None], retiree[None, :]),
+                        (suiv[:, None], suiv[None, :], retiree[:, None]),
+                        (suiv[None, :], suiv[:, None], retiree[None, :])):
+            visible |= proche[x, y] & (D[x, y] < r)
+        permis &= visible
+    return float(delta[permis].min()) if permis.any() else 0.0
+
+
+def test_ppp_lot_comme_ppp():
+    rng = np.random.default_rng(4)
+    for n in (2, 3, 9, 30):
+        # Petite grille : égalités de distances traitées comme ppp
+        points = np.concatenate((rng.random((3, n, 2)), rng.integers(0, 4, (2, n, 2))))
+        D = matrices_distances_lot(points)
+        cycles, longueurs = ppp_lot(D, departs=[0, 1, 0, 1, n - 1])
+        for b, depart in enumerate([0, 1, 0, 1, n - 1]):
+            cycle, longueur = ppp(D[b], depart)
+            assert cycles[b].tolist() == list(cycle)
+            assert longueurs[b] == pytest.approx(longueur)
+            seul, _ = ppp_lot(D[b][None], departs=depart)
+            assert seul[0].tolist() == list(cycle)
+
+
+@pytest.mark.parametrize("k", [None, 2])
+def test_opt_ppp_lot_optimum_local(k, monkeypatch):
+    rng = np.random.default_rng(5)
+    D = matrices_distances_lot(rng.random((4, 40, 2)))
+    depart, _ = ppp_lot(D)
+    cycles, longueurs = opt_ppp_lot(D, depart, k=k)
+    for b in range(4):
+        assert sorted(cycles[b].tolist()) == list(range(40))
+        assert longueurs[b] == pytest.approx(calculer_longueur_cycle(cycles[b], D[b]))
+        assert _meilleur_delta_2opt(cycles[b], D[b]) >= -EPSILON
+    # Recherche complète découpée en blocs de lignes : même résultat
+    monkeypatch.setattr(lot, "MEMOIRE_BLOC_DISTANCES", 4000)
+    assert np.array_equal(opt_ppp_lot(D, depart, k=k)[0], cycles)
+
+
+@pytest.mark.parametrize("strategie", ["premiere", "meilleure"])
+def test_opt_ppp_voisins_optimum_local(strategie):
+    rng = np.random.default_rng(6)
+    for n in (5, 30, 120):
+        D = calculer_matrice_distances(rng.random((n, 2)))
+        voisins = voisins_proches(D, 5)
+        cycle = rng.permutation(n).tolist()
+        initiale = calculer_longueur_cycle(cycle, D)
+        cycle, longueur = opt_ppp_voisins(cycle, D, strategie=strategie, voisins=voisins.tolist())
+        assert sorted(cycle) == list(range(n))
+        assert longueur == pytest.approx(calculer_longueur_cycle(cycle, D))
+        assert longueur <= initiale
+        assert _meilleur_delta_2opt(cycle, D, voisins) >= -EPSILON
+
+
+@pytest.mark.parametrize("forme", [list, Tournee])
+def test_opt_segments_n_allonge_jamais(forme):
+    rng = np.random.default_rng(8)
+    for n in (4, 5, 6, 12, 80):
+        points = rng.integers(0, 5, (n, 2)).astype(np.float64) if n == 12 else rng.random((n, 2))
+        D = calculer_matrice_distances(points)
+        for depart in (rng.permutation(n).tolist(), list(ppp(D)[0])):
+            cycle = forme(depart)
+            initiale = calculer_longueur_cycle(depart, D)
+            resultat, longueur = opt_segments(cycle, D, k=5)
+            assert isinstance(resultat, forme)
+            assert sorted(resultat) == list(range(n))
+            assert longueur == pytest.approx(calculer_longueur_cycle(resultat, D))
+            assert longueur <= initiale + 1e-9
+
+
+def test_departs_repartis_points_confondus():
+    # 3 emplacements seulement pour 10 points : les départs restent distincts
+    points = np.repeat(np.array([[0.0, 0.0], [1.0, 0.0], [0.0, 1.0]]), [4, 3, 3], axis=0)
+    D = calculer_matrice_distances(points)
+    for nombre in (2, 3, 6, 10, 15):
+        departs = departs_repartis(D, nombre, premier=5).tolist()
+        assert departs[0] == 5
+        assert len(departs) == min(nombre, 10) == len(set(departs))
+    # Les premiers départs couvrent d'abord les emplacements différents
+    assert {tuple(points[v]) for v in departs_repartis(D, 3)} == {(0, 0), (1, 0), (0, 1)}
+
+
+def test_ppp_multi_departs():
+    D = calculer_matrice_distances(np.random.default_rng(3).random((60, 2)))
+    departs = departs_repartis(D, 8)
+    assert len(set(departs.tolist())) == 8
+    cycles, longueurs = ppp_multi_departs(D, departs, k_meilleurs=8, distinctes=False)
+    attendues = sorted(ppp(D, int(d))[1] for d in departs)
+    assert longueurs == pytest.approx(attendues)
+    _, meilleure = ppp_multi_departs(D, "tous")
+    assert meilleure[0] == pytest.approx(min(ppp(D, d)[1] for d in range(60)))
+
+
+@pytest.mark.parametrize("spec, message", [
+    ("", "Étape inconnue"),
+    ([], "pipeline doit être"),
+    ({"nom": "ppp"}, "pipeline doit être"),
+    ("ppp->inconnue", "Étape inconnue"),
+    ("opt_ppp", "La première étape"),
+    ("ppp->christofides", "Seule la première étape"),
+    ([{"temps_max": 1.0}], "Étape inconnue"),
+])
+def test_lire_pipeline_erreurs(spec, message):
+    with pytest.raises(ValueError, match=message):
+        lire_pipeline(spec)
+
+
+def test_lire_et_verifier_pipeline():
+    etapes = lire_pipeline(["ppp", {"nom": "recuit", "temps_max": 0.5}])
+    assert etapes == [("ppp", {}), ("recuit", {"temps_max": 0.5})]
+    assert lire_pipeline("ppp → opt_ppp->hds") == [("ppp", {}), ("opt_ppp", {}), ("hds", {})]
+
+    verifier_pipeline(lire_pipeline("hds"), 10)
+    verifier_pipeline(lire_pipeline("hds"), 30, delai=1.0)
+    verifier_pipeline(lire_pipeline([{"nom": "hds", "temps_max": 1.0}]), 30)
+    with pytest.raises(ValueError, match="budget"):
+        verifier_pipeline(lire_pipeline("ppp->hds"), 30)
+    verifier_pipeline(lire_pipeline("held_karp"), 20)
+    with pytest.raises(ValueError, match="held_karp"):
+        verifier_pipeline(lire_pipeline("held_karp"), 21)
+
+
+@pytest.mark.parametrize("pipeline", ["held_karp", "ppp->opt_segments", "partition", "ppp->opt_ppp->recuit"])
+def test_executer_pipeline_echeance(pipeline):
+    points = np.random.default_rng(5).random((20, 2))
+    etapes = lire_pipeline(pipeline)
+    resultat = executer_pipeline(0, points, etapes)
+    assert resultat["statut"] == "termine"
+    assert sorted(resultat["cycle"]) == list(range(20))
+    # Échéance déjà passée : chaque étape s'arrête au premier point de mesure
+    resultat = executer_pipeline(0, points, etapes, echeance=time.monotonic() - 1.0)
+    assert resultat["statut"] == "echeance"
+    assert sorted(resultat["cycle"]) == list(range(20))
+
+
+def test_serveur_survit_a_un_client_deconnecte():
+    recus = []
+
+    async def deconnecte(message):
+        if message["type"] != "accepte":
+            raise ConnectionResetError("client parti")
+
+    async def connecte(message):
+        recus.append(message)
+
+    async def scenario():
+        serveur = Serveur(taille_file=4)
+        await serveur.demarrer()
+        try:
+            ligne = json.dumps({"id": 1, "points": [[0, 0], [1, 0], [1, 1], [0, 1]]})
+            await serveur.traiter_ligne(ligne, deconnecte)
+            # Erreur levée par le solveur puis envoi impossible : la voie doit continuer
+            await serveur.traiter_ligne(json.dumps({"id": 2, "points": [[0, 0], [1, 0], [1, 1]],
+                                                    "pipeline": [{"nom": "ppp", "depart": "x"}]}), deconnecte)
+            await serveur.traiter_ligne(ligne, connecte)
+            await asyncio.wait_for(serveur._files["rapide"].join(), 30)
+        finally:
+            await serveur.fermer()
+
+    asyncio.run(scenario())
+    assert [m["type"] for m in recus] == ["accepte", "resultat"]
+
+
+@pytest.mark.parametrize("requete", [
+    {"id": 1, "points": {"x": 1}},
+    {"id": 1, "points": [[0, {"a": 1}], [1, 2]]},
+    {"id": 1, "points": [[0, "a"], [1, 2]]},
+    {"id": 1, "points": [[0, 0], [1]]},
+    {"id": 1, "fichier": 3},
+    {"id": 1, "fichier": ["a.txt"]},
+    {"id": 1, "points": [[0, 0], [1, 1]], "delai": True},
+    {"id": 1, "points": [[0, 0], [1, 1]], "delai": "2"},
+    {"id": 1, "points": [[0, 0], [1, 1]], "delai": float("nan")},
+    {"id": 1, "points": [[0, 0], [1, 1]], "pipeline": 5},
+])
+def test_serveur_requetes_invalides(requete):
+    recus = []
+
+    async def envoyer(message):
+        recus.append(message)
+
+    serveur = Serveur()
+    asyncio.run(serveur.traiter_ligne(json.dumps(requete), envoyer))
+    assert len(recus) == 1
+    assert recus[0]["type"] == "erreur" and recus[0]["id"] == 1
@@ -0,0 +1,169 @@
+import numpy as np
+
+from utils import calculer_longueur_cycle
+
+
+class Tournee:
+    """
+    Tournée stockée dans deux tableaux int32 :
+    - ordre[i] = sommet en position i
+    - position[v] = position du sommet v (ordre[position[v]] == v)
+    Successeur, prédécesseur et position d'un sommet s'obtiennent en O(1),
+    le coût d'un 2-opt ou d'une insertion s'évalue en O(1) sur D, et une
+    inversion de segment ne touche que le côté le plus court du cycle.
+
+    S'utilise comme une liste de sommets : len, itération, t[i], t[a:b]
+    (liste), list(t), np.asarray(t), comparaison avec une liste.
+    Tous les solveurs acceptent une Tournee à la place d'une liste.
+
+    taille : nombre d'identifiants possibles (par défaut len(sommets)) ; la
+    tournée peut alors ne contenir qu'une partie des sommets 0..taille-1
+    (position[v] = -1 pour un sommet absent), voir inserer / retirer.
+    """
+
+    def __init__(self, sommets=(), taille=None):
+        self.ordre = np.array(sommets, dtype=np.int32).reshape(-1)
+        taille = len(self.ordre) if taille is None else taille
+        self.position = np.full(taille, -1, dtype=np.int32)
+        self.position[self.ordre] = np.arange(len(self.ordre), dtype=np.int32)
+
+    def __len__(self):
+        return len(self.ordre)
+
+    def __iter__(self):
+        return iter(self.ordre.tolist())
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.ordre[i].tolist()
+        return int(self.ordre[i])
+
+    def __array__(self, dtype=None, copy=None):
+        """Protocole numpy 2 : copy=True copie toujours, copy=False interdit toute copie."""
+        if dtype is not None and np.dtype(dtype) != self.ordre.dtype:
+            if copy is False:
+                raise ValueError("conversion de type impossible sans copie")
+            return self.ordre.astype(dtype)
+        return self.ordre.copy() if copy else self.ordre
+
+    def __eq__(self, autre):
+        if isinstance(autre, Tournee):
+            autre = autre.ordre
+        return len(self) == len(autre) and bool(np.array_equal(self.ordre, np.asarray(autre)))
+
+    def __repr__(self):
+        return "Tournee({})".format(self.ordre.tolist())
+
+    def tolist(self):
+        return self.ordre.tolist()
+
+    def copy(self):
+        return Tournee(self.ordre, taille=len(self.position))
+
+    def __contains__(self, v):
+        return 0 <= v < len(self.position) and self.position[v] >= 0
+
+    def agrandir(self, taille):
+        """Porte à taille le nombre d'identifiants possibles."""
+        if taille > len(self.position):
+            self.position = np.concatenate(
+                (self.position, np.full(taille - len(self.position), -1, dtype=np.int32)))
+
+    def inserer(self, v, i):
+        """Insère v (absent de la tournée) entre les positions i et i+1 : O(n), vectorisé."""
+        i = i % len(self.ordre) + 1 if len(self.ordre) else 0
+        self.ordre = np.insert(self.ordre, i, v)
+        self.position[self.ordre[i:]] = np.arange(i, len(self.ordre), dtype=np.int32)
+
+    def retirer(self, v):
+        """Retire v de la tournée : O(n), vectorisé."""
+        i = int(self.position[v])
+        self.ordre = np.delete(self.ordre, i)
+        self.position[v] = -1
+        self.position[self.ordre[i:]] = np.arange(i, len(self.ordre), dtype=np.int32)
+
+    def successeur(self, v):
+        return int(self.ordre[(self.position[v] + 1) % len(self.ordre)])
+
+    def predecesseur(self, v):
+        return int(self.ordre[self.position[v] - 1])
+
+    def successeurs(self):
+        """Tableau succ avec succ[v] = sommet qui suit v."""
+        succ = np.empty_like(self.ordre)
+        succ[self.ordre] = np.roll(self.ordre, -1)
+        return succ
+
+    def longueur(self, D):
+        """Longueur totale (vectorisée, voir utils.calculer_longueur_cycle)."""
+        return float(calculer_longueur_cycle(self.ordre, D))
+
+    def delta_2opt(self, D, i, j):
+        """
+        Variation de longueur si l'on inverse les positions i+1 .. j : on retire
+        les arêtes (ordre[i], ordre[i+1]) et (ordre[j], ordre[j+1]), on ajoute
+        (ordre[i], ordre[j]) et (ordre[i+1], ordre[j+1]).
+        """
+        n = len(self.ordre)
+        a, b = self.ordre[i], self.ordre[(i + 1) % n]
+        c, d = self.ordre[j], self.ordre[(j + 1) % n]
+        return D[a, c] + D[b, d] - D[a, b] - D[c, d]
+
+    def delta_insertion(self, D, v, i):
+        """Variation de longueur si l'on insère v (hors tournée) entre les positions i et i+1."""
+        a, b = self.ordre[i], self.ordre[(i + 1) % len(self.ordre)]
+        return D[a, v] + D[v, b] - D[a, b]
+
+    def delta_retrait(self, D, v):
+        """Variation de longueur (négative ou nulle) si l'on retire v de la tournée."""
+        p, s = self.predecesseur(v), self.successeur(v)
+        return D[p, s] - D[p, v] - D[v, s]
+
+    def inverser(self, i, j):
+        """Inverse le segment circulaire des positions i .. j (voir inverser_segment)."""
+        inverser_segment(self.ordre, self.position, i, j)
+
+    def deux_opt(self, i, j):
+        """Applique l'échange évalué par delta_2opt(D, i, j)."""
+        n = len(self.ordre)
+        self.inverser((i + 1) % n, j)
+
+
+def inverser_segment(ordre, position, i, j):
+    """
+    Inverse le segment circulaire ordre[i..j] (positions incluses) et met à jour position.
+    Si le segment dépasse la moitié du cycle, on inverse plutôt le reste du cycle :
+    on obtient le même cycle parcouru dans l'autre sens, pour moitié moins d'échanges.
+    """
+    n = len(ordre)
+    longueur = (j - i) % n + 1
+    if 2 * longueur > n:
+        i, j = (j + 1) % n, (i - 1) % n
+        longueur = n - longueur
+    if longueur < 2:
+        return
+
+    indices = np.arange(i, i + longueur) % n
+    sommets = ordre[indices][::-1]
+    ordre[indices] = sommets
+    position[sommets] = indices
+
+
+def rendre_comme(cycle, ordre):
+    """
+    Renvoie le tableau ordre sous le type du cycle reçu par un solveur :
+    la Tournee ou la liste d'entrée (mise à jour sur place), un tableau numpy,
+    sinon une liste.
+    """
+    ordre = np.asarray(ordre)
+    if isinstance(cycle, Tournee):
+        if cycle.ordre is not ordre:
+            cycle.ordre[:] = ordre
+            cycle.position[cycle.ordre] = np.arange(len(ordre), dtype=np.int32)
+        return cycle
+    if isinstance(cycle, list):
+        cycle[:] = ordre.tolist()
+        return cycle
+    if isinstance(cycle, np.ndarray):
+        return ordre.astype(cycle.dtype)
+    return ordre.tolist()
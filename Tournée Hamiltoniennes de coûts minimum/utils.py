@@ -1,57 +1,442 @@
+import io
+import math
+import os
+import warnings
+from collections import OrderedDict
+
 import numpy as np
 import matplotlib.pyplot as plt
 
-def generer_points(n):
-    """Génère n points aléatoires dans le carré [0, 1] x [0, 1]"""
-    return np.random.rand(n, 2)
+def generer_points(n, rng=None):
+    """
+    Génère n points aléatoires dans le carré [0, 1] x [0, 1]
+    (avec le générateur rng s'il est donné, sinon avec l'état global de np.random)
+    """
+    if rng is None:
+        return np.random.rand(n, 2)
+    return rng.random((n, 2))
 
-def calculer_matrice_distances(points):
+# Mémoire maximale (en octets) des tableaux temporaires d'un bloc de lignes
+MEMOIRE_BLOC_DISTANCES = 32 * 1024 * 1024
+
+def calculer_matrice_distances(points, dtype=np.float64, sortie=None, taille_bloc=None):
     """
     Calcule la matrice D de dimension n x n où
     D[i, j] contient la distance euclidienne entre le point i et le point j.
+
+    - dtype : type des distances (np.float64 par défaut, np.float32 divise la mémoire par 2)
+    - sortie : tableau (n x n) fourni par l'appelant, par exemple un np.memmap,
+      rempli directement sans matrice intermédiaire
+    - taille_bloc : nombre de lignes calculées à la fois ; par défaut on le choisit
+      pour que les temporaires d'un bloc restent sous MEMOIRE_BLOC_DISTANCES
     """
+    points = np.asarray(points, dtype=np.float64)
     n = len(points)
-    D = np.zeros((n, n))
-    for i in range(n):
-        for j in range(i + 1, n):
-            # Utilisation de la norme euclidienne de numpy
-            dist = np.linalg.norm(points[i] - points[j])
-            D[i, j] = D[j, i] = dist
+
+    if sortie is None:
+        D = np.empty((n, n), dtype=dtype)
+    else:
+        if sortie.shape != (n, n):
+            raise ValueError(
+                "La matrice de sortie doit être de taille {} x {} (reçu {}).".format(n, n, sortie.shape)
+            )
+        D = sortie
+
+    if n == 0:
+        return D
+
+    if taille_bloc is None:
+        # Deux temporaires float64 (dx et dy) de taille_bloc x n
+        taille_bloc = max(1, MEMOIRE_BLOC_DISTANCES // (2 * 8 * n))
+
+    x = points[:, 0]
+    y = points[:, 1]
+
+    # On remplit D par blocs de lignes : chaque bloc est calculé par diffusion (broadcast)
+    for debut in range(0, n, taille_bloc):
+        fin = min(debut + taille_bloc, n)
+        dx = x[debut:fin, None] - x[None, :]
+        dy = y[debut:fin, None] - y[None, :]
+        # Même calcul que np.linalg.norm : racine de la somme des carrés (D[i, i] = 0, D symétrique)
+        np.multiply(dx, dx, out=dx)
+        np.multiply(dy, dy, out=dy)
+        np.add(dx, dy, out=dx)
+        D[debut:fin] = np.sqrt(dx, out=dx)
+
     return D
 
+class DistancesALaDemande:
+    """
+    Remplace la matrice D quand n est trop grand pour la stocker (n x n).
+    Les distances sont calculées à la demande depuis les coordonnées des points,
+    avec un cache LRU optionnel des lignes déjà calculées.
+
+    S'utilise comme la matrice : D[i, j], D[i] (ligne), D[i, liste], D.shape, len(D).
+    Avec deux tableaux d'indices, D[u, v] donne les distances terme à terme
+    (u et v diffusés l'un contre l'autre), comme pour un tableau numpy.
+    """
+
+    def __init__(self, points, taille_cache=0, dtype=np.float64):
+        self.points = np.asarray(points, dtype=np.float64)
+        self.x = self.points[:, 0]
+        self.y = self.points[:, 1]
+        # Copies en listes Python : l'accès D[i, j] scalaire est bien plus rapide
+        self._xl = self.x.tolist()
+        self._yl = self.y.tolist()
+        self.dtype = np.dtype(dtype)
+        n = len(self.points)
+        self.shape = (n, n)
+        self.ndim = 2
+        # taille_cache = nombre maximal de lignes gardées en mémoire
+        self.taille_cache = int(taille_cache)
+        self._cache = OrderedDict()
+
+    def __len__(self):
+        return self.shape[0]
+
+    def ligne(self, i):
+        """Renvoie la ligne i (distances du point i à tous les points)."""
+        if self.taille_cache > 0:
+            ligne = self._cache.get(i)
+            if ligne is not None:
+                self._cache.move_to_end(i)
+                return ligne
+
+        dx = self.x - self.x[i]
+        dy = self.y - self.y[i]
+        ligne = np.sqrt(dx * dx + dy * dy).astype(self.dtype, copy=False)
+
+        if self.taille_cache > 0:
+            self._cache[i] = ligne
+            if len(self._cache) > self.taille_cache:
+                self._cache.popitem(last=False)
+        return ligne
+
+    def _lignes(self, lignes):
+        """Bloc de lignes pour un indice de lignes quelconque (slice, liste, tableau)."""
+        x = self.x[lignes]
+        y = self.y[lignes]
+        dx = np.subtract.outer(x, self.x)
+        dy = np.subtract.outer(y, self.y)
+        return np.sqrt(dx * dx + dy * dy).astype(self.dtype, copy=False)
+
+    def __getitem__(self, cle):
+        if isinstance(cle, tuple):
+            i, j = cle
+            if isinstance(i, (int, np.integer)):
+                if isinstance(j, (int, np.integer)):
+                    # Cas le plus fréquent dans les solveurs : une seule distance
+                    if self.taille_cache > 0 and i in self._cache:
+                        return self._cache[i][j]
+                    dx = self._xl[i] - self._xl[j]
+                    dy = self._yl[i] - self._yl[j]
+                    return self.dtype.type(math.sqrt(dx * dx + dy * dy))
+                return self.ligne(i)[j]
+            if not isinstance(i, slice) and not isinstance(j, (slice, int, np.integer)):
+                # Deux tableaux d'indices : paires terme à terme (diffusées), comme numpy
+                i, j = np.broadcast_arrays(np.asarray(i), np.asarray(j))
+                return self.distances_paires(i, j)
+            return self._lignes(i)[:, j]
+
+        if isinstance(cle, (int, np.integer)):
+            return self.ligne(cle)
+        return self._lignes(cle)
+
+    def distances_paires(self, u, v):
+        """Distances D[u[t], v[t]] terme à terme (et non la sous-matrice D[u][:, v])."""
+        dx = self.x[u] - self.x[v]
+        dy = self.y[u] - self.y[v]
+        return np.sqrt(dx * dx + dy * dy).astype(self.dtype, copy=False)
+
+def voisins_proches(D, k):
+    """
+    Listes de candidats : pour chaque sommet v, ses k plus proches voisins
+    (v exclu), triés par distance croissante. Renvoie un tableau (n x k).
+    Une matrice dense est parcourue par blocs de lignes ; pour DistancesALaDemande
+    on passe par la grille de voisins_proches_points (sans calcul en n x n).
+    """
+    if isinstance(D, DistancesALaDemande):
+        return voisins_proches_points(D.points, k)
+
+    n = int(D.shape[0])
+    k = max(0, min(int(k), n - 1))
+    voisins = np.empty((n, k), dtype=np.int64)
+    if k == 0:
+        return voisins
+
+    taille_bloc = max(1, MEMOIRE_BLOC_DISTANCES // (8 * n))
+    for debut in range(0, n, taille_bloc):
+        fin = min(debut + taille_bloc, n)
+        bloc = np.array(D[debut:fin], dtype=np.float64)
+        lignes = np.arange(fin - debut)
+        bloc[lignes, lignes + debut] = np.inf
+
+        if k < n - 1:
+            candidats = np.argpartition(bloc, k - 1, axis=1)[:, :k]
+        else:
+            candidats = np.broadcast_to(np.arange(n), bloc.shape)
+        distances = np.take_along_axis(bloc, candidats, axis=1)
+        ordre = np.argsort(distances, axis=1, kind="stable")
+        voisins[debut:fin] = np.take_along_axis(candidats, ordre, axis=1)[:, :k]
+
+    return voisins
+
+def voisins_proches_points(points, k):
+    """
+    Même résultat que voisins_proches, calculé directement depuis les points.
+    Les points sont rangés dans une grille d'environ k points par case ; pour
+    chaque case, on cherche les voisins dans les cases autour, en élargissant
+    la fenêtre tant que le k-ième voisin peut se trouver en dehors.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    n = len(points)
+    k = max(0, min(int(k), n - 1))
+    voisins = np.empty((n, k), dtype=np.int64)
+    if k == 0:
+        return voisins
+
+    mini = points.min(axis=0)
+    etendue = np.maximum(points.max(axis=0) - mini, 1e-12)
+    # Côté de case pour avoir environ k + 1 points par case en moyenne
+    # (le second terme évite des cases minuscules quand les points sont presque alignés)
+    cote = max(float(np.sqrt(etendue[0] * etendue[1] * (k + 1) / n)), float(etendue.max()) * (k + 1) / n)
+    nx = int(etendue[0] // cote) + 1
+    ny = int(etendue[1] // cote) + 1
+    cx = np.minimum(((points[:, 0] - mini[0]) // cote).astype(np.int64), nx - 1)
+    cy = np.minimum(((points[:, 1] - mini[1]) // cote).astype(np.int64), ny - 1)
+
+    # Points triés par case : la case c occupe tries[debut[c]:debut[c + 1]]
+    case = cy * nx + cx
+    tries = np.argsort(case, kind="stable")
+    debut = np.searchsorted(case[tries], np.arange(nx * ny + 1))
+
+    for c in np.unique(case):
+        restants = tries[debut[c]:debut[c + 1]]
+        x0, y0 = c % nx, c // nx
+        r = 1
+        while len(restants) > 0:
+            gauche, droite = max(x0 - r, 0), min(x0 + r, nx - 1)
+            bas, haut = max(y0 - r, 0), min(y0 + r, ny - 1)
+            # Sur une rangée de la grille, les cases gauche..droite sont contiguës dans tries
+            candidats = np.concatenate([
+                tries[debut[ligne * nx + gauche]:debut[ligne * nx + droite + 1]]
+                for ligne in range(bas, haut + 1)
+            ])
+            tout_couvert = gauche == 0 and bas == 0 and droite == nx - 1 and haut == ny - 1
+            if len(candidats) <= k and not tout_couvert:
+                r += 1
+                continue
+
+            # Lignes traitées par paquets pour borner la mémoire (cases très denses)
+            paquet = max(1, MEMOIRE_BLOC_DISTANCES // (3 * 8 * len(candidats)))
+            a_refaire = []
+            for d in range(0, len(restants), paquet):
+                ici = restants[d:d + paquet]
+                dx = points[ici, 0][:, None] - points[candidats, 0][None, :]
+                dy = points[ici, 1][:, None] - points[candidats, 1][None, :]
+                bloc = np.sqrt(dx * dx + dy * dy)
+                bloc[ici[:, None] == candidats[None, :]] = np.inf
+                proches = np.argpartition(bloc, k - 1, axis=1)[:, :k]
+                distances = np.take_along_axis(bloc, proches, axis=1)
+
+                # Tout point hors de la fenêtre est à distance >= r * cote
+                valides = np.ones(len(ici), dtype=bool) if tout_couvert else distances.max(axis=1) <= r * cote
+                ordre = np.argsort(distances[valides], axis=1, kind="stable")
+                voisins[ici[valides]] = candidats[np.take_along_axis(proches[valides], ordre, axis=1)]
+                a_refaire.append(ici[~valides])
+
+            restants = np.concatenate(a_refaire)
+            r += 1
+
+    return voisins
+
+def distances_paires(D, u, v):
+    """
+    Distances D[u[t], v[t]] terme à terme pour des tableaux d'indices u et v,
+    que D soit une matrice numpy, un utils.DistancesALaDemande ou une liste de listes.
+    """
+    if isinstance(D, np.ndarray):
+        return D[u, v]
+    if isinstance(D, DistancesALaDemande):
+        return D.distances_paires(u, v)
+    return np.array([D[a][b] for a, b in zip(np.asarray(u).tolist(), np.asarray(v).tolist())])
+
 def calculer_longueur_cycle(cycle, D):
     """
     Calcule la longueur totale d'une tournée (cycle).
-    Le cycle est une liste d'indices, ex: [0, 3, 1, 2]
+    Le cycle est une liste d'indices, ex: [0, 3, 1, 2], un tableau numpy
+    ou une tournee.Tournee.
+    Les arêtes sont lues d'un coup (distances_paires) puis additionnées dans
+    l'ordre du cycle (np.cumsum est séquentiel) : même résultat, au bit près,
+    que la somme arête par arête.
     """
-    longueur = 0
-    n = len(cycle)
-    for i in range(n - 1):
-        longueur += D[cycle[i], cycle[i+1]]
+    cycle = np.asarray(cycle, dtype=np.int64)
+    if len(cycle) == 0:
+        return 0.0
 
     # Très important : on ajoute le retour du dernier point au premier
-    longueur += D[cycle[-1], cycle[0]]
-    return longueur
+    aretes = distances_paires(D, cycle, np.roll(cycle, -1))
+    return np.cumsum(aretes)[-1]
+
+def longueur_cycle_points(points, cycle):
+    """
+    Longueur d'une tournée calculée directement depuis les coordonnées des points
+    (sans matrice D), en une opération vectorisée : utile pour n très grand.
+    """
+    if len(cycle) < 2:
+        return 0.0
+    ordonnes = np.asarray(points, dtype=np.float64)[np.asarray(cycle)]
+    ecarts = ordonnes - np.roll(ordonnes, 1, axis=0)
+    return float(np.hypot(ecarts[:, 0], ecarts[:, 1]).sum())
+
+# Extensions reconnues par charger_points_fichier pour les formats binaires
+EXTENSIONS_BINAIRES = (".npy", ".bin", ".f64", ".raw")
 
 def charger_points_fichier(nom_fichier):
     """
-    Charge des points depuis un fichier texte.
-    Format attendu par ligne : (x, y)
+    Charge des points depuis un fichier, selon son extension :
+    - ".tsp" : fichier TSPLIB (voir charger_points_tsplib)
+    - ".npy", ".bin", ".f64", ".raw" : format binaire (voir charger_points_binaire)
+    - sinon fichier texte, format attendu par ligne : (x, y) (voir charger_points_texte)
+    Retourne un tableau (n, 2), ou None si le fichier n'existe pas.
+    Un fichier mal formé lève ValueError (avec le numéro de la ligne fautive).
     """
-    points = []
+    extension = os.path.splitext(nom_fichier)[1].lower()
     try:
-        with open(nom_fichier, 'r') as f:
-            for ligne in f:
-                # Nettoyage de la ligne pour extraire x et y
-                s = ligne.strip().replace('(', '').replace(')', '')
-                if s:
-                    coords = s.split(',')
-                    points.append([float(coords[0]), float(coords[1])])
-        return np.array(points)
+        if extension == ".tsp":
+            return charger_points_tsplib(nom_fichier)
+        if extension in EXTENSIONS_BINAIRES:
+            return charger_points_binaire(nom_fichier)
+        return charger_points_texte(nom_fichier)
     except FileNotFoundError:
         print(f"Erreur : Le fichier {nom_fichier} n'a pas été trouvé.")
         return None
 
+def charger_points_texte(nom_fichier):
+    """
+    Lit un fichier texte de points "(x, y)" (une ligne par point, lignes vides ignorées,
+    parenthèses facultatives). Le fichier est lu d'un bloc et converti par np.loadtxt
+    (analyse en C), sans liste Python intermédiaire.
+    Lève ValueError avec le numéro de la première ligne mal formée.
+    """
+    with open(nom_fichier, "rb") as f:
+        brut = f.read()
+    texte = brut.translate(None, b"()").decode("latin-1")
+
+    try:
+        with warnings.catch_warnings():
+            # Fichier sans aucun point : on renvoie un tableau vide
+            warnings.simplefilter("ignore", UserWarning)
+            points = np.loadtxt(io.StringIO(texte), delimiter=",", dtype=np.float64, ndmin=2)
+    except ValueError:
+        # Lecture ligne par ligne, seulement pour trouver la ligne fautive
+        # (ou accepter les lignes faites uniquement d'espaces, que np.loadtxt refuse)
+        return _lire_points_lignes(brut.decode("latin-1"), nom_fichier)
+
+    if points.size == 0:
+        return np.empty((0, 2))
+    if points.shape[1] != 2:
+        return _lire_points_lignes(brut.decode("latin-1"), nom_fichier)
+    return points
+
+def _lire_points_lignes(texte, nom_fichier):
+    """Analyse lente, ligne par ligne, avec un message d'erreur précis."""
+    points = []
+    for numero, ligne in enumerate(texte.splitlines(), start=1):
+        s = ligne.strip().replace("(", "").replace(")", "")
+        if not s:
+            continue
+        coords = s.split(",")
+        if len(coords) != 2:
+            raise ValueError("{}, ligne {} : deux coordonnées attendues au format (x, y), reçu {!r}".format(
+                nom_fichier, numero, ligne))
+        try:
+            points.append([float(coords[0]), float(coords[1])])
+        except ValueError:
+            raise ValueError("{}, ligne {} : coordonnée non numérique dans {!r}".format(
+                nom_fichier, numero, ligne)) from None
+    return np.array(points, dtype=np.float64).reshape(-1, 2)
+
+def charger_points_tsplib(nom_fichier):
+    """
+    Lit les coordonnées d'un fichier TSPLIB (.tsp) de type EDGE_WEIGHT_TYPE EUC_2D
+    (ou CEIL_2D) : en-tête "CLE : valeur", puis NODE_COORD_SECTION avec une ligne
+    "numéro x y" par sommet. Les sommets sont rangés par numéro croissant.
+    Remarque : TSPLIB arrondit les distances EUC_2D à l'entier le plus proche,
+    alors qu'ici on garde les distances euclidiennes réelles.
+    """
+    with open(nom_fichier, "r", encoding="latin-1") as f:
+        lignes = f.read().splitlines()
+
+    entete = {}
+    debut = None
+    for numero, ligne in enumerate(lignes):
+        s = ligne.strip()
+        if s.upper().startswith("NODE_COORD_SECTION"):
+            debut = numero + 1
+            break
+        if ":" in s:
+            cle, valeur = s.split(":", 1)
+            entete[cle.strip().upper()] = valeur.strip()
+
+    type_distance = entete.get("EDGE_WEIGHT_TYPE", "").upper()
+    if type_distance not in ("EUC_2D", "CEIL_2D"):
+        raise ValueError("{} : EDGE_WEIGHT_TYPE {!r} non pris en charge (attendu EUC_2D)".format(
+            nom_fichier, type_distance))
+    if debut is None:
+        raise ValueError("{} : section NODE_COORD_SECTION absente".format(nom_fichier))
+
+    try:
+        dimension = int(entete["DIMENSION"])
+    except (KeyError, ValueError):
+        raise ValueError("{} : DIMENSION absente ou invalide".format(nom_fichier)) from None
+
+    section = lignes[debut:debut + dimension]
+    if len(section) < dimension or any(s.strip().upper() == "EOF" for s in section):
+        raise ValueError("{} : {} sommets annoncés mais la section est plus courte".format(
+            nom_fichier, dimension))
+    try:
+        valeurs = np.loadtxt(io.StringIO("\n".join(section)), dtype=np.float64, ndmin=2)
+    except ValueError as erreur:
+        raise ValueError("{} : NODE_COORD_SECTION mal formée ({})".format(nom_fichier, erreur)) from None
+    if valeurs.shape != (dimension, 3):
+        raise ValueError("{} : lignes \"numéro x y\" attendues dans NODE_COORD_SECTION".format(nom_fichier))
+
+    ordre = np.argsort(valeurs[:, 0], kind="stable")
+    return np.ascontiguousarray(valeurs[ordre, 1:])
+
+def charger_points_binaire(nom_fichier, dtype=np.float64):
+    """
+    Ouvre un fichier binaire de points en projection mémoire (np.memmap) :
+    aucune copie, les pages sont lues à la demande.
+    - ".npy" : tableau numpy (n, 2) écrit par np.save / sauver_points_binaire
+    - autre extension : flottants bruts (dtype) x0 y0 x1 y1 ...
+    Le tableau renvoyé est en lecture seule.
+    """
+    if nom_fichier.lower().endswith(".npy"):
+        points = np.load(nom_fichier, mmap_mode="r")
+    else:
+        if os.path.getsize(nom_fichier) % (2 * np.dtype(dtype).itemsize):
+            raise ValueError("{} : taille incompatible avec des couples (x, y) de type {}".format(
+                nom_fichier, np.dtype(dtype).name))
+        if os.path.getsize(nom_fichier) == 0:
+            return np.empty((0, 2), dtype=dtype)
+        points = np.memmap(nom_fichier, dtype=dtype, mode="r").reshape(-1, 2)
+
+    if points.ndim != 2 or points.shape[1] != 2:
+        raise ValueError("{} : tableau (n, 2) attendu (reçu {})".format(nom_fichier, points.shape))
+    return points
+
+def sauver_points_binaire(points, nom_fichier):
+    """Écrit les points au format ".npy" (np.save) ou en flottants bruts (autre extension)."""
+    points = np.ascontiguousarray(points, dtype=np.float64)
+    if nom_fichier.lower().endswith(".npy"):
+        # np.save ajouterait ".npy" à un nom qui ne le contient pas : on ouvre nous-mêmes
+        with open(nom_fichier, "wb") as f:
+            np.save(f, points)
+    else:
+        points.tofile(nom_fichier)
+
 def afficher_tournee(points, cycle, titre="Tournée Hamiltonienne"):
     """
     Affiche graphiquement les points et le chemin parcouru.